@@ -1,11 +1,10 @@
 import os
 import argparse
 from pathlib import Path
-from datetime import datetime
 
-import pandas
 from dotenv import load_dotenv
 from billtrack50_app.extract import main as extract
+from common.records import FORMATS, save_records
 
 
 def transform():
@@ -21,27 +20,6 @@ def match():
 FILENAME = f"_BillTrack_"
 
 
-def save_records(
-    records: dict[int, dict[str, str]],
-    filename: str,
-    filepath: Path,
-    *additional_info,
-):
-
-    filepath.mkdir(exist_ok=True)
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    df = pandas.DataFrame.from_dict(records, orient="index")
-    df.to_csv(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.csv"
-        ),
-        index=False,
-    )
-
-
 def main():
 
     parser = argparse.ArgumentParser()
@@ -104,6 +82,31 @@ def main():
         help="to match only",
     )
 
+    parser.add_argument(
+        "-n",
+        "--network",
+        action="store_true",
+        help=(
+            "read the scorecard data from network responses, as the legislator "
+            "cards' columns followed by the fields of their JSON records"
+        ),
+    )
+
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=1,
+        help="number of browsers the legislator pages are crawled with",
+    )
+
+    parser.add_argument(
+        "-r",
+        "--resume",
+        action="store_true",
+        help="skip the pages a previous run already extracted",
+    )
+
     parser.add_argument(
         "-vi",
         "--vote_index",
@@ -111,8 +114,19 @@ def main():
         help="When scores are negative, extract vote Index",
     )
 
+    parser.add_argument(
+        "-o",
+        "--output_format",
+        choices=FORMATS,
+        default="csv",
+        help="format of the saved files, parquet keeps column types between stages",
+    )
+
     args = parser.parse_args()
 
+    if args.network and args.vote_index:
+        parser.error("--vote_index reads the legislator pages, drop --network")
+
     load_dotenv()
 
     vsdb_conn_info = {
@@ -131,12 +145,16 @@ def main():
             args.html_path,
             args.candidate_html_path,
             args.vote_index,
+            args.network,
+            args.workers,
+            args.resume,
         )
 
         save_records(
             records_extracted,
             FILENAME + "Ratings-Extract",
             args.export_path / "EXTRACT_FILES",
+            format=args.output_format,
         )
 
         # records_transformed = transform(records_extracted)
@@ -172,6 +190,7 @@ def main():
             records_extracted,
             FILENAME + "Ratings-Extract",
             args.export_path / "EXTRACT_FILES",
+            format=args.output_format,
         )
 
     # elif args.transform and not (any((args.extract, args.match))):
@@ -1,9 +1,8 @@
 import re
+import threading
+from queue import Full, Queue
 from collections.abc import Generator
 
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.by import By
@@ -15,75 +14,136 @@ from selenium.common.exceptions import (
     ElementClickInterceptedException,
 )
 
-from bs4 import BeautifulSoup
-from datetime import datetime
+import numpy
+import pandas
 from pathlib import Path
 from tqdm import tqdm
 from urllib.parse import urljoin
+from common import archive, batch, capture, checkpoint, driver_pool, parser
+from common.archive import save_html
 
 
-def extract_candidate(page_source, **additional_info):
-    soup = BeautifulSoup(page_source, "html.parser")
+def read_scores(container) -> dict[str, str]:
+    score_containers = container.find_all("p", {"class": "legislator-detail-score"})
 
-    container = soup.find("div", {"class": "bt50-scorecard-container"})
-    info = container.find("div", {"class": "legislator-sub-head"})
+    return {p.strong.text.strip(): p.span.text.strip() for p in score_containers}
 
-    score_containers = container.find_all("p", {"class": "legislator-detail-score"})
-    score_headers = [p.strong.text.strip() for p in score_containers]
-    scores = [p.span.text.strip() for p in score_containers]
-
-    return (
-        {
-            # "sig_candidate_id": container["data-legislatorid"],
-            "info": info.text.strip() if info else None,
-        }
-        | dict(zip(score_headers, scores))
-        | additional_info
-    )
 
+def read_possible_score(soup) -> float:
+    """Sum of the bill weights in the candidate's bill table, or None when the
+    page has no bill table"""
 
-def get_vote_index(page_source):
-    soup = BeautifulSoup(page_source, "html.parser")
     table = soup.select_one(".bill-table .pure-table")
 
     if not table:
-        return {}
+        return None
 
     headers = [th.text for th in table.thead.find_all("th")]
-    rows = [tr.find_all("td") for tr in table.tbody.find_all("tr")]
 
-    extracted_table = [
-        dict(zip(headers, map(lambda x: x.get_text(strip=True), row))) for row in rows
-    ]
+    if "Score" not in headers:
+        return 0
 
+    column = headers.index("Score")
     possible_score = 0
 
-    for r in extracted_table:
-        possible_score += abs(float(r.get("Score"))) if r.get("Score") else 0
+    for tr in table.tbody.find_all("tr"):
+        cells = tr.find_all("td")
+        score = cells[column].get_text(strip=True) if column < len(cells) else None
+        possible_score += abs(float(score)) if score else 0
+
+    return possible_score
+
+
+def calculate_vote_index(total_score, possible_score):
+    # A scorecard without scored bills has no index
+    if not possible_score:
+        return None
+
+    return ((total_score + possible_score) / (2 * possible_score)) * 100
+
+
+def get_vote_index(scores: dict[str, str], possible_score: float) -> dict:
+
+    if possible_score is None or not scores:
+        return {}
+
+    return {"possible_score": possible_score} | {
+        f"vote_index_{score_header}": calculate_vote_index(float(score), possible_score)
+        for score_header, score in scores.items()
+    }
+
+
+def read_candidate(page_source) -> tuple[dict, dict[str, str], float]:
+    """Reads the info, the scores and the bill table's possible score from one
+    parse of the candidate page"""
+
+    soup = parser.parse(page_source)
 
     container = soup.find("div", {"class": "bt50-scorecard-container"})
-    score_containers = container.find_all("p", {"class": "legislator-detail-score"})
-    score_headers = [p.strong.text.strip() for p in score_containers]
-    scores = [p.span.text.strip() for p in score_containers]
+    info = container.find("div", {"class": "legislator-sub-head"})
+    scores = read_scores(container)
+
+    record = {
+        # "sig_candidate_id": container["data-legislatorid"],
+        "info": info.text.strip() if info else None,
+    } | scores
+
+    return record, scores, read_possible_score(soup)
+
+
+def extract_candidate(page_source, vote_index=False, **additional_info):
+
+    record, scores, possible_score = read_candidate(page_source)
+
+    if vote_index:
+        return record | additional_info | get_vote_index(scores, possible_score)
+
+    return record | additional_info
+
+
+def get_vote_indices(
+    candidates_scores: list[dict[str, str]], possible_scores: list[float]
+) -> list[dict]:
+    """get_vote_index for many candidates at once, with the arithmetic done on
+    whole arrays"""
 
-    vote_indices = {}
+    rows, headers, scores, possibles = [], [], [], []
 
-    def calculate_vote_index(total_score, possible_score):
-        return ((total_score + possible_score) / (2 * possible_score)) * 100
+    for i, (candidate_scores, possible_score) in enumerate(
+        zip(candidates_scores, possible_scores)
+    ):
+        if possible_score is None:
+            continue
 
-    for score_header, score in zip(score_headers, scores):
+        for score_header, score in candidate_scores.items():
+            rows.append(i)
+            headers.append(score_header)
+            scores.append(score)
+            possibles.append(possible_score)
 
-        vote_indices["possible_score"] = possible_score
-        vote_indices[f"vote_index_{score_header}"] = calculate_vote_index(
-            float(score), possible_score
+    scores = pandas.to_numeric(pandas.Series(scores, dtype=object)).to_numpy(float)
+    possibles = numpy.asarray(possibles, dtype=float)
+
+    # Possible scores of 0 are left as None below, like calculate_vote_index
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        vote_indices = ((scores + possibles) / (2 * possibles)) * 100
+
+    extracted = [{} for _ in candidates_scores]
+
+    for i, score_header, possible_score, vote_index in zip(
+        rows, headers, possibles.tolist(), vote_indices.tolist()
+    ):
+        extracted[i]["possible_score"] = possible_score
+        extracted[i][f"vote_index_{score_header}"] = (
+            vote_index if possible_score else None
         )
 
-    return vote_indices
+    return extracted
 
 
 def extract_cards(page_source, **additional_info) -> Generator[str, tuple[str, dict]]:
 
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
     container = soup.find("div", {"id": "legislators-container"})
 
     for card in container.find_all("div", {"class": "card"}):
@@ -102,60 +162,229 @@ def extract_cards(page_source, **additional_info) -> Generator[str, tuple[str, d
         } | additional_info
 
 
+def sig_candidate_id_of(c_file: Path) -> str:
+    # Pages saved before the manifest kept it only have it in their name
+    recorded = archive.page_info(c_file).get("sig_candidate_id")
+    return recorded or "".join(c_file.name.split("_")[-1].split("-")[:-5])
+
+
 def extract_files(files: list[Path], candidate_files: list[Path], vote_index=False):
 
     card_records = {}
 
     for file in files:
-        with open(file, "r") as f:
-            card_records.update(
-                {record["sig_candidate_id"]: record for _, record in extract_cards(f)}
-            )
+        card_records.update(
+            {
+                record["sig_candidate_id"]: record
+                for _, record in extract_cards(archive.read_html(file))
+            }
+        )
 
-    extracted = []
+    candidate_files = candidate_files[1:]
+    candidates = batch.map_files(
+        read_candidate, candidate_files, desc="Extracting candidates..."
+    )
 
-    for c_file in tqdm(candidate_files[1:]):
-        sig_candidate_id = "".join(c_file.name.split("_")[-1].split("-")[:-5])
+    read = [
+        (sig_candidate_id_of(c_file), candidate)
+        for c_file, candidate in zip(candidate_files, candidates)
+        if candidate is not None
+    ]
 
-        with open(c_file, "r") as f:
-            page_source = f.read()
-            card_record = card_records.get(sig_candidate_id)
-            candidate_extract = extract_candidate(page_source)
+    if vote_index:
+        vote_indices = get_vote_indices(
+            [scores for _, (_, scores, _) in read],
+            [possible_score for _, (_, _, possible_score) in read],
+        )
+    else:
+        vote_indices = [{} for _ in read]
 
-            if vote_index:
-                vi = get_vote_index(page_source)
-                extracted.append(card_record | candidate_extract | vi)
-            else:
-                extracted.append(card_record | candidate_extract)
+    extracted = [
+        card_records.get(sig_candidate_id) | record | vi
+        for (sig_candidate_id, (record, _, _)), vi in zip(read, vote_indices)
+    ]
 
     records_extracted = dict(enumerate(extracted))
 
     return records_extracted
 
 
-def save_html(
-    page_source,
-    filepath: Path,
+def id_column(records: list[dict], ids: set[str]) -> str | None:
+    """The column every record has and that holds listed legislators' ids,
+    if the records are a table of legislators"""
+
+    if not records:
+        return None
+
+    return next(
+        (
+            column
+            for column in records[0]
+            if all(column in record for record in records)
+            and any(str(record[column]) in ids for record in records)
+        ),
+        None,
+    )
+
+
+def join_cards(card_records: list[dict], tables: list[list[dict]]) -> list[dict]:
+    """Captured records of the listed legislators, each following its card's
+    columns. Tables without a column of listed legislators' ids (eg. app
+    config or other widgets on the page) are left out."""
+
+    ids = {card_record["sig_candidate_id"] for card_record in card_records} - {""}
+    by_id = {}
+
+    for records in tables:
+        column = id_column(records, ids)
+
+        if column is None:
+            continue
+
+        for record in records:
+            if str(record[column]) in ids:
+                by_id.setdefault(str(record[column]), {}).update(record)
+
+    if not by_id:
+        print("No captured responses matched the listed legislators")
+
+    return [
+        card_record | by_id.get(card_record["sig_candidate_id"], {})
+        for card_record in card_records
+    ]
+
+
+def visit_candidate(
+    chrome_driver,
+    candidate_url,
+    card_record: dict,
     filename: str,
-    *additional_info,
+    export_path: Path,
+    vote_index: bool = False,
 ):
 
-    filepath.mkdir(exist_ok=True)
+    chrome_driver.get(candidate_url)
 
-    soup = BeautifulSoup(page_source, "html.parser")
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
+    if vote_index:
+        try:
+            WebDriverWait(chrome_driver, 10).until(
+                EC.visibility_of_element_located(
+                    (
+                        By.CSS_SELECTOR,
+                        ".bill-table tbody",
+                    )
+                )
+            )
+        except TimeoutException:
+            pass
 
-    with open(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.html"
-        ),
-        "w",
-    ) as f:
-        f.write(str(soup))
+    page_source = chrome_driver.page_source
+
+    save_html(
+        page_source,
+        export_path / "HTML_FILES_CANDIDATE",
+        filename,
+        card_record["sig_candidate_id"],
+        sig_candidate_id=card_record["sig_candidate_id"],
+        url=candidate_url,
+    )
+
+    return extract_candidate(page_source, vote_index, **card_record)
+
+
+def crawl_candidates(
+    candidates: list[tuple[str, dict]],
+    workers: int,
+    filename: str,
+    export_path: Path,
+    vote_index: bool = False,
+    journal: checkpoint.Journal = None,
+):
+
+    # Enough drivers for every worker, on top of the one holding the list page
+    driver_pool.get_pool(size=workers + 1)
+
+    queue = Queue(maxsize=workers * 2)
+    extracted = {}
+    p_bar = tqdm(total=len(candidates))
+
+    def work():
+        try:
+            chrome_driver = driver_pool.checkout()
+        except Exception as e:
+            print(f"Cannot launch a driver: {e!r}")
+            return
+
+        try:
+            while (item := queue.get()) is not None:
+                i, candidate_url, card_record = item
+
+                # A worker that stopped on one candidate would leave the
+                # producer blocked on the full queue
+                try:
+                    extracted[i] = visit_candidate(
+                        chrome_driver,
+                        candidate_url,
+                        card_record,
+                        filename,
+                        export_path,
+                        vote_index,
+                    )
+                except Exception as e:
+                    print(f"Cannot extract {candidate_url}: {e!r}")
+                else:
+                    if journal is not None:
+                        journal.record(candidate_url, extracted[i])
+                finally:
+                    p_bar.update(1)
+                    queue.task_done()
+
+            queue.task_done()
+        finally:
+            driver_pool.checkin(chrome_driver)
+
+    threads = [threading.Thread(target=work) for _ in range(workers)]
+
+    def put(item) -> bool:
+        # Workers that couldn't get a driver have exited, and once none are
+        # left the full queue would block forever
+        while any(thread.is_alive() for thread in threads):
+            try:
+                queue.put(item, timeout=1)
+                return True
+            except Full:
+                continue
+
+        return False
+
+    for thread in threads:
+        thread.start()
+
+    for i, (candidate_url, card_record) in enumerate(candidates):
+        if not put((i, candidate_url, card_record)):
+            break
 
+    for _ in threads:
+        if not put(None):
+            break
+
+    for thread in threads:
+        thread.join()
+
+    # The output would silently leave these legislators out, so the run
+    # fails. The others are in the journal for a resumed run.
+    failed = [url for i, (url, _) in enumerate(candidates) if i not in extracted]
+
+    if failed:
+        raise RuntimeError(
+            f"{len(failed)} candidates failed to extract: {', '.join(failed)}"
+        )
+
+    # Kept in card order regardless of which worker finished first
+    return [extracted[i] for i in sorted(extracted)]
 
+
+@driver_pool.scoped
 def main(
     url,
     filename: str,
@@ -163,29 +392,29 @@ def main(
     html_path: Path = None,
     candidates_html_path: Path = None,
     vote_index: bool = False,
+    capture_network: bool = False,
+    workers: int = 1,
+    resume: bool = False,
 ):
 
     if html_path:
-        html_files = filter(
-            lambda f: f.name.endswith(".html"),
-            (export_path / html_path).iterdir(),
-        )
-        candidates_html_files = filter(
-            lambda f: f.name.endswith(".html"),
-            (export_path / candidates_html_path).iterdir(),
-        )
+        html_files = archive.html_files(export_path / html_path)
+        candidates_html_files = archive.html_files(export_path / candidates_html_path)
         records_extracted = extract_files(
-            sorted(html_files, key=lambda x: x.stat().st_ctime),
-            sorted(candidates_html_files, key=lambda x: x.stat().st_ctime),
+            html_files,
+            candidates_html_files,
             vote_index,
         )
         return records_extracted
 
-    chrome_service = Service()
-    chrome_options = Options()
-    chrome_options.add_argument("incognito")
-    chrome_options.add_argument("headless")
-    chrome_driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
+    if capture_network and vote_index:
+        # Vote indices are worked out from the bill tables of the legislator
+        # pages, which network capture doesn't visit
+        raise ValueError("vote_index needs the legislator pages, not capture_network")
+
+    chrome_driver = (
+        capture.checkout() if capture_network else driver_pool.checkout()
+    )
 
     chrome_driver.get(url)
 
@@ -219,49 +448,65 @@ def main(
         except ElementClickInterceptedException:
             pass
 
-    extracted = []
-
     card_records = list(extract_cards(chrome_driver.page_source))
 
+    if capture_network:
+        # The scorecard app loads its legislators as JSON, which already
+        # carries what the legislator pages show
+        captured = []
+
+        for _, payload in capture.wait_for_json(chrome_driver, "billtrack50"):
+            capture.save_json(payload, export_path / "JSON_FILES", filename)
+            captured.append(capture.to_records(payload))
+
+        return dict(
+            enumerate(join_cards([record for _, record in card_records], captured))
+        )
+
+    extracted = []
+
     save_html(
         chrome_driver.page_source,
         export_path / "HTML_FILES",
         filename,
     )
 
-    for candidate_url, card_record in tqdm(card_records):
-
-        chrome_driver.get(urljoin(chrome_driver.current_url, candidate_url))
+    # Candidate pages are loaded directly, so there's no need to go back to
+    # the list in between
+    candidates = [
+        (urljoin(chrome_driver.current_url, candidate_url), card_record)
+        for candidate_url, card_record in card_records
+    ]
 
-        if vote_index:
-            try:
-                WebDriverWait(chrome_driver, 10).until(
-                    EC.visibility_of_element_located(
-                        (
-                            By.CSS_SELECTOR,
-                            ".bill-table tbody",
-                        )
-                    )
-                )
-            except TimeoutException:
-                pass
+    # Candidates finished by an earlier run are replayed from the journal
+    journal = checkpoint.Journal(export_path, filename, resume)
 
-        save_html(
-            chrome_driver.page_source,
-            export_path / "HTML_FILES_CANDIDATE",
+    if workers > 1:
+        crawl_candidates(
+            [c for c in candidates if c[0] not in journal],
+            workers,
             filename,
-            card_record["sig_candidate_id"],
+            export_path,
+            vote_index,
+            journal,
         )
-
-        _extracted = extract_candidate(chrome_driver.page_source)
-
-        if vote_index:
-            vi = get_vote_index(chrome_driver.page_source)
-            extracted.append(_extracted | card_record | vi)
-        else:
-            extracted.append(_extracted | card_record)
-
-        chrome_driver.execute_script("window.history.go(-1)")
+        extracted = [journal[url] for url, _ in candidates if url in journal]
+        return dict(enumerate(extracted))
+
+    for candidate_url, card_record in tqdm(candidates):
+        if candidate_url not in journal:
+            journal.record(
+                candidate_url,
+                visit_candidate(
+                    chrome_driver,
+                    candidate_url,
+                    card_record,
+                    filename,
+                    export_path,
+                    vote_index,
+                ),
+            )
+        extracted.append(journal[candidate_url])
 
     records_extracted = dict(enumerate(extracted))
     return records_extracted
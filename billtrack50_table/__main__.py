@@ -1,11 +1,10 @@
 import os
 import argparse
 from pathlib import Path
-from datetime import datetime
 
-import pandas
 from dotenv import load_dotenv
 from billtrack50_table.extract import main as extract
+from common.records import FORMATS, save_records
 
 
 def transform():
@@ -21,27 +20,6 @@ def match():
 FILENAME = f"_BillTrackTable_"
 
 
-def save_records(
-    records: dict[int, dict[str, str]],
-    filename: str,
-    filepath: Path,
-    *additional_info,
-):
-
-    filepath.mkdir(exist_ok=True)
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    df = pandas.DataFrame.from_dict(records, orient="index")
-    df.to_csv(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.csv"
-        ),
-        index=False,
-    )
-
-
 def main():
 
     parser = argparse.ArgumentParser()
@@ -97,6 +75,14 @@ def main():
         help="to match only",
     )
 
+    parser.add_argument(
+        "-o",
+        "--output_format",
+        choices=FORMATS,
+        default="csv",
+        help="format of the saved files, parquet keeps column types between stages",
+    )
+
     args = parser.parse_args()
 
     load_dotenv()
@@ -121,9 +107,12 @@ def main():
             records_extracted,
             FILENAME + "Ratings-Extract",
             args.export_path / "EXTRACT_FILES",
+            format=args.output_format,
         )
 
-        # records_transformed = transform(records_extracted)
+        # records_transformed = transform(
+        #     load_records(extracted_file).to_dict(orient="index")
+        # )
         # save_records(
         #     records_transformed,
         #     FILENAME + "Ratings-Transformed",
@@ -153,6 +142,7 @@ def main():
             records_extracted,
             FILENAME + "Ratings-Extract",
             args.export_path / "EXTRACT_FILES",
+            format=args.output_format,
         )
 
     # elif args.transform and not (any((args.extract, args.match))):
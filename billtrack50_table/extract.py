@@ -1,96 +1,76 @@
-from datetime import datetime
 from pathlib import Path
 
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.common.action_chains import ActionChains
-from bs4 import BeautifulSoup
+from common import archive, batch, fetch, parser
+from common.archive import save_html
 
 
-def extract(page_source, **additional_info):
+# DataTables only gives the table its id (DataTables_Table_0) in the browser,
+# so the served HTML is checked for a table with rows instead
+ROOT = "table"
+READY = "table tr td"
 
-    soup = BeautifulSoup(page_source, "html.parser")
 
-    table = soup.find("table", {"id": "DataTables_Table_0"})
+def header_row(table):
+    # Served HTML may leave out the thead and tbody the browser adds
+    return table.thead or table.find("tr")
 
-    headers = [th.text for th in table.thead.find_all("th")]
-    rows = [tr.find_all("td") for tr in table.tbody.find_all("tr")]
 
-    def get_text(x):
-        return x.get_text(strip=True)
+def find_table(soup):
+    """The DataTables table, or in served HTML the first table with a row of
+    th headers over td cells, which layout tables don't have"""
 
-    return [dict(zip(headers, map(get_text, row))) | additional_info for row in rows]
+    return soup.find("table", {"id": "DataTables_Table_0"}) or next(
+        (
+            table
+            for table in soup.find_all("table")
+            if table.find("td") and header_row(table).find("th")
+        ),
+        None,
+    )
 
 
-def extract_files(files: list):
+def extract(page_source, **additional_info):
 
-    extracted = []
+    soup = parser.parse(page_source, ROOT)
 
-    for file in files:
+    table = find_table(soup)
 
-        with open(file, "r") as f:
-            extracted += extract(f.read())
+    headers = [th.text for th in header_row(table).find_all("th")]
 
-    records_extracted = dict(enumerate(extracted))
+    # Some parsers add a tbody around the header row as well
+    rows = [
+        tr.find_all("td")
+        for tr in (table.tbody or table).find_all("tr")
+        if tr.find("td")
+    ]
 
-    return records_extracted
+    def get_text(x):
+        return x.get_text(strip=True)
 
+    return [dict(zip(headers, map(get_text, row))) | additional_info for row in rows]
 
-def save_html(
-    page_source,
-    filepath: Path,
-    filename: str,
-    *additional_info,
-):
 
-    filepath.mkdir(exist_ok=True)
+def extract_files(files: list):
 
-    soup = BeautifulSoup(page_source, "html.parser")
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    with open(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.html"
-        ),
-        "w",
-    ) as f:
-        f.write(str(soup))
+    return batch.iter_records(extract, files)
 
 
 def main(url, filename: str, export_path: Path, html_path: Path = None):
 
     if html_path:
-        html_files = filter(
-            lambda f: f.name.endswith(".html"),
-            (export_path / html_path).iterdir(),
-        )
-        records_extracted = extract_files(
-            sorted(html_files, key=lambda x: x.stat().st_ctime)
-        )
+        html_files = archive.html_files(export_path / html_path)
+        records_extracted = extract_files(html_files)
         return records_extracted
 
-    chrome_service = Service()
-    chrome_options = Options()
-    chrome_options.add_argument("incognito")
-    chrome_options.add_argument("headless")
-
-    chrome_driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
-
-    chrome_driver.get(url)
-
-    # close overlay
-    ActionChains(chrome_driver).send_keys(Keys.ESCAPE).perform()
+    # The browser is only used when the table isn't in the served HTML
+    page_source = fetch.page_source(url, READY)
 
     save_html(
-        chrome_driver.page_source,
+        page_source,
         export_path / "HTML_FILES",
         filename,
     )
-    extracted = extract(chrome_driver.page_source)
+    extracted = extract(page_source)
 
     records_extracted = dict(enumerate(extracted))
     return records_extracted
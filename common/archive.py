@@ -0,0 +1,406 @@
+# Archives captured pages exactly as the browser returned them, without
+# building a parse tree just to serialize it back to disk.
+#
+# Pages are written as files under <export_path>/HTML_FILES* by default. With
+# HTML_ARCHIVE set to "store" they go into <export_path>/HTML_STORE.sqlite
+# instead, where each distinct page is kept once, gzip compressed. Either way
+# the page is recorded in that database's manifest (in capture order, with its
+# hash, size and the candidate and URL it was saved for), which is what
+# offline extraction lists and reads pages from. HTML_ARCHIVE set to "bundle"
+# appends pages to the run's bundle (see common.bundle) as they're captured.
+
+import os
+import re
+import gzip
+import sqlite3
+import hashlib
+import argparse
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from common import bundle
+
+
+STORE = "HTML_STORE.sqlite"
+TIMESTAMP_FORMAT = "%Y-%m-%d-%H%M%S-%f"
+_HTML_FILENAME = re.compile(r"(.*?)(\d{4}-\d{2}-\d{2}-\d{6}-\d{6})\.html")
+MANIFEST_COLUMNS = {
+    "sig_candidate_id": "TEXT",
+    "url": "TEXT",
+    "size": "INTEGER",
+}
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def to_bytes(page_source) -> bytes:
+    """Page source as text, bytes or a tree from common.parser"""
+
+    if isinstance(page_source, bytes):
+        return page_source
+    return str(page_source).encode()
+
+
+def get_backend() -> str:
+    return (os.getenv("HTML_ARCHIVE") or "files").lower()
+
+
+def html_filename(filename: str, *additional_info, timestamp: str = None) -> str:
+    timestamp = timestamp or datetime.strftime(datetime.now(), TIMESTAMP_FORMAT)
+
+    return (
+        f"{filename}_{'-'.join(map(str, additional_info))}"
+        f"{'-' if additional_info else ''}{timestamp}.html"
+    )
+
+
+def parse_html_filename(name: str) -> dict:
+    """filename, additional_info and timestamp of a name html_filename made,
+    as far as the name allows (additional info is taken to follow the last
+    underscore). Empty for names it didn't make."""
+
+    match = _HTML_FILENAME.fullmatch(name)
+
+    if match is None:
+        return {}
+
+    head, timestamp = match.groups()
+
+    if head.endswith("-"):
+        filename, _, additional_info = head[:-1].rpartition("_")
+    else:
+        filename, additional_info = head.removesuffix("_"), ""
+
+    return {
+        "filename": filename,
+        "additional_info": additional_info,
+        "timestamp": timestamp,
+    }
+
+
+class Store:
+
+    def __init__(self, path: Path):
+        # Pages are saved from the crawler's threads, over one connection
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._lock = threading.Lock()
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS blobs"
+                " (hash TEXT PRIMARY KEY, size INTEGER, data BLOB)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages (id INTEGER PRIMARY KEY,"
+                " directory TEXT, name TEXT, filename TEXT, additional_info TEXT,"
+                " timestamp TEXT, hash TEXT)"
+            )
+
+            # Manifests written before these were recorded
+            columns = {c[1] for c in self._conn.execute("PRAGMA table_info(pages)")}
+
+            for column, type_ in MANIFEST_COLUMNS.items():
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE pages ADD COLUMN {column} {type_}")
+
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS pages_name ON pages (directory, name)"
+            )
+
+    def record(self, directory: str, name: str, **page) -> None:
+        """Adds the page to the manifest, or updates it if it's already there
+        (eg. a file that's been moved into the store)"""
+
+        with self._lock, self._conn:
+            self._record(directory, name, page)
+
+    def _record(self, directory: str, name: str, page: dict) -> None:
+        found = self._conn.execute(
+            "SELECT id FROM pages WHERE directory = ? AND name = ?",
+            (directory, name),
+        ).fetchone()
+
+        if found:
+            self._conn.execute(
+                f"UPDATE pages SET {', '.join(f'{k} = ?' for k in page)}"
+                " WHERE id = ?",
+                (*page.values(), found[0]),
+            )
+        else:
+            columns = ", ".join(["directory", "name", *page])
+            self._conn.execute(
+                f"INSERT INTO pages ({columns})"
+                f" VALUES ({', '.join('?' * (len(page) + 2))})",
+                (directory, name, *page.values()),
+            )
+
+    def put(self, directory: str, name: str, content: bytes, **page) -> str:
+        """Stores the page's content and records it, returning its hash"""
+
+        content_hash = hashlib.sha256(content).hexdigest()
+
+        with self._lock, self._conn:
+            # A page already archived (eg. on a previous run) isn't stored again
+            if not self._conn.execute(
+                "SELECT 1 FROM blobs WHERE hash = ?", (content_hash,)
+            ).fetchone():
+                self._conn.execute(
+                    "INSERT INTO blobs VALUES (?, ?, ?)",
+                    (content_hash, len(content), gzip.compress(content, 6)),
+                )
+
+            self._record(
+                directory, name, page | {"hash": content_hash, "size": len(content)}
+            )
+
+        return content_hash
+
+    def get(self, directory: str, name: str) -> bytes:
+        """The page saved as directory/name, or None if there isn't one"""
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM pages JOIN blobs USING (hash)"
+                " WHERE directory = ? AND name = ? ORDER BY id DESC LIMIT 1",
+                (directory, name),
+            ).fetchone()
+
+        return gzip.decompress(row[0]) if row else None
+
+    def pages(self, directory: str = None, name: str = None) -> list[dict]:
+        """Manifest entries in capture order, of a directory or one page,
+        with whether the page's content is in the store"""
+
+        where, params = [], []
+
+        for column, value in (("directory", directory), ("name", name)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT pages.*, blobs.hash IS NOT NULL AS stored"
+                " FROM pages LEFT JOIN blobs USING (hash)"
+                f"{' WHERE ' + ' AND '.join(where) if where else ''}"
+                " ORDER BY id",
+                params,
+            )
+            columns = [c[0] for c in cursor.description]
+
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def close(self):
+        self._conn.close()
+
+
+def open_store(export_path: Path, create: bool = True) -> Store:
+    """The export path's store, shared within the process. None if it doesn't
+    exist and create is False."""
+
+    path = export_path / STORE
+
+    if not create and not path.exists():
+        return None
+
+    # Connections don't survive into forked workers, so each process opens its
+    # own
+    key = (os.getpid(), path.resolve())
+
+    with _stores_lock:
+        if key not in _stores:
+            export_path.mkdir(parents=True, exist_ok=True)
+            _stores[key] = Store(path)
+
+        return _stores[key]
+
+
+def save_html(
+    page_source,
+    filepath: Path,
+    filename: str,
+    *additional_info,
+    sig_candidate_id: str = None,
+    url: str = None,
+) -> Path:
+    """Saves the page as filepath/<filename>_<additional_info>-<timestamp>.html,
+    or under that path in the store, and records it in the manifest"""
+
+    timestamp = datetime.strftime(datetime.now(), TIMESTAMP_FORMAT)
+    html_filepath = filepath / html_filename(
+        filename, *additional_info, timestamp=timestamp
+    )
+
+    content = to_bytes(page_source)
+    store = open_store(filepath.parent)
+    page = {
+        "filename": filename,
+        "additional_info": "-".join(map(str, additional_info)),
+        "timestamp": timestamp,
+        "sig_candidate_id": sig_candidate_id,
+        "url": url,
+    }
+
+    if get_backend() == "store":
+        store.put(filepath.name, html_filepath.name, content, **page)
+        return html_filepath
+
+    if get_backend() == "bundle":
+        run_bundle = bundle.open_bundle(filepath.parent, create=True)
+        run_bundle.add(f"{filepath.name}/{html_filepath.name}", content)
+    else:
+        filepath.mkdir(exist_ok=True)
+
+        with open(html_filepath, "wb") as f:
+            f.write(content)
+
+    store.record(
+        filepath.name,
+        html_filepath.name,
+        **page,
+        hash=hashlib.sha256(content).hexdigest(),
+        size=len(content),
+    )
+
+    return html_filepath
+
+
+def read_bytes(file: Path) -> bytes:
+    """Contents of an archived page, whether it's a file, in the store or in
+    the run's bundle"""
+
+    if file.exists():
+        return file.read_bytes()
+
+    store = open_store(file.parent.parent, create=False)
+    content = store.get(file.parent.name, file.name) if store else None
+
+    if content is None:
+        run_bundle = bundle.open_bundle(file.parent.parent)
+        key = f"{file.parent.name}/{file.name}"
+        content = run_bundle.get(key) if run_bundle else None
+
+    if content is None:
+        raise FileNotFoundError(file)
+
+    return content
+
+
+def read_html(file: Path, encoding: str = None) -> str:
+
+    if file.exists():
+        with open(file, "r", encoding=encoding) as f:
+            return f.read()
+
+    return read_bytes(file).decode(encoding or "utf-8")
+
+
+def pages(directory: Path) -> list[dict]:
+    """Manifest entries of the pages archived in directory, in the order they
+    were captured, each with its "file" path. Pages that are neither on disk,
+    in the store nor in the bundle are left out. HTML files the manifest
+    doesn't know about (eg. from before it was kept) follow in the order they
+    were created, then pages of the bundle in the order they were added."""
+
+    on_disk = set()
+
+    if directory.is_dir():
+        on_disk = {f.name for f in directory.iterdir() if f.name.endswith(".html")}
+
+    run_bundle = bundle.open_bundle(directory.parent)
+    prefix = f"{directory.name}/"
+    in_bundle = [
+        key.removeprefix(prefix)
+        for key in (run_bundle.keys(prefix) if run_bundle else [])
+        if key.endswith(".html")
+    ]
+
+    store = open_store(directory.parent, create=False)
+    recorded = []
+    present = on_disk.union(in_bundle)
+
+    for page in store.pages(directory.name) if store else []:
+        if page["name"] in present or page["stored"]:
+            recorded.append(page | {"file": directory / page["name"]})
+
+    seen = {page["name"] for page in recorded}
+
+    return (
+        recorded
+        + [
+            {"file": file}
+            for file in sorted(
+                (directory / name for name in on_disk.difference(seen)),
+                key=lambda x: x.stat().st_ctime,
+            )
+        ]
+        + [
+            {"file": directory / name}
+            for name in in_bundle
+            if name not in seen and name not in on_disk
+        ]
+    )
+
+
+def html_files(directory: Path) -> list[Path]:
+    """Pages archived in directory, in the order they were captured"""
+
+    return [page["file"] for page in pages(directory)]
+
+
+def page_info(file: Path) -> dict:
+    """The manifest entry of an archived page, empty if it wasn't recorded"""
+
+    store = open_store(file.parent.parent, create=False)
+    found = store.pages(file.parent.name, file.name) if store else []
+
+    return found[-1] if found else {}
+
+
+def pack(directory: Path, keep: bool = False) -> int:
+    """Moves the HTML files of directory into the store, returning how many
+    were packed"""
+
+    store = open_store(directory.parent)
+    files = [f for f in html_files(directory) if f.exists()]
+
+    for file in files:
+        store.put(
+            directory.name,
+            file.name,
+            file.read_bytes(),
+            **parse_html_filename(file.name),
+        )
+
+        if not keep:
+            file.unlink()
+
+    return len(files)
+
+
+if __name__ == "__main__":
+
+    arg_parser = argparse.ArgumentParser(
+        description="Moves archived HTML files into the export path's store"
+    )
+
+    arg_parser.add_argument(
+        "directories",
+        type=Path,
+        nargs="+",
+        help="HTML directories (eg. <export_path>/HTML_FILES)",
+    )
+
+    arg_parser.add_argument(
+        "-k",
+        "--keep",
+        action="store_true",
+        help="keep the HTML files after storing them",
+    )
+
+    args = arg_parser.parse_args()
+
+    for directory in args.directories:
+        print(f"{directory}: {pack(directory, args.keep)} pages stored")
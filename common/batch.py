@@ -0,0 +1,198 @@
+# Runs an extract function over archived HTML files, on a process pool when
+# EXTRACT_WORKERS is above 1. Results keep the order of the files and can be
+# consumed as a stream, a file that fails to extract is reported instead of
+# aborting the batch, and unchanged pages are read from common.cache.
+
+import os
+import sys
+import traceback
+from types import GeneratorType
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from collections.abc import Callable, Generator, Iterable
+
+from tqdm import tqdm
+from common import archive, cache
+
+
+class Failed:
+
+    def __init__(self, file: Path, error: str):
+        self.file = file
+        self.error = error
+
+
+def _apply(func: Callable, file: Path, kwargs: dict, encoding: str):
+    try:
+        result = func(archive.read_html(file, encoding), **kwargs)
+
+        # Generators can't be sent back from a worker process
+        return list(result) if isinstance(result, GeneratorType) else result
+
+    except Exception:
+        return Failed(file, traceback.format_exc())
+
+
+def get_workers() -> int:
+    return int(os.getenv("EXTRACT_WORKERS") or 1)
+
+
+def iter_results(
+    func: Callable,
+    files: Iterable[Path],
+    kwargs_for: Callable[[Path], dict] = None,
+    desc: str = None,
+    encoding: str = None,
+    workers: int = None,
+) -> Generator[object]:
+    """Calls `func` with the contents of each file (and the keyword arguments
+    `kwargs_for` derives from its path), yielding the results in file order
+    with None for the files that failed. Only a few files per worker are in
+    flight at once, so results don't pile up ahead of the consumer."""
+
+    workers = workers or get_workers()
+    total = len(files) if hasattr(files, "__len__") else None
+    failed = 0
+
+    p_bar = tqdm(total=total, desc=desc, disable=desc is None)
+
+    # Cached results are yielded in place of the pages they came from
+    caches = {}
+
+    def lookup(file: Path, kwargs: dict):
+        if not cache.enabled():
+            return None, None, None
+
+        path = cache.for_file(file)
+
+        if path not in caches:
+            caches[path] = cache.Cache(path)
+
+        try:
+            key = cache.key(file, func, kwargs)
+        except Exception:
+            # The page is left to _apply, which reports it as failed
+            return None, None, None
+
+        return caches[path], key, caches[path].get(key)
+
+    def unwrap(result, store=None, key=None):
+        nonlocal failed
+
+        p_bar.update()
+
+        if isinstance(result, Failed):
+            failed += 1
+            print(f"Failed to extract {result.file}:\n{result.error}", file=sys.stderr)
+            return None
+
+        if store is not None:
+            store.put(key, result)
+
+        return result
+
+    try:
+        if workers > 1:
+            # func has to be importable by the workers, so a module level
+            # function or a functools.partial of one
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                pending = deque()
+
+                def finish(store, key, cached, future):
+                    if future is None:
+                        p_bar.update()
+                        return cached
+                    return unwrap(future.result(), store, key)
+
+                for file in files:
+                    kwargs = kwargs_for(file) if kwargs_for else {}
+                    store, key, cached = lookup(file, kwargs)
+
+                    future = None
+                    if cached is None:
+                        future = executor.submit(_apply, func, file, kwargs, encoding)
+
+                    pending.append((store, key, cached, future))
+
+                    if len(pending) >= workers * 4:
+                        yield finish(*pending.popleft())
+
+                while pending:
+                    yield finish(*pending.popleft())
+        else:
+            for file in files:
+                kwargs = kwargs_for(file) if kwargs_for else {}
+                store, key, cached = lookup(file, kwargs)
+
+                if cached is not None:
+                    p_bar.update()
+                    yield cached
+                else:
+                    yield unwrap(_apply(func, file, kwargs, encoding), store, key)
+    finally:
+        for store in caches.values():
+            store.close()
+
+    p_bar.close()
+
+    if failed:
+        print(f"{failed} files failed to extract", file=sys.stderr)
+
+
+def map_files(
+    func: Callable,
+    files: Iterable[Path],
+    kwargs_for: Callable[[Path], dict] = None,
+    desc: str = None,
+    encoding: str = None,
+    workers: int = None,
+) -> list:
+
+    return list(iter_results(func, files, kwargs_for, desc, encoding, workers))
+
+
+def iter_records(
+    func: Callable,
+    files: Iterable[Path],
+    kwargs_for: Callable[[Path], dict] = None,
+    desc: str = None,
+    encoding: str = None,
+    workers: int = None,
+) -> Generator[dict]:
+    """Yields the records of every file in order. Functions returning a list
+    add its records, others add their one record"""
+
+    for result in iter_results(func, files, kwargs_for, desc, encoding, workers):
+        if result is None:
+            continue
+        if isinstance(result, list):
+            yield from result
+        else:
+            yield result
+
+
+def extract_records(
+    func: Callable,
+    files: Iterable[Path],
+    kwargs_for: Callable[[Path], dict] = None,
+    desc: str = None,
+    encoding: str = None,
+    workers: int = None,
+) -> list:
+
+    return list(iter_records(func, files, kwargs_for, desc, encoding, workers))
+
+
+def extract_files(
+    func: Callable,
+    files: Iterable[Path],
+    kwargs_for: Callable[[Path], dict] = None,
+    desc: str = None,
+    encoding: str = None,
+    workers: int = None,
+) -> dict:
+
+    return dict(
+        enumerate(iter_records(func, files, kwargs_for, desc, encoding, workers))
+    )
@@ -0,0 +1,337 @@
+# Packs a run (its captured pages and stage outputs) into a single append-only
+# file, <export_path>/RUN.bundle, read back by key through a memory map
+# without extracting anything to the filesystem.
+#
+# The file is a sequence of entries, each a header (magic, flags, key and
+# data lengths), the key (eg. "HTML_FILES/<name>.html") and the data, gzip
+# compressed when flagged. Closing a bundle that was written to appends an
+# index entry mapping every key to its data, whose last bytes point back at
+# it, so opening the bundle reads the index instead of walking every entry.
+# A bundle that wasn't closed (eg. a crashed run) is walked instead.
+
+import os
+import gzip
+import atexit
+import json
+import mmap
+import struct
+import argparse
+import threading
+from pathlib import Path
+
+
+BUNDLE = "RUN.bundle"
+
+MAGIC = b"RNB1"
+HEADER = struct.Struct(">4sBIQ")
+TRAILER = struct.Struct(">Q4s")
+INDEX_MAGIC = b"RNBI"
+INDEX_KEY = "\0index"
+
+GZIP = 1
+
+# What a run packs: the directories its pages are archived in (HTML_FILES,
+# HTML_CANDIDATE_FILES, ...) and its stages' outputs (see records.SCHEMAS).
+# Resume journals, databases written in place and partial downloads stay as
+# they are.
+PAGE_PREFIX = "HTML_"
+STAGES = ("EXTRACT_FILES", "TRANSFORMED_FILES", "MATCHED_FILES", "QUERY_FILES")
+
+_bundles = {}
+_bundles_lock = threading.Lock()
+
+
+class Bundle:
+
+    def __init__(self, path: Path, mode: str = "r"):
+        """mode is "r" to read or "a" to read and append"""
+
+        self.path = path
+        self.mode = mode
+
+        # Key to (data offset, data length, flags)
+        self._index = {}
+        self._size = 0
+        self._map = None
+        self._appended = False
+        self._lock = threading.Lock()
+
+        if mode == "a":
+            self._file = open(path, "ab+")
+        else:
+            self._file = open(path, "rb")
+
+        self._load()
+
+        # Drops an entry a crashed run left half written, so appends follow
+        # the last whole one
+        if mode == "a" and self._size < os.fstat(self._file.fileno()).st_size:
+            self._file.truncate(self._size)
+            self._remap()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _remap(self):
+        if self._map is not None:
+            self._map.close()
+
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = None
+
+        if size:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return size
+
+    def _load(self):
+        size = self._remap()
+
+        if size >= HEADER.size + TRAILER.size:
+            index_offset, magic = TRAILER.unpack(self._map[size - TRAILER.size : size])
+
+            if magic == INDEX_MAGIC and index_offset < size:
+                _, flags, key, data_offset, data_length = self._entry(index_offset)
+
+                if key == INDEX_KEY:
+                    data = self._data(data_offset, data_length, flags)
+                    index = json.loads(data[: -TRAILER.size])
+                    self._index = {k: tuple(v) for k, v in index.items()}
+                    self._size = size
+                    return
+
+        self._walk(0, size)
+
+    def _entry(self, offset: int) -> tuple:
+        magic, flags, key_length, data_length = HEADER.unpack(
+            self._map[offset : offset + HEADER.size]
+        )
+
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is corrupt at byte {offset}")
+
+        key_offset = offset + HEADER.size
+        key = self._map[key_offset : key_offset + key_length].decode()
+        data_offset = key_offset + key_length
+
+        return data_offset + data_length, flags, key, data_offset, data_length
+
+    def _walk(self, offset: int, size: int):
+        """Indexes the entries from offset on, stopping at a partly written
+        one"""
+
+        while offset + HEADER.size <= size:
+            end, flags, key, data_offset, data_length = self._entry(offset)
+
+            if end > size:
+                break
+
+            if key != INDEX_KEY:
+                self._index[key] = (data_offset, data_length, flags)
+
+            offset = end
+
+        self._size = offset
+
+    def _refresh(self):
+        # Picks up what's been appended since, by this or another process
+        size = os.fstat(self._file.fileno()).st_size
+
+        if size != self._size:
+            self._walk(self._size, self._remap())
+
+    def _data(self, offset: int, length: int, flags: int) -> bytes:
+        data = self._map[offset : offset + length]
+        return gzip.decompress(data) if flags & GZIP else data
+
+    def _append(self, key: str, data: bytes, flags: int) -> tuple:
+        encoded = key.encode()
+        offset = self._size
+
+        self._file.seek(0, os.SEEK_END)
+        self._file.write(HEADER.pack(MAGIC, flags, len(encoded), len(data)))
+        self._file.write(encoded)
+        self._file.write(data)
+        self._file.flush()
+
+        self._size = offset + HEADER.size + len(encoded) + len(data)
+
+        return offset, (offset + HEADER.size + len(encoded), len(data), flags)
+
+    def add(self, key: str, data: bytes, compress: bool = True):
+
+        with self._lock:
+            # Entries are only ever appended, a key added again is read from
+            # its latest entry
+            self._refresh()
+            _, self._index[key] = self._append(
+                key,
+                gzip.compress(data, 6) if compress else data,
+                GZIP if compress else 0,
+            )
+            self._appended = True
+
+    def get(self, key: str) -> bytes:
+        """The data added under key, or None if there isn't any"""
+
+        with self._lock:
+            if key not in self._index:
+                self._refresh()
+
+            if key not in self._index:
+                return None
+
+            if self._index[key][0] + self._index[key][1] > len(self._map or b""):
+                self._remap()
+
+            return self._data(*self._index[key])
+
+    def keys(self, prefix: str = "") -> list[str]:
+        """Keys in the order they were added"""
+
+        with self._lock:
+            self._refresh()
+            return [k for k in self._index if k.startswith(prefix)]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.keys()
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def close(self):
+
+        with self._lock:
+            if self._appended:
+                index = json.dumps(self._index).encode()
+                offset = self._size
+
+                # The trailer's offset is this entry's, known before writing
+                self._append(INDEX_KEY, index + TRAILER.pack(offset, INDEX_MAGIC), 0)
+
+            if self._map is not None:
+                self._map.close()
+
+            self._file.close()
+
+
+def open_bundle(export_path: Path, create: bool = False) -> Bundle:
+    """The export path's bundle, shared within the process. None if it doesn't
+    exist and create is False."""
+
+    path = export_path / BUNDLE
+
+    if not create and not path.exists():
+        return None
+
+    key = (os.getpid(), path.resolve())
+
+    with _bundles_lock:
+        if key not in _bundles or (create and _bundles[key].mode != "a"):
+            if key in _bundles:
+                _bundles[key].close()
+
+            export_path.mkdir(parents=True, exist_ok=True)
+            _bundles[key] = Bundle(path, "a" if create else "r")
+
+        return _bundles[key]
+
+
+@atexit.register
+def close_all():
+    """Closes the bundles opened in this process, indexing the ones written
+    to"""
+
+    with _bundles_lock:
+        for bundle in _bundles.values():
+            bundle.close()
+
+        _bundles.clear()
+
+
+def packed(file: Path, export_path: Path) -> bool:
+    directory, *rest = file.relative_to(export_path).parts
+
+    return (
+        bool(rest)
+        and (directory.startswith(PAGE_PREFIX) or directory in STAGES)
+        and file.suffix != ".part"
+        and ".sqlite" not in file.name
+    )
+
+
+def pack(export_path: Path, keep: bool = False) -> int:
+    """Adds the run's pages and stage outputs to its bundle, keyed by their
+    path within the export path"""
+
+    bundle = open_bundle(export_path, create=True)
+    files = sorted(
+        (f for f in export_path.rglob("*") if f.is_file() and packed(f, export_path)),
+        # Pages the manifest doesn't know about are listed in bundle order
+        key=lambda f: (f.parent, f.stat().st_mtime),
+    )
+
+    for file in files:
+        # Parquet is compressed already
+        bundle.add(
+            file.relative_to(export_path).as_posix(),
+            file.read_bytes(),
+            compress=file.suffix != ".parquet",
+        )
+
+    with _bundles_lock:
+        _bundles.pop((os.getpid(), (export_path / BUNDLE).resolve()), None)
+
+    bundle.close()
+
+    if not keep:
+        for file in files:
+            file.unlink()
+
+    return len(files)
+
+
+if __name__ == "__main__":
+
+    arg_parser = argparse.ArgumentParser(
+        description="Packs a run into its bundle, or reads from it"
+    )
+
+    arg_parser.add_argument(
+        "export_path",
+        type=Path,
+        help="filepath of the run's export directory",
+    )
+
+    arg_parser.add_argument(
+        "-k",
+        "--keep",
+        action="store_true",
+        help="keep the files after packing them",
+    )
+
+    arg_parser.add_argument(
+        "-l",
+        "--list",
+        action="store_true",
+        help="list the keys in the bundle instead of packing",
+    )
+
+    arg_parser.add_argument(
+        "-g",
+        "--get",
+        type=str,
+        help="write the data of a key to stdout instead of packing",
+    )
+
+    args = arg_parser.parse_args()
+
+    if args.list:
+        print("\n".join(open_bundle(args.export_path).keys()))
+    elif args.get:
+        os.write(1, open_bundle(args.export_path).get(args.get) or b"")
+    else:
+        print(f"{args.export_path}: {pack(args.export_path, args.keep)} files packed")
@@ -0,0 +1,115 @@
+# Remembers what each archived page extracted to, keyed by the page's content
+# hash and the version of the extractor, so re-running offline extraction only
+# parses new or changed pages. Set EXTRACT_CACHE to "on" to use it; it's kept
+# in <export_path>/EXTRACT_CACHE/extracted.sqlite, which isn't packed into the
+# run's bundle.
+
+import os
+import pickle
+import sqlite3
+import hashlib
+import inspect
+import importlib
+from pathlib import Path
+from functools import partial, lru_cache
+
+from common import archive
+
+
+COMMIT_EVERY = 100
+
+# Shared code that decides what a page extracts to: parsing, table specs,
+# vote icon decoders and how archived pages are read
+SHARED_MODULES = (
+    "common.parser",
+    "common.tables",
+    "common.ratings",
+    "common.archive",
+    "common.bundle",
+)
+
+
+def enabled() -> bool:
+    return (os.getenv("EXTRACT_CACHE") or "off").lower() == "on"
+
+
+@lru_cache(maxsize=None)
+def _source_hash(module_name: str) -> str:
+    try:
+        source = inspect.getsource(importlib.import_module(module_name))
+    except (TypeError, OSError):
+        source = module_name
+
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def version(func, kwargs: dict) -> str:
+    """Changes with the extractor's module source, the shared code in
+    SHARED_MODULES, the parser backend and the arguments it's called with"""
+
+    while isinstance(func, partial):
+        kwargs = func.keywords | kwargs
+        func = func.func
+
+    parts = [
+        func.__module__,
+        func.__qualname__,
+        _source_hash(func.__module__),
+        *map(_source_hash, SHARED_MODULES),
+        os.getenv("HTML_PARSER") or "",
+        repr(sorted(kwargs.items())),
+    ]
+
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+
+def key(file: Path, func, kwargs: dict) -> str:
+    content_hash = hashlib.sha256(archive.read_bytes(file)).hexdigest()
+
+    return f"{content_hash}-{version(func, kwargs)}"
+
+
+class Cache:
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS extracted (key TEXT PRIMARY KEY, result BLOB)"
+        )
+        self._uncommitted = 0
+
+    def get(self, key: str):
+        """The cached result, or None if the page hasn't been extracted yet"""
+
+        row = self._conn.execute(
+            "SELECT result FROM extracted WHERE key = ?", (key,)
+        ).fetchone()
+
+        return pickle.loads(row[0]) if row else None
+
+    def put(self, key: str, result):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO extracted VALUES (?, ?)",
+            (key, pickle.dumps(result, pickle.HIGHEST_PROTOCOL)),
+        )
+        self._uncommitted += 1
+
+        if self._uncommitted >= COMMIT_EVERY:
+            self.commit()
+
+    def commit(self):
+        self._conn.commit()
+        self._uncommitted = 0
+
+    def close(self):
+        self.commit()
+        self._conn.close()
+
+
+def for_file(file: Path) -> Path:
+    """Archived pages live in <export_path>/HTML_FILES*, and the cache next to
+    them in <export_path>/EXTRACT_CACHE"""
+
+    return file.parent.parent / "EXTRACT_CACHE" / "extracted.sqlite"
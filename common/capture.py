@@ -0,0 +1,168 @@
+# Reads the JSON responses a page receives through the Chrome DevTools
+# Protocol, so widgets backed by XHR/fetch calls don't have to be scrolled and
+# re-parsed to get at their data.
+
+import re
+import json
+import time
+import base64
+import weakref
+from datetime import datetime
+from pathlib import Path
+from collections.abc import Generator
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+
+from common import driver_pool
+
+
+CAPABILITIES = {"goog:loggingPrefs": {"performance": "ALL"}}
+
+# Responses whose bodies haven't finished loading, kept per driver between calls
+_pending = weakref.WeakKeyDictionary()
+
+
+def checkout(arguments=driver_pool.DEFAULT_ARGUMENTS) -> webdriver.Chrome:
+    """Checks out a pooled driver that records its network traffic"""
+
+    chrome_driver = driver_pool.checkout(arguments, capabilities=CAPABILITIES)
+    chrome_driver.execute_cdp_cmd("Network.enable", {})
+
+    # Drops whatever the previous user of the driver left in the log
+    chrome_driver.get_log("performance")
+    _pending[chrome_driver] = {}
+
+    return chrome_driver
+
+
+def json_responses(
+    chrome_driver: webdriver.Chrome, url_pattern: str = ""
+) -> Generator[tuple[str, object]]:
+    """Yields (url, payload) for every finished JSON response since the last
+    call whose url matches `url_pattern`"""
+
+    responses = _pending.setdefault(chrome_driver, {})
+
+    for entry in chrome_driver.get_log("performance"):
+        message = json.loads(entry["message"])["message"]
+        params = message.get("params", {})
+
+        if message["method"] == "Network.responseReceived":
+            response = params["response"]
+
+            if "json" in response.get("mimeType", "") and re.search(
+                url_pattern, response["url"]
+            ):
+                responses[params["requestId"]] = response["url"]
+
+        elif message["method"] == "Network.loadingFinished":
+            url = responses.pop(params["requestId"], None)
+
+            if url is None:
+                continue
+
+            try:
+                body = chrome_driver.execute_cdp_cmd(
+                    "Network.getResponseBody", {"requestId": params["requestId"]}
+                )
+            except WebDriverException:
+                # Bodies are evicted once the page navigates away
+                continue
+
+            text = (
+                base64.b64decode(body["body"]).decode()
+                if body["base64Encoded"]
+                else body["body"]
+            )
+
+            try:
+                payload = json.loads(text)
+            except json.JSONDecodeError:
+                continue
+
+            yield url, payload
+
+
+def wait_for_json(
+    chrome_driver: webdriver.Chrome,
+    url_pattern: str = "",
+    timeout: float = 10,
+    idle: float = 1,
+) -> list[tuple[str, object]]:
+    """Collects JSON responses until none arrived for `idle` seconds after the
+    first one, or until `timeout`"""
+
+    captured = []
+    deadline = time.monotonic() + timeout
+    last_seen = None
+
+    while time.monotonic() < deadline:
+        received = list(json_responses(chrome_driver, url_pattern))
+
+        if received:
+            captured += received
+            last_seen = time.monotonic()
+        elif last_seen and time.monotonic() - last_seen >= idle:
+            break
+
+        time.sleep(0.1)
+
+    return captured
+
+
+def to_records(payload, columns: tuple[str, ...] = ()) -> list[dict]:
+    """Finds the tabular data in a JSON payload, either a list of objects or
+    an object of equally long columns. With `columns`, only tables that have
+    all of them are kept, which leaves out config and metadata payloads that
+    happen to be tabular."""
+
+    if isinstance(payload, list):
+        if payload and all(isinstance(p, dict) for p in payload):
+            return payload if all(set(columns) <= p.keys() for p in payload) else []
+
+        records = []
+        for p in payload:
+            records += to_records(p, columns)
+        return records
+
+    if not isinstance(payload, dict):
+        return []
+
+    table = {k: v for k, v in payload.items() if isinstance(v, list)}
+    lengths = {len(v) for v in table.values()}
+
+    if len(table) > 1 and len(lengths) == 1 and not any(
+        isinstance(i, (dict, list)) for v in table.values() for i in v
+    ):
+        if not set(columns) <= table.keys():
+            return []
+
+        return [dict(zip(table, row)) for row in zip(*table.values())]
+
+    records = []
+    for value in payload.values():
+        records += to_records(value, columns)
+    return records
+
+
+def save_json(
+    payload,
+    filepath: Path,
+    filename: str,
+    *additional_info,
+):
+
+    filepath.mkdir(exist_ok=True)
+
+    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
+
+    with open(
+        filepath
+        / (
+            f"{filename}_{'-'.join(map(str, additional_info))}"
+            f"{'-' if additional_info else ''}{timestamp}.json"
+        ),
+        "w",
+    ) as f:
+        json.dump(payload, f)
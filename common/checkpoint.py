@@ -0,0 +1,59 @@
+# Append-only journal of the units of work (candidate pages, states, sessions)
+# a scrape has finished, so a crashed run can resume where it stopped.
+
+import json
+import os
+import threading
+from pathlib import Path
+
+
+class Journal:
+
+    def __init__(self, export_path: Path, filename: str, resume: bool = False):
+        filepath = export_path / "CHECKPOINTS"
+        filepath.mkdir(parents=True, exist_ok=True)
+
+        self.path = filepath / f"{filename}.jsonl"
+        self._completed = {}
+        self._lock = threading.Lock()
+
+        if resume and self.path.exists():
+            with open(self.path, "r") as f:
+                lines = f.read().split("\n")
+
+            for line in lines:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # The line being written when the run died
+                    continue
+                self._completed[entry["unit"]] = entry["records"]
+
+            # Starts the next entry on a fresh line after a partial one
+            if lines[-1]:
+                with open(self.path, "a") as f:
+                    f.write("\n")
+        else:
+            self.path.unlink(missing_ok=True)
+
+    def __contains__(self, unit: str):
+        return unit in self._completed
+
+    def __getitem__(self, unit: str):
+        return self._completed[unit]
+
+    def __len__(self):
+        return len(self._completed)
+
+    def record(self, unit: str, records):
+        """Marks the unit as done along with what was extracted from it"""
+
+        line = json.dumps({"unit": unit, "records": records})
+
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+            self._completed[unit] = records
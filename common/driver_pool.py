@@ -0,0 +1,350 @@
+# Keeps pre-launched headless Chrome instances warm so that running several
+# groups in one process doesn't pay for a cold browser start per group.
+
+import os
+import time
+import atexit
+import threading
+import functools
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+
+from common import resources
+
+
+DEFAULT_ARGUMENTS = ("incognito", "headless")
+
+
+def chrome_options(
+    arguments=DEFAULT_ARGUMENTS, prefs: dict = None, capabilities: dict = None
+) -> Options:
+
+    options = Options()
+
+    for argument in arguments:
+        options.add_argument(argument)
+
+    if prefs:
+        options.add_experimental_option("prefs", prefs)
+
+    for name, value in (capabilities or {}).items():
+        options.set_capability(name, value)
+
+    return options
+
+
+def is_alive(driver: webdriver.Chrome):
+    try:
+        return bool(driver.window_handles)
+    except Exception:
+        return False
+
+
+def reset(driver: webdriver.Chrome):
+    """Closes extra tabs and clears the session so the next user starts clean"""
+
+    handles = driver.window_handles
+
+    for handle in handles[1:]:
+        driver.switch_to.window(handle)
+        driver.close()
+
+    driver.switch_to.window(handles[0])
+    driver.delete_all_cookies()
+    resources.unblock(driver)
+    driver.get("about:blank")
+
+
+class DriverPool:
+
+    def __init__(
+        self,
+        size: int = 1,
+        arguments=DEFAULT_ARGUMENTS,
+        prefs: dict = None,
+        capabilities: dict = None,
+        max_uses: int = 50,
+    ):
+        self.size = size
+        self.arguments = tuple(arguments)
+        self.prefs = prefs
+        self.capabilities = capabilities
+        self.max_uses = max_uses
+
+        self._idle = []
+        self._leased = {}
+        self._condition = threading.Condition()
+        self._closed = False
+
+        with ThreadPoolExecutor(max_workers=size) as executor:
+            self._idle += executor.map(lambda _: self._launch(), range(size))
+
+        self._uses = {id(driver): 0 for driver in self._idle}
+
+    # Launching, resetting and quitting Chrome take a while, so they're kept
+    # out of the lock and only their results are published under it
+
+    def _launch(self):
+        return webdriver.Chrome(
+            service=Service(),
+            options=chrome_options(self.arguments, self.prefs, self.capabilities),
+        )
+
+    def _discard(self, driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def _renew(self, driver, uses: int) -> tuple:
+        """The driver reset for its next user, or a new one in its place when
+        it's worn out or broken, with its number of uses"""
+
+        if uses < self.max_uses and is_alive(driver):
+            try:
+                reset(driver)
+                return driver, uses
+            except Exception:
+                pass
+
+        self._discard(driver)
+        return self._launch(), 0
+
+    def _publish(self, driver, uses: int):
+
+        with self._condition:
+            if not self._closed:
+                self._uses[id(driver)] = uses
+                self._idle.append(driver)
+                self._condition.notify()
+                return
+
+        self._discard(driver)
+
+    def _take_leaked(self) -> list[tuple]:
+        # A lease held by a thread that has already exited can never be
+        # checked in, so its driver is taken back. Called with the lock held.
+        leaked = [
+            driver for driver, owner in self._leased.items() if not owner.is_alive()
+        ]
+
+        for driver in leaked:
+            del self._leased[driver]
+
+        return [(driver, self._uses.pop(id(driver), 0)) for driver in leaked]
+
+    def reserve(self, size: int):
+        """Grows the pool to at least `size` drivers"""
+
+        with self._condition:
+            missing = size - self.size
+            if missing <= 0:
+                return
+            self.size = size
+
+        with ThreadPoolExecutor(max_workers=missing) as executor:
+            launched = list(executor.map(lambda _: self._launch(), range(missing)))
+
+        for driver in launched:
+            self._publish(driver, 0)
+
+    def checkout(self, timeout: float = None) -> webdriver.Chrome:
+
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        while True:
+            with self._condition:
+                if self._closed:
+                    raise RuntimeError("Driver pool is closed.")
+
+                leaked = self._take_leaked()
+
+                if not leaked:
+                    if self._idle:
+                        driver = self._idle.pop()
+                        uses = self._uses.pop(id(driver), 0)
+                        break
+
+                    remaining = deadline - time.monotonic() if deadline else 1
+
+                    if remaining <= 0:
+                        raise TimeoutError(
+                            "No driver was returned to the pool in time."
+                        )
+
+                    # Wakes up periodically to look for leases of exited threads
+                    self._condition.wait(min(remaining, 1))
+                    continue
+
+            for driver, uses in leaked:
+                self._publish(*self._renew(driver, uses))
+
+        if not is_alive(driver):
+            self._discard(driver)
+            driver, uses = self._launch(), 0
+
+        with self._condition:
+            if not self._closed:
+                self._uses[id(driver)] = uses + 1
+                self._leased[driver] = threading.current_thread()
+                return driver
+
+        self._discard(driver)
+        raise RuntimeError("Driver pool is closed.")
+
+    def checkin(self, driver: webdriver.Chrome):
+
+        with self._condition:
+            if driver not in self._leased:
+                return
+
+            del self._leased[driver]
+            uses = self._uses.pop(id(driver), 0)
+            closed = self._closed
+
+        if closed:
+            self._discard(driver)
+        else:
+            self._publish(*self._renew(driver, uses))
+
+    @contextmanager
+    def lease(self, timeout: float = None):
+        driver = self.checkout(timeout)
+        try:
+            yield driver
+        finally:
+            self.checkin(driver)
+
+    def leased_by(self, thread: threading.Thread):
+        with self._condition:
+            return [d for d, owner in self._leased.items() if owner is thread]
+
+    def close(self):
+
+        with self._condition:
+            self._closed = True
+            drivers = self._idle + list(self._leased)
+
+            self._idle.clear()
+            self._leased.clear()
+            self._uses.clear()
+            self._condition.notify_all()
+
+        for driver in drivers:
+            self._discard(driver)
+
+
+_pools: dict[tuple, DriverPool] = {}
+_pools_lock = threading.Lock()
+
+# Module of the scoped group main running on each thread
+_scope = threading.local()
+
+
+def get_pool(
+    arguments=DEFAULT_ARGUMENTS,
+    prefs: dict = None,
+    capabilities: dict = None,
+    size: int = None,
+):
+    """Returns the process-wide pool for the given Chrome configuration"""
+
+    key = (
+        tuple(arguments),
+        repr(sorted((prefs or {}).items())),
+        repr(sorted((capabilities or {}).items())),
+    )
+
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = DriverPool(
+                size or int(os.getenv("CHROME_POOL_SIZE") or 1),
+                arguments,
+                prefs,
+                capabilities,
+            )
+        pool = _pools[key]
+
+    if size:
+        pool.reserve(size)
+
+    return pool
+
+
+def checkout(
+    arguments=DEFAULT_ARGUMENTS,
+    prefs: dict = None,
+    capabilities: dict = None,
+    timeout: float = None,
+):
+    driver = get_pool(arguments, prefs, capabilities).checkout(timeout)
+
+    if os.getenv("CHROME_BLOCK_RESOURCES"):
+        group = getattr(_scope, "group", None)
+        resources.block(driver, resources.ALLOWLISTS.get(group, ()))
+
+    return driver
+
+
+def checkin(driver: webdriver.Chrome):
+    with _pools_lock:
+        pools = list(_pools.values())
+
+    for pool in pools:
+        pool.checkin(driver)
+
+
+@contextmanager
+def lease(
+    arguments=DEFAULT_ARGUMENTS,
+    prefs: dict = None,
+    capabilities: dict = None,
+    timeout: float = None,
+):
+    driver = checkout(arguments, prefs, capabilities, timeout)
+    try:
+        yield driver
+    finally:
+        checkin(driver)
+
+
+def scoped(func):
+    """Checks in every driver the wrapped call checked out and did not return"""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        thread = threading.current_thread()
+
+        with _pools_lock:
+            pools = list(_pools.values())
+
+        held = {id(d) for pool in pools for d in pool.leased_by(thread)}
+        group = getattr(_scope, "group", None)
+        _scope.group = func.__module__
+
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _scope.group = group
+
+            with _pools_lock:
+                pools = list(_pools.values())
+
+            for pool in pools:
+                for driver in pool.leased_by(thread):
+                    if id(driver) not in held:
+                        pool.checkin(driver)
+
+    return wrapper
+
+
+@atexit.register
+def close_all():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
@@ -0,0 +1,185 @@
+# Fetches server-rendered pages over plain HTTP and only falls back to a
+# browser when the content a group needs is rendered by JavaScript.
+
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Generator
+
+import urllib3
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from bs4 import BeautifulSoup
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+
+from common import driver_pool
+
+
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Encoding": "gzip, deflate",
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def new_session() -> requests.Session:
+    adapter = HTTPAdapter(
+        pool_connections=16,
+        pool_maxsize=16,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+        ),
+    )
+
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    return session
+
+
+def get_session() -> requests.Session:
+    """Returns the process-wide keep-alive session"""
+
+    global _session
+
+    with _session_lock:
+        if _session is None:
+            _session = new_session()
+
+        return _session
+
+
+def browser_session(chrome_driver, verify: bool = True) -> requests.Session:
+    """A session with the browser's cookies and user agent, for files that
+    are only served to the page the browser has open. verify=False is for
+    sites the browser itself is told to ignore certificate errors on."""
+
+    session = new_session()
+    session.headers["User-Agent"] = chrome_driver.execute_script(
+        "return navigator.userAgent"
+    )
+
+    for cookie in chrome_driver.get_cookies():
+        session.cookies.set(
+            cookie["name"],
+            cookie["value"],
+            domain=cookie.get("domain"),
+            path=cookie.get("path", "/"),
+        )
+
+    session.verify = verify
+
+    if not verify:
+        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+    return session
+
+
+def fetch(url, timeout: float = 30, **kwargs) -> str:
+    response = get_session().get(url, timeout=timeout, **kwargs)
+    response.raise_for_status()
+    return response.text
+
+
+def render(url, ready: str = None, timeout: float = 30) -> str:
+    """Loads the page in a pooled browser, waiting for `ready` if given"""
+
+    with driver_pool.lease() as chrome_driver:
+        chrome_driver.get(url)
+
+        if ready:
+            try:
+                WebDriverWait(chrome_driver, timeout).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, ready))
+                )
+            except TimeoutException:
+                print(f"Cannot find '{ready}' on {url}")
+
+        return chrome_driver.page_source
+
+
+def try_fetch(url, ready: str = None, timeout: float = 30) -> str | None:
+    """Returns the page over HTTP, or None when it fails or lacks `ready`"""
+
+    try:
+        html = fetch(url, timeout)
+    except requests.RequestException:
+        return None
+
+    if ready and BeautifulSoup(html, "html.parser").select_one(ready) is None:
+        return None
+
+    return html
+
+
+def page_source(url, ready: str = None, timeout: float = 30) -> str:
+    """Returns the page over HTTP when it already contains `ready`, otherwise
+    renders it in a browser"""
+
+    html = try_fetch(url, ready, timeout)
+
+    if html is None:
+        return render(url, ready, timeout)
+
+    return html
+
+
+def download(
+    url, filepath: Path, timeout: float = 60, session: requests.Session = None
+) -> Path:
+    """Streams the response to filepath, through a partial file so a failed
+    download isn't mistaken for a finished one. A file already downloaded is
+    kept."""
+
+    if filepath.exists():
+        return filepath
+
+    partial = filepath.with_name(filepath.name + ".part")
+    session = session or get_session()
+
+    with session.get(url, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+
+        with open(partial, "wb") as f:
+            for chunk in response.iter_content(1 << 16):
+                f.write(chunk)
+
+    partial.replace(filepath)
+    return filepath
+
+
+def download_all(
+    downloads: list[tuple[str, Path]],
+    workers: int = 8,
+    session: requests.Session = None,
+) -> Generator[Path | None]:
+    """Downloads (url, filepath) pairs concurrently over the session (the
+    pooled one by default), yielding each file in order as soon as it and the
+    ones before it are done, and None for the ones that failed"""
+
+    with ThreadPoolExecutor(workers) as executor:
+        futures = [
+            executor.submit(download, url, path, session=session)
+            for url, path in downloads
+        ]
+
+        for (url, _), future in zip(downloads, futures):
+            try:
+                yield future.result()
+            except requests.RequestException as e:
+                print(f"Cannot download {url}: {e}")
+                yield None
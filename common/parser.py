@@ -0,0 +1,522 @@
+# Builds the parse tree extractors read from, with a choice of backend. The
+# default stays "html.parser"; "lxml" is a faster tree builder behind the same
+# BeautifulSoup API, and "selectolax" is wrapped in a shim that covers the
+# find/select/get_text calls the extractors make.
+#
+# The backend is picked with the HTML_PARSER environment variable, so it
+# carries over to worker processes.
+#
+# Extractors that only read one part of the page can pass its selector as
+# `root`, and bs4 backends then only build that subtree.
+
+import os
+import re
+import sys
+import time
+import argparse
+import importlib
+from pathlib import Path
+from contextlib import contextmanager
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from common import archive, records
+
+
+BACKENDS = ("html.parser", "lxml", "selectolax")
+DEFAULT_BACKEND = "html.parser"
+
+# Tags whose text bs4 leaves out of get_text
+HIDDEN_TEXT = ("script", "style", "template")
+
+# Names Node looks up as child tags (soup.table.tbody), anything else isn't an
+# attribute of it
+TAGS = frozenset(
+    "a abbr address area article aside audio b bdi bdo blockquote body br button"
+    " canvas caption cite code col colgroup data dd del details dfn dialog div dl"
+    " dt em embed fieldset figcaption figure footer form h1 h2 h3 h4 h5 h6 head"
+    " header hr html i iframe img input ins kbd label legend li link main map mark"
+    " menu meta nav noscript object ol optgroup option output p picture pre"
+    " progress q s samp script section select small source span strong style sub"
+    " summary sup svg table tbody td template textarea tfoot th thead time title"
+    " tr u ul var video".split()
+)
+
+# A single compound selector made of a tag, an id, one class and attributes
+_COMPOUND = re.compile(r"([\w-]*)((?:#[\w-]+|\.[\w-]+|\[[^\]]+\])*)")
+_PARTS = re.compile(r"#([\w-]+)|\.([\w-]+)|\[([\w-]+)(?:=[\"']?([^\]\"']*)[\"']?)?\]")
+
+
+def get_backend() -> str:
+    backend = os.getenv("HTML_PARSER") or DEFAULT_BACKEND
+
+    if backend not in BACKENDS:
+        raise ValueError(
+            f"Unknown HTML_PARSER {backend!r}, expected one of {BACKENDS}"
+        )
+
+    return backend
+
+
+@contextmanager
+def using(backend: str):
+    previous = os.environ.get("HTML_PARSER")
+    os.environ["HTML_PARSER"] = backend
+
+    try:
+        yield
+    finally:
+        if previous is None:
+            os.environ.pop("HTML_PARSER", None)
+        else:
+            os.environ["HTML_PARSER"] = previous
+
+
+def strainer(selector: str) -> SoupStrainer:
+    """SoupStrainer for a selector like "table#id", "div.class" or
+    "div#id table", or None when it needs a full parse to match (several
+    classes, sibling combinators, pseudo-classes)"""
+
+    # Whatever "a b" or "a > b" match lies within an "a"
+    if not any(c in selector for c in ",+~"):
+        selector = re.split(r"\s*>\s*|\s+", selector.strip())[0]
+
+    match = _COMPOUND.fullmatch(selector.strip())
+
+    if match is None:
+        return None
+
+    name, rest = match.groups()
+    attrs = {}
+
+    for id_, class_, attr, value in _PARTS.findall(rest):
+        if id_:
+            attrs["id"] = id_
+        elif class_:
+            if "class" in attrs:
+                return None
+            attrs["class"] = class_
+        else:
+            attrs[attr] = value or True
+
+    if not (name or attrs):
+        return None
+
+    return SoupStrainer(name or None, attrs)
+
+
+def is_parsed(page_source) -> bool:
+    return isinstance(page_source, (BeautifulSoup, Node))
+
+
+def parse(page_source, root: str = None, backend: str = None):
+    """Parses the page unless it already is a parsed tree, so one tree can be
+    shared by the archiver and the extractor. With `root`, only the elements
+    matching it (and what's inside them) are kept"""
+
+    if is_parsed(page_source):
+        return page_source
+
+    backend = backend or get_backend()
+
+    if backend == "selectolax":
+        from selectolax.lexbor import LexborHTMLParser
+
+        # Lexbor parses the whole page faster than a strained bs4 parse
+        return Node(LexborHTMLParser(page_source).root)
+
+    parse_only = strainer(root) if root else None
+
+    return BeautifulSoup(page_source, backend, parse_only=parse_only)
+
+
+def _matches(wanted, value) -> bool:
+    if wanted is True:
+        return value is not None
+    if value is None:
+        return wanted is None or wanted is False
+    if isinstance(value, list):
+        # Multi-valued attributes (class) match on any one value or the whole
+        return any(_matches(wanted, v) for v in value) or _matches(
+            wanted, " ".join(value)
+        )
+    if isinstance(wanted, re.Pattern):
+        return wanted.search(value) is not None
+    if callable(wanted):
+        return wanted(value)
+    if isinstance(wanted, (list, tuple, set)):
+        return any(_matches(w, value) for w in wanted)
+    return wanted == value
+
+
+def _children(node):
+    child = node.child
+
+    while child is not None:
+        yield child
+        child = child.next
+
+
+def _siblings(node, step: str):
+    node = getattr(node, step)
+
+    while node is not None:
+        yield node
+        node = getattr(node, step)
+
+
+def _following(node):
+    """Nodes after node in document order, starting with its descendants"""
+
+    while node is not None:
+        if node.child is not None:
+            node = node.child
+        else:
+            while node is not None and node.next is None:
+                node = node.parent
+            node = node.next if node is not None else None
+
+        if node is not None:
+            yield node
+
+
+def _preceding(node):
+    """Nodes before node in document order, back to the document itself"""
+
+    while node is not None:
+        if node.prev is not None:
+            node = node.prev
+
+            while node.last_child is not None:
+                node = node.last_child
+        else:
+            node = node.parent
+
+        if node is not None and not node.is_document_node:
+            yield node
+
+
+def _wrap(node):
+    return Text(node) if node.is_text_node else Node(node)
+
+
+def _first(nodes, match):
+    for node in nodes:
+        if match(node):
+            return _wrap(node)
+
+    return None
+
+
+class Text(str):
+    """A text node, as bs4's NavigableString"""
+
+    def __new__(cls, node):
+        text = super().__new__(cls, node.text(deep=False))
+        text._node = node
+        return text
+
+    def __reduce__(self):
+        # Records hold it as plain text, the node doesn't leave the process
+        return str, (str(self),)
+
+    @property
+    def parent(self):
+        return Node(self._node.parent)
+
+    @property
+    def next_sibling(self):
+        return Node(self._node).next_sibling
+
+    @property
+    def previous_sibling(self):
+        return Node(self._node).previous_sibling
+
+    def find_next(self, *args, **kwargs):
+        return Node(self._node).find_next(*args, **kwargs)
+
+    def find_previous(self, *args, **kwargs):
+        return Node(self._node).find_previous(*args, **kwargs)
+
+    def find_next_sibling(self, *args, **kwargs):
+        return Node(self._node).find_next_sibling(*args, **kwargs)
+
+    def find_previous_sibling(self, *args, **kwargs):
+        return Node(self._node).find_previous_sibling(*args, **kwargs)
+
+
+class Node:
+    """The part of bs4's Tag interface the extractors use, on top of a
+    selectolax node"""
+
+    def __init__(self, node):
+        self._node = node
+
+    def __eq__(self, other):
+        return isinstance(other, Node) and self._node.mem_id == other._node.mem_id
+
+    def __hash__(self):
+        return self._node.mem_id
+
+    def __str__(self):
+        return self._node.html
+
+    def __repr__(self):
+        return f"<Node {self.name}>"
+
+    def __getattr__(self, name):
+        # soup.table.tbody and the like
+        if name not in TAGS:
+            raise AttributeError(
+                f"{type(self).__name__!r} object has no attribute {name!r}"
+            )
+        return self.find(name)
+
+    def __getitem__(self, key):
+        return self.attrs[key]
+
+    def __iter__(self):
+        return iter(self.contents)
+
+    @property
+    def name(self) -> str:
+        return self._node.tag
+
+    @property
+    def attrs(self) -> dict:
+        attrs = dict(self._node.attributes)
+
+        if attrs.get("class") is not None:
+            attrs["class"] = attrs["class"].split()
+
+        return attrs
+
+    def get(self, key, default=None):
+        return self.attrs.get(key, default)
+
+    def has_attr(self, key) -> bool:
+        return key in self._node.attributes
+
+    @property
+    def parent(self):
+        parent = self._node.parent
+        return Node(parent) if parent is not None else None
+
+    def _descendants(self):
+        stack = list(reversed(list(_children(self._node))))
+
+        while stack:
+            node = stack.pop()
+            yield node
+            stack += reversed(list(_children(node)))
+
+    @property
+    def contents(self) -> list:
+        return [
+            _wrap(c) for c in _children(self._node) if not c.is_comment_node
+        ]
+
+    @property
+    def children(self):
+        return iter(self.contents)
+
+    def _sibling(self, step: str):
+        for node in _siblings(self._node, step):
+            if not node.is_comment_node:
+                return _wrap(node)
+
+        return None
+
+    @property
+    def next_sibling(self):
+        return self._sibling("next")
+
+    @property
+    def previous_sibling(self):
+        return self._sibling("prev")
+
+    def _strings(self):
+        for node in self._descendants():
+            if node.is_text_node and node.parent.tag not in HIDDEN_TEXT:
+                yield node.text(deep=False)
+
+    def get_text(self, separator: str = "", strip: bool = False) -> str:
+        strings = self._strings()
+
+        if strip:
+            strings = (s.strip() for s in strings)
+            strings = (s for s in strings if s)
+
+        return separator.join(strings)
+
+    @property
+    def text(self) -> str:
+        return self.get_text()
+
+    @property
+    def string(self):
+        contents = self.contents
+
+        if len(contents) != 1:
+            return None
+        if isinstance(contents[0], str):
+            return contents[0]
+        return contents[0].string
+
+    @property
+    def stripped_strings(self):
+        return (s.strip() for s in self._strings() if s.strip())
+
+    def select(self, selector: str) -> list:
+        return [Node(n) for n in self._node.css(selector)]
+
+    def select_one(self, selector: str):
+        node = self._node.css_first(selector)
+        return Node(node) if node is not None else None
+
+    @staticmethod
+    def _matcher(name, attrs, string, kwargs):
+        # find("div", "score") is a class lookup
+        if attrs and not isinstance(attrs, dict):
+            attrs = {"class": attrs}
+
+        attrs = dict(attrs or {}) | {
+            ("class" if k == "class_" else k): v for k, v in kwargs.items()
+        }
+
+        # find(string=...) alone finds text nodes, with a tag or attributes it
+        # finds tags whose .string matches
+        if string is not None and name is None and not attrs:
+            return lambda node: node.is_text_node and _matches(
+                string, node.text(deep=False)
+            )
+
+        def match(node) -> bool:
+            if not node.is_element_node:
+                return False
+            if name is not None and not _matches(name, node.tag):
+                return False
+            if string is not None and not _matches(string, Node(node).string):
+                return False
+            if not attrs:
+                return True
+
+            node_attrs = Node(node).attrs
+            return all(_matches(v, node_attrs.get(k)) for k, v in attrs.items())
+
+        return match
+
+    def find_all(
+        self,
+        name=None,
+        attrs=None,
+        recursive: bool = True,
+        string=None,
+        limit: int = None,
+        **kwargs,
+    ) -> list:
+
+        match = self._matcher(name, attrs, string, kwargs)
+        nodes = self._descendants() if recursive else _children(self._node)
+
+        found = []
+
+        for node in nodes:
+            if match(node):
+                found.append(_wrap(node))
+
+                if limit and len(found) >= limit:
+                    break
+
+        return found
+
+    def find(self, name=None, attrs=None, recursive: bool = True, **kwargs):
+        found = self.find_all(name, attrs, recursive, limit=1, **kwargs)
+        return found[0] if found else None
+
+    def find_next(self, name=None, attrs=None, string=None, **kwargs):
+        match = self._matcher(name, attrs, string, kwargs)
+        return _first(_following(self._node), match)
+
+    def find_previous(self, name=None, attrs=None, string=None, **kwargs):
+        match = self._matcher(name, attrs, string, kwargs)
+        return _first(_preceding(self._node), match)
+
+    def find_next_sibling(self, name=None, attrs=None, string=None, **kwargs):
+        match = self._matcher(name, attrs, string, kwargs)
+        return _first(_siblings(self._node, "next"), match)
+
+    def find_previous_sibling(self, name=None, attrs=None, string=None, **kwargs):
+        match = self._matcher(name, attrs, string, kwargs)
+        return _first(_siblings(self._node, "prev"), match)
+
+    def decompose(self):
+        self._node.decompose()
+
+
+def compare(module_name: str, files: list[Path], backend: str) -> bool:
+    """Runs the module's extract_files with html.parser and with `backend`, and
+    reports whether the records match and how long each took"""
+
+    module = importlib.import_module(module_name)
+    results = {}
+
+    for b in (DEFAULT_BACKEND, backend):
+        with using(b):
+            start = time.perf_counter()
+            # extract_files returns an index of records or streams them
+            results[b] = dict(
+                enumerate(records.iter_records(module.extract_files(files)))
+            )
+            print(f"{b}: {time.perf_counter() - start:.2f}s")
+
+    expected, actual = results[DEFAULT_BACKEND], results[backend]
+    mismatched = [
+        i for i in expected.keys() | actual.keys() if expected.get(i) != actual.get(i)
+    ]
+
+    for i in sorted(mismatched)[:10]:
+        print(f"record {i}: {expected.get(i)!r} != {actual.get(i)!r}")
+
+    print(f"{len(expected) - len(mismatched)}/{len(expected)} records match")
+
+    return not mismatched
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description=(
+            "Checks that an extractor returns the same records from archived "
+            "pages with another parser backend"
+        )
+    )
+
+    parser.add_argument(
+        "module",
+        type=str,
+        help="module with the extract_files function (eg. national._2526.extract)",
+    )
+
+    parser.add_argument(
+        "-hp",
+        "--html_path",
+        type=Path,
+        required=True,
+        help="filepath to HTML directory",
+    )
+
+    parser.add_argument(
+        "-b",
+        "--backend",
+        type=str,
+        choices=BACKENDS,
+        default="lxml",
+        help="parser backend to compare with html.parser",
+    )
+
+    args = parser.parse_args()
+
+    # Pages in the store or the run's bundle as well as files
+    files = archive.html_files(args.html_path)
+    sys.exit(0 if compare(args.module, files, args.backend) else 1)
@@ -0,0 +1,123 @@
+# Turns the icons a scorecard uses for each vote (their classes, titles or
+# image names) into rating symbols. A group registers its methodology once and
+# gets back a Decoder, which has the methodology compiled into a single lookup
+# and decodes a cell, a row or a whole table with it.
+
+from collections.abc import Iterable
+
+
+REGISTERED = {}
+
+
+def _tokens(value) -> list[str]:
+    if value is None:
+        return []
+
+    # class is already split into a list, other attributes are matched whole
+    return [value] if isinstance(value, str) else list(value)
+
+
+class Decoder:
+
+    def __init__(
+        self,
+        methodology: dict[str, str],
+        translate: dict[str, str] = None,
+        default: str = None,
+    ):
+        """
+        methodology: class, title or image name to its rating
+        translate: rating to symbol, for methodologies that name their ratings
+            (eg. "Support") rather than giving symbols
+        default: what a vote the methodology doesn't cover decodes to
+        """
+
+        self.methodology = methodology
+        self.translate = translate
+        self.default = default
+
+        # Each token's symbol and its place in the methodology, which decides
+        # between tokens when an icon matches more than one
+        self._lookup = {}
+
+        for rank, (token, rating) in enumerate(methodology.items()):
+            symbol = translate.get(rating) if translate is not None else rating
+
+            if symbol is not None:
+                self._lookup[token] = (rank, symbol)
+
+    def __getstate__(self):
+        return {k: v for k, v in self.__dict__.items() if not k.startswith("_")}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def get(self, token: str, default=...) -> str:
+        found = self._lookup.get(token)
+
+        if found is not None:
+            return found[1]
+
+        return self.default if default is ... else default
+
+    def find(self, tokens: Iterable[str], default=...) -> str:
+        """The symbol of whichever token comes first in the methodology"""
+
+        found = min(filter(None, map(self._lookup.get, tokens)), default=None)
+
+        if found is not None:
+            return found[1]
+
+        return self.default if default is ... else default
+
+    def search(self, text: str, default=...) -> str:
+        """The symbol of the one token found within text (eg. an image name
+        with a size suffix), with exact names looked up directly"""
+
+        found = self._lookup.get(text)
+
+        if found is None:
+            matches = [token for token in self._lookup if token in text]
+            found = self._lookup[matches[0]] if len(matches) == 1 else None
+
+        if found is not None:
+            return found[1]
+
+        return self.default if default is ... else default
+
+    def decode(self, element, attrs: tuple[str] = ("class",), default=...) -> str:
+        """The symbol of an element's icon, trying its attributes in order"""
+
+        if element is not None:
+            for attr in attrs:
+                symbol = self.find(_tokens(element.get(attr)), None)
+
+                if symbol is not None:
+                    return symbol
+
+        return self.default if default is ... else default
+
+    def decode_row(self, elements, attrs: tuple[str] = ("class",)) -> list[str]:
+        return [self.decode(element, attrs) for element in elements]
+
+    def decode_table(self, rows, attrs: tuple[str] = ("class",)) -> list[list[str]]:
+        return [self.decode_row(elements, attrs) for elements in rows]
+
+    def rating_string(self, elements, attrs: tuple[str] = ("class",)) -> str:
+        return "".join(s for s in self.decode_row(elements, attrs) if s is not None)
+
+
+def register(
+    name: str,
+    methodology: dict[str, str],
+    translate: dict[str, str] = None,
+    default: str = None,
+) -> Decoder:
+    """Compiles a group's methodology, keeping it under name"""
+
+    REGISTERED[name] = Decoder(methodology, translate, default)
+    return REGISTERED[name]
+
+
+def get(name: str) -> Decoder:
+    return REGISTERED[name]
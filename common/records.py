@@ -0,0 +1,228 @@
+# Saves extracted records in chunks, so a stream of records (see
+# batch.iter_records) is written without being held in memory at once.
+#
+# Records are written as CSV for review, or as Parquet (with pyarrow) for
+# handing off between stages. Parquet columns are typed by the stage's schema
+# in SCHEMAS, so the next stage reads them back with the same types on every
+# run instead of guessing from text.
+
+import io
+import csv
+import math
+import pickle
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from itertools import islice
+from collections.abc import Generator, Iterable
+
+import pandas
+
+from common import bundle
+
+
+CHUNKSIZE = 10_000
+FORMATS = ("csv", "parquet")
+
+# Column types of each stage's Parquet files, by the directory they're saved
+# in. Columns a stage doesn't declare are text.
+SCHEMAS = {
+    "EXTRACT_FILES": {},
+    "TRANSFORMED_FILES": {},
+    "MATCHED_FILES": {"candidate_id": "int64"},
+    "QUERY_FILES": {"candidate_id": "int64", "state_id": "string"},
+}
+
+
+def iter_records(records) -> Iterable[dict]:
+    """Records from an index to record dict (what extract returns) or from any
+    iterable of records"""
+
+    return records.values() if isinstance(records, dict) else records
+
+
+def batches(records, size: int = CHUNKSIZE) -> Generator[list[dict]]:
+    """Lists of up to `size` records, for transforms that work a batch at a
+    time"""
+
+    records = iter(iter_records(records))
+
+    while batch := list(islice(records, size)):
+        yield batch
+
+
+def _cells(record: dict) -> dict:
+    # Missing values (NaN or NA from pandas) are written as empty cells, like
+    # to_csv
+    return {k: "" if _is_missing(v) else v for k, v in record.items()}
+
+
+def _is_missing(value) -> bool:
+    return (
+        value is None
+        or value is pandas.NA
+        or (isinstance(value, float) and math.isnan(value))
+    )
+
+
+def _to_int(value) -> int:
+    # Integer columns come out of pandas as floats when they have gaps
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError(value)
+    return int(value)
+
+
+def _to_bool(value) -> bool:
+    if isinstance(value, str):
+        return {"true": True, "false": False}[value.strip().lower()]
+    return bool(value)
+
+
+CONVERTERS = {
+    "string": lambda v: v if isinstance(v, str) else str(v),
+    "int64": _to_int,
+    "float64": float,
+    "bool": _to_bool,
+}
+
+
+def _schema(columns: list[str], types: dict[str, str]):
+    import pyarrow
+
+    return pyarrow.schema(
+        [(c, pyarrow.type_for_alias(types.get(c, "string"))) for c in columns]
+    )
+
+
+def _write_parquet(
+    records: Iterable[dict],
+    columns: list[str],
+    types: dict[str, str],
+    records_filepath: Path,
+    chunksize: int,
+):
+    import pyarrow
+    import pyarrow.parquet
+
+    schema = _schema(columns, types)
+    converters = {c: CONVERTERS[types.get(c, "string")] for c in columns}
+
+    def cells(record: dict) -> dict:
+        converted = {}
+
+        for k, v in record.items():
+            try:
+                converted[k] = None if _is_missing(v) else converters[k](v)
+            except (ValueError, KeyError, TypeError):
+                raise ValueError(
+                    f"{v!r} in column {k!r} isn't {types.get(k, 'string')}"
+                ) from None
+
+        return converted
+
+    with pyarrow.parquet.ParquetWriter(records_filepath, schema) as writer:
+        for batch in batches(records, chunksize):
+            writer.write_table(
+                pyarrow.Table.from_pylist(list(map(cells, batch)), schema=schema)
+            )
+
+
+def _spill(records: Iterable[dict], file) -> list[str]:
+    """Writes the records to `file` one by one, returning the columns in the
+    order they first appear"""
+
+    columns = {}
+
+    for record in records:
+        columns.update(dict.fromkeys(record))
+        pickle.dump(record, file, pickle.HIGHEST_PROTOCOL)
+
+    return list(columns)
+
+
+def _unspill(file) -> Generator[dict]:
+    file.seek(0)
+
+    while True:
+        try:
+            yield pickle.load(file)
+        except EOFError:
+            return
+
+
+def save_records(
+    records,
+    filename: str,
+    filepath: Path,
+    *additional_info,
+    chunksize: int = CHUNKSIZE,
+    format: str = "csv",
+    schema: dict[str, str] = None,
+) -> Path:
+    """Writes the records to filepath as CSV or Parquet. Parquet columns take
+    their types from the stage's entry in SCHEMAS, updated with `schema`
+    (column to "string", "int64", "float64" or "bool")."""
+
+    filepath.mkdir(exist_ok=True)
+    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
+
+    records_filepath = filepath / (
+        f"{filename}_{'-'.join(map(str, additional_info))}"
+        f"{'-' if additional_info else ''}{timestamp}.{format}"
+    )
+
+    with tempfile.TemporaryFile() as spilled:
+
+        # The header needs every column, so a stream is spilled to disk first
+        # and read back once its columns are known
+        if isinstance(records, dict):
+            columns = list(
+                dict.fromkeys(k for record in records.values() for k in record)
+            )
+            read = records.values
+        else:
+            columns = _spill(records, spilled)
+            read = lambda: _unspill(spilled)
+
+        if format == "parquet":
+            types = SCHEMAS.get(filepath.name, {}) | (schema or {})
+            _write_parquet(read(), columns, types, records_filepath, chunksize)
+            return records_filepath
+
+        with open(records_filepath, "w", newline="") as f:
+            writer = csv.DictWriter(f, columns, lineterminator="\n")
+
+            if columns:
+                writer.writeheader()
+
+            for batch in batches(read(), chunksize):
+                writer.writerows(map(_cells, batch))
+
+    return records_filepath
+
+
+def load_records(file: Path, **csv_kwargs) -> pandas.DataFrame:
+    """Reads records saved by save_records, in either format, from the file or
+    from the run's bundle once it's been packed. csv_kwargs are passed to
+    pandas.read_csv."""
+
+    source = file
+
+    if not file.exists():
+        run_bundle = bundle.open_bundle(file.parent.parent)
+        data = run_bundle.get(f"{file.parent.name}/{file.name}") if run_bundle else None
+        source = io.BytesIO(data) if data is not None else file
+
+    if file.suffix != ".parquet":
+        return pandas.read_csv(source, **csv_kwargs)
+
+    # Nullable dtypes keep integer and boolean columns with gaps as they were
+    # written, rather than as floats and objects
+    df = pandas.read_parquet(source, dtype_backend="numpy_nullable")
+
+    # Missing text reads back as "" where the CSV would have been read that way
+    if csv_kwargs.get("keep_default_na") is False:
+        text = [c for c in df.columns if pandas.api.types.is_string_dtype(df[c])]
+        df = df.fillna({c: "" for c in text})
+
+    return df
@@ -0,0 +1,59 @@
+# Blocks the page resources extractors never read (images, fonts, stylesheets,
+# media and trackers) through the Chrome DevTools Protocol.
+
+from selenium import webdriver
+
+
+def _extensions(*extensions):
+    # Matches the file with or without a query string
+    return [f"*.{e}{suffix}" for e in extensions for suffix in ("", "?*")]
+
+
+BLOCKED_PATTERNS = {
+    "image": _extensions("png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico"),
+    "font": _extensions("woff", "woff2", "ttf", "otf", "eot"),
+    "stylesheet": _extensions("css"),
+    "media": _extensions("mp4", "webm", "mov", "mp3", "m3u8"),
+    "tracker": [
+        "*google-analytics.com*",
+        "*googletagmanager.com*",
+        "*doubleclick.net*",
+        "*googlesyndication.com*",
+        "*facebook.net*",
+        "*connect.facebook.com*",
+        "*hotjar.com*",
+        "*clarity.ms*",
+        "*youtube.com/embed*",
+        "*player.vimeo.com*",
+    ],
+}
+
+# Resource types (or single url patterns) that groups need to render properly,
+# keyed by the module of their extract.main
+ALLOWLISTS = {
+    # The state map is clicked by position and only lays out with its CSS
+    "national._1110.extract": ("stylesheet",),
+    # Retool only renders the rows that fit its styled, virtualized grid
+    "national._3308.extract": ("stylesheet",),
+}
+
+
+def blocked_patterns(allow=()) -> list[str]:
+    return [
+        pattern
+        for resource_type, patterns in BLOCKED_PATTERNS.items()
+        if resource_type not in allow
+        for pattern in patterns
+        if pattern not in allow
+    ]
+
+
+def block(chrome_driver: webdriver.Chrome, allow=()):
+    chrome_driver.execute_cdp_cmd("Network.enable", {})
+    chrome_driver.execute_cdp_cmd(
+        "Network.setBlockedURLs", {"urls": blocked_patterns(allow)}
+    )
+
+
+def unblock(chrome_driver: webdriver.Chrome):
+    chrome_driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": []})
@@ -0,0 +1,219 @@
+# Declarative extraction of scorecard tables. A Table is described once
+# (where the table is, where its headers and rows are, which rows and cells to
+# skip, how to read particular columns) and compiled into the lookups that
+# turn a page into records, on whichever parser backend is selected.
+
+import sys
+import time
+import types
+import argparse
+import importlib
+import subprocess
+from pathlib import Path
+from collections.abc import Callable
+
+from common import archive, parser
+
+
+REPO = Path(__file__).parent.parent
+
+
+def get_text(cell) -> str:
+    return cell.get_text(strip=True)
+
+
+def _compile(selector: str) -> Callable:
+    """Selectors made of plain tag names ("thead th") become find().find_all()
+    chains, which is what hand-written extractors do and is faster than
+    matching CSS. Others go through select()."""
+
+    names = selector.split()
+
+    if not all(n.isalnum() for n in names):
+        return lambda element: element.select(selector)
+
+    *path, last = names
+
+    def lookup(element):
+        for name in path:
+            element = element.find(name)
+
+            if element is None:
+                return []
+
+        return element.find_all(last)
+
+    return lookup
+
+
+class Table:
+
+    def __init__(
+        self,
+        root: str = "table",
+        headers: str = "thead th",
+        rows: str = "tbody tr",
+        cells: str = "td",
+        header_slice: slice = slice(None),
+        row_slice: slice = slice(None),
+        cell_slice: slice = slice(None),
+        text: Callable = get_text,
+        transforms: dict[str, Callable] = None,
+        every_table: bool = False,
+    ):
+        """
+        root: selector of the table, also used to parse only that part of the
+            page
+        headers, rows: selectors within the table
+        cells: selector within a row
+        header_slice, row_slice, cell_slice: which of the found headers, rows
+            and cells to keep (eg. slice(1, None) when the first one is a label)
+        text: reads a cell into its value
+        transforms: reads the cells of particular columns instead of `text`,
+            keyed by header
+        every_table: extracts every table matching root, one after the other
+        """
+
+        self.root = root
+        self.headers = headers
+        self.rows = rows
+        self.cells = cells
+        self.header_slice = header_slice
+        self.row_slice = row_slice
+        self.cell_slice = cell_slice
+        self.text = text
+        self.transforms = transforms or {}
+        self.every_table = every_table
+
+        self._headers = _compile(headers)
+        self._rows = _compile(rows)
+        self._cells = _compile(cells)
+
+    def __getstate__(self):
+        # The compiled lookups are closures, rebuilt on the worker's side
+        return {k: v for k, v in self.__dict__.items() if not k.startswith("_")}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def extract_table(self, table, **additional_info) -> list[dict]:
+        headers = [get_text(h) for h in self._headers(table)[self.header_slice]]
+
+        # One reader per column, resolved once per table rather than per cell
+        readers = [self.transforms.get(h, self.text) for h in headers]
+
+        return [
+            {
+                header: read(cell)
+                for header, read, cell in zip(
+                    headers, readers, self._cells(row)[self.cell_slice]
+                )
+            }
+            | additional_info
+            for row in self._rows(table)[self.row_slice]
+        ]
+
+    def __call__(self, page_source, **additional_info) -> list[dict]:
+        soup = parser.parse(page_source, self.root)
+
+        if not self.every_table:
+            return self.extract_table(soup.select_one(self.root), **additional_info)
+
+        extracted = []
+
+        for table in soup.select(self.root):
+            extracted += self.extract_table(table, **additional_info)
+
+        return extracted
+
+
+def baseline(module_name: str, revision: str = None) -> Callable:
+    """The module's hand-written extract from before it used a TABLE: as of
+    `revision`, or by default the commit before the one that added TABLE"""
+
+    path = Path(*module_name.split(".")).with_suffix(".py").as_posix()
+
+    def git(*args) -> str:
+        return subprocess.run(
+            ["git", *args], cwd=REPO, capture_output=True, text=True, check=True
+        ).stdout
+
+    if revision is None:
+        added = git("log", "--format=%H", "-S", "TABLE = tables.Table", "--", path)
+
+        if not added:
+            raise ValueError(f"{module_name} has never had a TABLE.")
+
+        revision = f"{added.split()[-1]}^"
+
+    module = types.ModuleType(f"{module_name}@{revision}")
+    exec(compile(git("show", f"{revision}:{path}"), path, "exec"), module.__dict__)
+
+    return module.extract
+
+
+def benchmark(
+    module_name: str, files: list[Path], repeat: int = 3, revision: str = None
+) -> bool:
+    """Times the module's TABLE against its hand-written extract from before
+    (see baseline), and checks that both return the same records"""
+
+    table = importlib.import_module(module_name).TABLE
+    pages = [archive.read_html(file) for file in files]
+
+    results = {}
+
+    for name, func in (("by hand", baseline(module_name, revision)), ("table", table)):
+        start = time.perf_counter()
+
+        for _ in range(repeat):
+            results[name] = [func(p) for p in pages]
+
+        print(f"{name}: {(time.perf_counter() - start) / repeat:.3f}s per run")
+
+    same = results["by hand"] == results["table"]
+    print("records match" if same else "records differ")
+
+    return same
+
+
+if __name__ == "__main__":
+
+    arg_parser = argparse.ArgumentParser(
+        description="Benchmarks a module's TABLE against hand-written extraction"
+    )
+
+    arg_parser.add_argument(
+        "module",
+        type=str,
+        help="module with a TABLE (eg. national._2526.extract)",
+    )
+
+    arg_parser.add_argument(
+        "-hp",
+        "--html_path",
+        type=Path,
+        required=True,
+        help="filepath to HTML directory",
+    )
+
+    arg_parser.add_argument(
+        "-r",
+        "--repeat",
+        type=int,
+        default=3,
+        help="number of runs to average",
+    )
+
+    arg_parser.add_argument(
+        "-b",
+        "--baseline",
+        type=str,
+        help="git revision of the hand-written extract (default: the one "
+        "before the module's TABLE)",
+    )
+
+    args = arg_parser.parse_args()
+
+    files = archive.html_files(args.html_path)
+    sys.exit(0 if benchmark(args.module, files, args.repeat, args.baseline) else 1)
@@ -0,0 +1,136 @@
+# Waits for page conditions instead of sleeping for a fixed worst case. Each
+# site's observed latency is recorded and used to size later timeouts.
+
+import time
+from collections import defaultdict, deque
+from urllib.parse import urlparse
+
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+
+DEFAULT_TIMEOUT = 10
+MIN_TIMEOUT = 2
+MAX_TIMEOUT = 60
+
+# Seconds each recent wait took, per site
+_latencies: dict[str, deque] = defaultdict(lambda: deque(maxlen=50))
+
+
+def timeout_for(site: str) -> float:
+    """Three times the 95th percentile of the site's observed latency"""
+
+    observed = sorted(_latencies[site])
+
+    if not observed:
+        return DEFAULT_TIMEOUT
+
+    p95 = observed[int(0.95 * (len(observed) - 1))]
+    return min(max(p95 * 3, MIN_TIMEOUT), MAX_TIMEOUT)
+
+
+def until(
+    chrome_driver: webdriver.Chrome,
+    condition,
+    timeout: float = None,
+    site: str = None,
+):
+    """Same as WebDriverWait.until, with the timeout sized from the site's
+    observed latency unless given"""
+
+    site = site or urlparse(chrome_driver.current_url).netloc
+    timeout = timeout or timeout_for(site)
+    start = time.monotonic()
+
+    # Only successful waits are recorded. Conditions that never happen (e.g. a
+    # search without results) say nothing about how fast the site is.
+    result = WebDriverWait(chrome_driver, timeout, poll_frequency=0.1).until(
+        condition
+    )
+
+    _latencies[site].append(time.monotonic() - start)
+    return result
+
+
+def until_replaced(
+    chrome_driver: webdriver.Chrome,
+    selector: str,
+    action,
+    timeout: float = None,
+    site: str = None,
+):
+    """Runs `action` (e.g. a click that loads another page or re-renders part
+    of this one) and waits until it has replaced the element at `selector`"""
+
+    element = chrome_driver.find_element(By.CSS_SELECTOR, selector)
+    action()
+
+    return until(chrome_driver, staleness(element), timeout, site)
+
+
+def stable(script: str, quiet: float = 0.5, *args):
+    """True once the value returned by `script` hasn't changed for `quiet`
+    seconds"""
+
+    state = {"value": None, "since": None}
+
+    def condition(chrome_driver):
+        value = chrome_driver.execute_script(script, *args)
+        now = time.monotonic()
+
+        if state["since"] is None or value != state["value"]:
+            state.update(value=value, since=now)
+            return False
+
+        return now - state["since"] >= quiet
+
+    return condition
+
+
+def dom_stable(selector: str = "body", quiet: float = 0.5):
+    return stable(
+        """
+        const element = document.querySelector(arguments[0]);
+        return element ? element.innerHTML.length : -1;
+        """,
+        quiet,
+        selector,
+    )
+
+
+def network_idle(quiet: float = 0.5):
+    document_complete = stable(
+        """
+        return [
+            document.readyState,
+            performance.getEntriesByType("resource").length,
+        ];
+        """,
+        quiet,
+    )
+
+    def condition(chrome_driver):
+        return (
+            document_complete(chrome_driver)
+            and chrome_driver.execute_script("return document.readyState")
+            == "complete"
+        )
+
+    return condition
+
+
+def scroll_settled(quiet: float = 0.25):
+    return stable("return [window.scrollX, window.scrollY];", quiet)
+
+
+def element_count_changed(locator: tuple[str, str], count: int):
+    def condition(chrome_driver):
+        return len(chrome_driver.find_elements(*locator)) != count
+
+    return condition
+
+
+def staleness(element):
+    return EC.staleness_of(element)
@@ -1,6 +1,5 @@
 # This is the webscrape for American Civil Liberties Union (ACLU), sig_id=1378
 
-import time
 import pandas
 from datetime import datetime
 from pathlib import Path
@@ -10,11 +9,16 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
 from bs4 import BeautifulSoup
 
 
 URL = "https://www.aclu.org/scorecard/?filter=all"
 
+# Seconds to wait for more states to load after scrolling to the end
+SCROLL_TIMEOUT = 0.75
+
 
 def extract(page_source):
 
@@ -103,23 +107,28 @@ def main(export_path):
 
     html = chrome_driver.find_element(By.TAG_NAME, "html")
 
+    def count_states(driver):
+        return driver.execute_script(
+            """
+            return document.querySelectorAll('.state-results').length
+        """
+        )
+
     counter = 0
 
     while True:
 
         html.send_keys(Keys.END)
-        time.sleep(0.75)
 
-        temp_counter = chrome_driver.execute_script(
-            """
-            return document.querySelectorAll('.state-results').length
-        """
-        )
-
-        if not (temp_counter - counter):
+        # Stops once scrolling to the end doesn't load more states
+        try:
+            WebDriverWait(chrome_driver, SCROLL_TIMEOUT, poll_frequency=0.1).until(
+                lambda driver: count_states(driver) > counter
+            )
+        except TimeoutException:
             break
 
-        counter += temp_counter - counter
+        counter = count_states(chrome_driver)
 
     save_html(chrome_driver.page_source, export_path)
     extracted = extract(chrome_driver.page_source)
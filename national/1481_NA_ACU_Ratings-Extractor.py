@@ -1,11 +1,12 @@
 # This is the webscraping script for American Conservative Union (ACU), sig_id=1481
 
 
+import csv
 from pathlib import Path
 from datetime import datetime
 from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-import pandas
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
@@ -40,6 +41,9 @@ STATES = ['AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'FL', 'GA',
           'SD', 'TN', 'TX', 'UT', 'VT', 'VA', 'WA', 'WV', 'WI', 'WY',
           'US']
 
+COLUMNS = ['sig_candidate_id', 'name_party', 'other_info', 'rating',
+           'lifetime_rating', 'state']
+
 
 def url_query(**filters):
     query = '&'.join((f"{k}={v}" for k, v in filters.items()))
@@ -51,8 +55,6 @@ def extract(page_source, **additional_info):
     soup = BeautifulSoup(page_source, 'html.parser')
     rows = soup.find_all('div', {'class': 'sc-hzDkRC'})
 
-    records = []
-
     for row in rows:
 
         name_party, other_info = row.find(
@@ -60,27 +62,49 @@ def extract(page_source, **additional_info):
         rating = row.find('span', {'class': 'sc-gipzik'})
         lifetime_rating = row.find('div', {'class': 'sc-gPEVay'})
 
-        records.append({'sig_candidate_id': row.a['href'].rpartition('/')[-1],
-                        'name_party': name_party.get_text(strip=True),
-                        'other_info': other_info.get_text(strip=True),
-                        'rating': rating.get_text(strip=True) if rating else None,
-                        'lifetime_rating': lifetime_rating.get_text(strip=True) if lifetime_rating else None,
-                        } | additional_info)
+        yield {'sig_candidate_id': row.a['href'].rpartition('/')[-1],
+               'name_party': name_party.get_text(strip=True),
+               'other_info': other_info.get_text(strip=True),
+               'rating': rating.get_text(strip=True) if rating else None,
+               'lifetime_rating': lifetime_rating.get_text(strip=True) if lifetime_rating else None,
+               } | additional_info
 
-    return records
 
+def extract_files(files):
+    """Records of saved pages (Ratings_<state>-<timestamp>.html), one page at
+    a time"""
 
-def save_extract(extracted: list[dict], filepath, *additional_info):
+    for file in files:
+        state = file.stem.partition('_')[-1].split('-')[0]
 
-    filepath = Path(filepath) / 'EXTRACT_FILES'
-    filepath.mkdir(exist_ok=True)
+        with open(file, 'r') as f:
+            yield from extract(f.read(), state=state)
 
-    timestamp = datetime.strftime(datetime.now(), '%Y-%m-%d-%H%M%S-%f')
 
-    df = pandas.DataFrame.from_records(extracted)
-    df.to_csv(
-        filepath / f"Ratings-Extract_{'-'.join(map(str, additional_info))}"
-                   f"{'-' if additional_info else ''}{timestamp}.csv", index=False)
+def save_extract(extracted, filepath, *additional_info):
+    """Writes the records as they come, nothing is written if there are
+    none"""
+
+    f = None
+
+    try:
+        for record in extracted:
+            if f is None:
+                filepath = Path(filepath) / 'EXTRACT_FILES'
+                filepath.mkdir(exist_ok=True)
+
+                timestamp = datetime.strftime(datetime.now(), '%Y-%m-%d-%H%M%S-%f')
+
+                f = open(filepath / f"Ratings-Extract_{'-'.join(map(str, additional_info))}"
+                                    f"{'-' if additional_info else ''}{timestamp}.csv",
+                         'w', newline='')
+                writer = csv.DictWriter(f, COLUMNS, lineterminator='\n')
+                writer.writeheader()
+
+            writer.writerow(record)
+    finally:
+        if f is not None:
+            f.close()
 
 
 def save_html(page_source, filepath, *additional_info):
@@ -96,7 +120,7 @@ def save_html(page_source, filepath, *additional_info):
         f.write(str(soup))
 
 
-def main(year, export_dir, states):
+def extract_states(year, export_dir, states, p_bar=None):
 
     chrome_service = Service()
     chrome_options = Options()
@@ -105,37 +129,68 @@ def main(year, export_dir, states):
     chrome_driver = webdriver.Chrome(
         service=chrome_service, options=chrome_options)
 
-    extracted = []
+    extracted_by_state = {}
+
+    try:
+        for state in states:
+
+            url_with_query = url_query(year=year, state=state, limit='all', level='state')
+
+            try:
+                chrome_driver.get(url_with_query)
+
+                WebDriverWait(chrome_driver, 30).until(
+                    EC.visibility_of_element_located(
+                        (By.XPATH, "//div[@class='sc-kXeGPI lmbiWA']"))
+                )
+
+                extracted_by_state[state] = list(
+                    extract(chrome_driver.page_source, state=state))
+                save_html(chrome_driver.page_source, export_dir, state)
+
+            except TimeoutException:
+                print(f"{state} has a timeout.")
+                continue
+
+            # The states the shard already has are kept either way
+            except Exception as e:
+                print(f"{state} failed: {e!r}")
+                continue
 
-    p_bar = tqdm(states, desc='State')
+            if p_bar is not None:
+                p_bar.update(1)
+    finally:
+        chrome_driver.quit()
 
-    for state in states:
-        
-        p_bar.desc = state
+    return extracted_by_state
 
-        url_with_query = url_query(year=year, state=state, limit='all', level='state')
 
-        chrome_driver.get(url_with_query)
+def main(year, export_dir, states, workers=1):
 
-        try:
-            WebDriverWait(chrome_driver, 30).until(
-                EC.visibility_of_element_located(
-                    (By.XPATH, "//div[@class='sc-kXeGPI lmbiWA']"))
-            )
+    # Each worker drives its own browser over every n-th state
+    shards = [states[i::workers] for i in range(workers)]
 
-        except TimeoutException:
-            print(f"{state} has a timeout.")
-            continue
+    p_bar = tqdm(total=len(states), desc='State')
 
-        extracted += extract(chrome_driver.page_source, state=state)
-        save_html(chrome_driver.page_source, export_dir, state)
+    extracted_by_state = {}
 
-        p_bar.update(1)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(extract_states, year, export_dir, shard, p_bar): shard
+            for shard in shards if shard}
 
-    if extracted:
-        save_extract(extracted, export_dir)
+        for future in as_completed(futures):
+            try:
+                extracted_by_state.update(future.result())
+            except Exception as e:
+                # eg. a browser that didn't start
+                print(f"{', '.join(futures[future])} failed: {e!r}")
 
-    chrome_driver.quit()
+    # Merged in the order the states were requested, regardless of which
+    # worker finished first
+    save_extract(
+        (record for state in states for record in extracted_by_state.get(state, [])),
+        export_dir)
 
 
 if __name__ == '__main__':
@@ -147,8 +202,16 @@ if __name__ == '__main__':
     parser.add_argument('-y', '--year', type=int, required=True)
     parser.add_argument('-d', '--exportdir', type=Path, required=True)
     parser.add_argument('-s', '--states', nargs='*')
-    parser.add_argument('-f', '--files', type=Path)
+    parser.add_argument('-f', '--files', type=Path,
+                        help='directory of saved pages to extract instead of browsing')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='number of browsers the states are spread across')
 
     args = parser.parse_args()
 
-    main(args.year, args.exportdir, states=args.states or STATES)
+    if args.files:
+        html_files = sorted(args.files.glob('*.html'), key=lambda x: x.stat().st_ctime)
+        save_extract(extract_files(html_files), args.exportdir)
+    else:
+        main(args.year, args.exportdir, states=args.states or STATES,
+             workers=max(args.workers, 1))
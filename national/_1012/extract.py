@@ -3,16 +3,14 @@ from pathlib import Path
 
 
 import pandas
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.common.exceptions import NoSuchElementException
+from common import archive, batch, driver_pool, parser
+from common.archive import save_html
 
 
 URL = "https://scorecard.lcv.org/members-of-congress"
@@ -20,7 +18,7 @@ URL = "https://scorecard.lcv.org/members-of-congress"
 
 def extract(page_source, **additional_info):
 
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
     table = soup.find("div", {"id": "moc-list-table"})
     table_body = table.find("div", {"id": "moc-list-table-data"})
 
@@ -50,39 +48,7 @@ def extract(page_source, **additional_info):
 
 def extract_files(files: list):
 
-    extracted = []
-
-    for file in files:
-
-        with open(file, "r") as f:
-            extracted += extract(f.read())
-
-    records_extracted = dict(enumerate(extracted))
-
-    return records_extracted
-
-
-def save_html(
-    page_source,
-    filepath: Path,
-    filename: str,
-    *additional_info,
-):
-
-    filepath.mkdir(exist_ok=True)
-
-    soup = BeautifulSoup(page_source, "html.parser")
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    with open(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.html"
-        ),
-        "w",
-    ) as f:
-        f.write(str(soup))
+    return batch.iter_records(extract, files)
 
 
 def save_records(extracted: dict[int, dict[str, str]], filepath, filename):
@@ -98,23 +64,15 @@ def save_records(extracted: dict[int, dict[str, str]], filepath, filename):
     )
 
 
+@driver_pool.scoped
 def main(filename: str, export_path: Path, html_path: Path = None):
 
     if html_path:
-        html_files = filter(
-            lambda f: f.name.endswith(".html"),
-            (export_path / html_path).iterdir(),
-        )
-        records_extracted = extract_files(
-            sorted(html_files, key=lambda x: x.stat().st_ctime)
-        )
+        html_files = archive.html_files(export_path / html_path)
+        records_extracted = extract_files(html_files)
         return records_extracted
 
-    chrome_service = Service()
-    chrome_options = Options()
-    chrome_options.add_argument("incognito")
-    # chrome_options.add_argument("headless")
-    chrome_driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
+    chrome_driver = driver_pool.checkout(("incognito",))
 
     chrome_driver.get(URL)
 
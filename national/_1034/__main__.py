@@ -5,38 +5,17 @@ import argparse
 from pathlib import Path
 from datetime import datetime
 
-import pandas
 from dotenv import load_dotenv
 
 from national._1034.extract import main as extract
 from national._1034.transform import main as transform
 from national._1034.match import main as match
+from common.records import FORMATS, load_records, save_records
 
 
 FILENAME = f"{datetime.strftime(datetime.now(), '%Y')}_NA_NRA_"
 
 
-def save_records(
-    records: dict[int, dict[str, str]],
-    filename: str,
-    filepath: Path,
-    *additional_info,
-):
-
-    filepath.mkdir(exist_ok=True)
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    df = pandas.DataFrame.from_dict(records, orient="index")
-    df.to_csv(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.csv"
-        ),
-        index=False,
-    )
-
-
 def main():
 
     parser = argparse.ArgumentParser()
@@ -76,6 +55,14 @@ def main():
         action="store_true",
     )
 
+    parser.add_argument(
+        "-o",
+        "--output_format",
+        choices=FORMATS,
+        default="csv",
+        help="format of the saved files, parquet keeps column types between stages",
+    )
+
     args = parser.parse_args()
 
     load_dotenv()
@@ -97,6 +84,7 @@ def main():
             records_extracted,
             FILENAME + "Ratings-Extract",
             args.export_path / "EXTRACT_FILES",
+            format=args.output_format,
         )
 
         records_transformed = transform(records_extracted)
@@ -104,6 +92,7 @@ def main():
             records_transformed,
             FILENAME + "Ratings-Transformed",
             args.export_path / "TRANSFORMED_FILES",
+            format=args.output_format,
         )
 
         records_matched, records_election_candidates = match(
@@ -114,12 +103,14 @@ def main():
             records_matched,
             FILENAME + "Ratings-Matched",
             args.export_path / "MATCHED_FILES",
+            format=args.output_format,
         )
 
         save_records(
             records_election_candidates,
             FILENAME + "VSDB-Candidates",
             args.export_path / "QUERY_FILES",
+            format=args.output_format,
         )
 
     elif args.extract and not (any((args.transform, args.match))):
@@ -129,6 +120,7 @@ def main():
             records_extracted,
             FILENAME + "Ratings-Extract",
             args.export_path / "EXTRACT_FILES",
+            format=args.output_format,
         )
 
     elif args.transform and not (any((args.extract, args.match))):
@@ -136,7 +128,7 @@ def main():
             parser.print_help()
             parser.error("Please specify the filepath of the spreadsheet.")
 
-        df_extracted = pandas.read_csv(args.file)
+        df_extracted = load_records(args.file)
         records_extracted = df_extracted.to_dict(orient="index")
 
         records_transformed = transform(records_extracted)
@@ -144,6 +136,7 @@ def main():
             records_transformed,
             FILENAME + "Ratings-Transformed",
             args.export_path / "TRANSFORMED_FILES",
+            format=args.output_format,
         )
 
     elif args.match and not any((args.extract, args.transform)):
@@ -151,7 +144,7 @@ def main():
             parser.print_help()
             parser.error("Please specify the filepath of the spreadsheet.")
 
-        df_transformed = pandas.read_csv(
+        df_transformed = load_records(
             args.file, na_values="nan", keep_default_na=False
         )
         records_transformed = df_transformed.to_dict(orient="index")
@@ -164,12 +157,14 @@ def main():
             records_matched,
             FILENAME + "Ratings-Matched",
             args.export_path / "MATCHED_FILES",
+            format=args.output_format,
         )
 
         save_records(
             records_election_candidates,
             FILENAME + "VSDB-Candidates",
             args.export_path / "QUERY_FILES",
+            format=args.output_format,
         )
 
 
@@ -1,5 +1,4 @@
 import json
-import time
 from pathlib import Path
 from datetime import datetime
 
@@ -10,6 +9,11 @@ from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+from common import archive, batch, parser, wait
+from common.archive import save_html
 
 
 URL = "https://www.nrapvf.org"
@@ -18,7 +22,7 @@ PDF_OLD_PREFIX = "NRA-PVF _ Grades _ "
 
 def extract(page_source, **additional_info):
 
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
     election_groups = soup.find_all("div", {"class": "election-group"})
 
     extracted = []
@@ -76,39 +80,7 @@ def extract(page_source, **additional_info):
 
 def extract_files(files: list):
 
-    extracted = []
-
-    for file in files:
-
-        with open(file, "r") as f:
-            extracted += extract(f.read())
-
-    records_extracted = dict(enumerate(extracted))
-
-    return records_extracted
-
-
-def save_html(
-    page_source,
-    filepath: Path,
-    filename: str,
-    *additional_info,
-):
-
-    filepath.mkdir(exist_ok=True)
-
-    soup = BeautifulSoup(page_source, "html.parser")
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    with open(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.html"
-        ),
-        "w",
-    ) as f:
-        f.write(str(soup))
+    return batch.extract_files(extract, files)
 
 
 def save_pdf(
@@ -124,9 +96,9 @@ def save_pdf(
     first_button = driver.find_element(By.CLASS_NAME, "btn-print-modal")
     first_button.click()
 
-    time.sleep(1)
-
-    second_button = driver.find_element(By.ID, "btn-print-voter-card")
+    second_button = wait.until(
+        driver, EC.element_to_be_clickable((By.ID, "btn-print-voter-card"))
+    )
     second_button.click()
 
     timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
@@ -138,13 +110,11 @@ def save_pdf(
         f"{'-' if additional_info else ''}{timestamp}"
     )
 
-    time_waited = 0
-
-    while not (filepath / pdf_filename).exists() and time_waited <= 10:
-        time.sleep(2)
-        time_waited += 2
-
-    if time_waited > 10 and not (filepath / pdf_filename).exists():
+    try:
+        WebDriverWait(driver, 10, poll_frequency=0.1).until(
+            lambda _: (filepath / pdf_filename).exists()
+        )
+    except TimeoutException:
         print(f"TIMEOUT WARNING: '{pdf_filename}' is expected, but cannot be found.")
 
     (filepath / pdf_filename).replace(filepath / f"{new_pdf_filename}.pdf")
@@ -162,13 +132,8 @@ def get_active_states(page_source):
 def main(filename, export_path: Path, html_path: Path = None):
 
     if html_path:
-        html_files = filter(
-            lambda f: f.name.endswith(".html"),
-            (export_path / html_path).iterdir(),
-        )
-        records_extracted = extract_files(
-            sorted(html_files, key=lambda x: x.stat().st_ctime)
-        )
+        html_files = archive.html_files(export_path / html_path)
+        records_extracted = extract_files(html_files)
         return records_extracted
 
     chrome_service = Service()
@@ -197,7 +162,12 @@ def main(filename, export_path: Path, html_path: Path = None):
     chrome_driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
     chrome_driver.get(URL)
 
-    time.sleep(3)
+    wait.until(
+        chrome_driver,
+        EC.presence_of_element_located(
+            (By.CSS_SELECTOR, "svg.us-map .state.state_hasElection")
+        ),
+    )
 
     extracted = []
 
@@ -1,11 +1,5 @@
-import time
-from datetime import datetime
 from pathlib import Path
 
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
@@ -14,6 +8,8 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.common.exceptions import TimeoutException
 
 from tqdm import tqdm
+from common import archive, batch, driver_pool, parser, wait
+from common.archive import save_html
 
 
 URL = "https://www.peaceaction.org/know-the-score/"
@@ -21,7 +17,7 @@ URL = "https://www.peaceaction.org/know-the-score/"
 
 def extract(page_source, **additional_info):
 
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
     results = soup.select(".legislator-state-results .legislator-result")
 
     extracted = []
@@ -42,39 +38,7 @@ def extract(page_source, **additional_info):
 
 def extract_files(files: list[Path]):
 
-    extracted = []
-
-    for file in files:
-
-        with open(file, "r") as f:
-            extracted += extract(f.read())
-
-    records_extracted = dict(enumerate(extracted))
-
-    return records_extracted
-
-
-def save_html(
-    page_source,
-    filepath: Path,
-    filename: str,
-    *additional_info,
-):
-
-    filepath.mkdir(exist_ok=True)
-
-    soup = BeautifulSoup(page_source, "html.parser")
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    with open(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.html"
-        ),
-        "w",
-    ) as f:
-        f.write(str(soup))
+    return batch.iter_records(extract, files)
 
 
 def click_and_check(chrome_driver, map_path, prev_results):
@@ -86,17 +50,22 @@ def click_and_check(chrome_driver, map_path, prev_results):
         btn.click()
         """
     )
-    time.sleep(0.75)
+    wait.until(chrome_driver, wait.scroll_settled())
 
     actions.move_to_element(map_path).click().perform()
-    time.sleep(2)
 
     try:
-        state_results = WebDriverWait(chrome_driver, 10).until(
+        # The results are replaced rather than updated for every state
+        if prev_results is not None:
+            wait.until(chrome_driver, wait.staleness(prev_results))
+
+        state_results = wait.until(
+            chrome_driver,
             EC.visibility_of_element_located(
                 (By.CSS_SELECTOR, ".legislator-state-results")
-            )
+            ),
         )
+        wait.until(chrome_driver, wait.dom_stable(".legislator-state-results"))
     except TimeoutException:
         return None
 
@@ -106,32 +75,23 @@ def click_and_check(chrome_driver, map_path, prev_results):
     return state_results
 
 
+@driver_pool.scoped
 def main(filename: str, export_path: Path, html_path: Path = None):
 
     if html_path:
-        html_files = filter(
-            lambda f: f.name.endswith(".html"),
-            (export_path / html_path).iterdir(),
-        )
-        records_extracted = extract_files(
-            sorted(html_files, key=lambda x: x.stat().st_ctime)
-        )
+        html_files = archive.html_files(export_path / html_path)
+        records_extracted = extract_files(html_files)
         return records_extracted
 
-    chrome_service = Service()
-    chrome_options = Options()
-    chrome_options.add_argument("incognito")
-    chrome_options.add_argument("headless")
-    chrome_driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
+    chrome_driver = driver_pool.checkout()
     chrome_driver.set_window_size(1920, 1080)
 
     chrome_driver.get(URL)
 
-    time.sleep(3)
-
     WebDriverWait(chrome_driver, 10).until(
         EC.visibility_of_element_located((By.CSS_SELECTOR, "#legislator-map"))
     )
+    wait.until(chrome_driver, wait.dom_stable("#legislator-map"))
 
     # close overlay
     ActionChains(chrome_driver).send_keys(Keys.ESCAPE).perform()
@@ -151,7 +111,6 @@ def main(filename: str, export_path: Path, html_path: Path = None):
         p_bar_initial.desc = state_id
 
         state_results = click_and_check(chrome_driver, path, old_state_results)
-        time.sleep(1.5)
 
         if state_results is None:
             not_extracted.append(path)
@@ -177,7 +136,6 @@ def main(filename: str, export_path: Path, html_path: Path = None):
         p_bar_second.desc = state_id
 
         state_results = click_and_check(chrome_driver, path, old_state_results)
-        time.sleep(1.5)
 
         if state_results is None:
             print("State not Extracted: ", state_id)
@@ -1,11 +1,6 @@
-from datetime import datetime
 from pathlib import Path
 from urllib.parse import urlparse, urljoin
 
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
@@ -14,6 +9,8 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.common.exceptions import NoSuchElementException
 
 from tqdm import trange
+from common import batch, driver_pool, parser
+from common.archive import save_html
 
 
 URL = "https://cdfactioncouncil.org/scorecard_legislator/"
@@ -21,7 +18,7 @@ URL = "https://cdfactioncouncil.org/scorecard_legislator/"
 
 def extract(page_source, **additional_info):
 
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
     articles = soup.select("div#posts-container article.post")
 
     extracted = []
@@ -49,41 +46,10 @@ def extract(page_source, **additional_info):
 
 def extract_files(files: list[Path]):
 
-    extracted = []
-
-    for file in files:
-
-        with open(file, "r") as f:
-            extracted += extract(f.read())
-
-    records_extracted = dict(enumerate(extracted))
-
-    return records_extracted
-
-
-def save_html(
-    page_source,
-    filepath: Path,
-    filename: str,
-    *additional_info,
-):
-
-    filepath.mkdir(exist_ok=True)
-
-    soup = BeautifulSoup(page_source, "html.parser")
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    with open(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.html"
-        ),
-        "w",
-    ) as f:
-        f.write(str(soup))
+    return batch.iter_records(extract, files)
 
 
+@driver_pool.scoped
 def main(filename: str, export_path: Path, html_path: Path = None):
 
     # if html_path:
@@ -96,11 +62,7 @@ def main(filename: str, export_path: Path, html_path: Path = None):
     #     )
     #     return records_extracted
 
-    chrome_service = Service()
-    chrome_options = Options()
-    chrome_options.add_argument("incognito")
-    chrome_options.add_argument("headless")
-    chrome_driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
+    chrome_driver = driver_pool.checkout()
 
     chrome_driver.get(URL)
 
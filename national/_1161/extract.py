@@ -1,17 +1,14 @@
-import time
-from datetime import datetime
 from pathlib import Path
 
 from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.support.ui import Select
 
 from tqdm import tqdm
+from common import batch, driver_pool, tables, wait
+from common.archive import save_html
 
 
 URL = "https://aflcio.org/scorecard/legislators"
@@ -40,61 +37,20 @@ def get_current_page(page_source):
     return link.get_text(strip=True)
 
 
-def extract(page_source, **additional_info):
-
-    soup = BeautifulSoup(page_source, "html.parser")
-    table = soup.find("table")
-
-    def extract_table(table):
-
-        headers = [th.get_text(strip=True) for th in table.thead.find_all("th")[1:]]
-        rows = [tr.find_all("td")[1:] for tr in table.tbody.find_all("tr")]
+TABLE = tables.Table(header_slice=slice(1, None), cell_slice=slice(1, None))
 
-        def get_text(x):
-            return x.get_text(strip=True)
 
-        return [
-            dict(zip(headers, map(get_text, row))) | additional_info for row in rows
-        ]
+def extract(page_source, **additional_info):
 
-    return extract_table(table)
+    return TABLE(page_source, **additional_info)
 
 
 def extract_files(files: list):
 
-    extracted = []
-
-    for file in files:
-
-        with open(file, "r") as f:
-            extracted += extract(f.read())
-
-    return extracted
-
-
-def save_html(
-    page_source,
-    filepath: Path,
-    filename: str,
-    *additional_info,
-):
-
-    filepath.mkdir(exist_ok=True)
-
-    soup = BeautifulSoup(page_source, "html.parser")
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    with open(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.html"
-        ),
-        "w",
-    ) as f:
-        f.write(str(soup))
+    return batch.extract_records(extract, files)
 
 
+@driver_pool.scoped
 def main(
     filename: str,
     export_path: Path,
@@ -102,11 +58,7 @@ def main(
     year: list[str] = None,
 ):
 
-    chrome_service = Service()
-    chrome_options = Options()
-    chrome_options.add_argument("incognito")
-    chrome_options.add_argument("headless")
-    chrome_driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
+    chrome_driver = driver_pool.checkout()
 
     chrome_driver.get(URL)
 
@@ -130,8 +82,11 @@ def main(
     extracted = []
 
     for i in range(0, len(offices)):
-        chrome_driver.execute_script("arguments[0].click()", offices[i])
-        time.sleep(2)
+        wait.until_replaced(
+            chrome_driver,
+            TABLE.root,
+            lambda: chrome_driver.execute_script("arguments[0].click()", offices[i]),
+        )
 
         p_bar = tqdm(
             total=get_last_page(chrome_driver.page_source),
@@ -154,11 +109,10 @@ def main(
             )
 
             if next_button:
-                next_button.click()
+                wait.until_replaced(chrome_driver, TABLE.root, next_button.click)
                 p_bar.update(1)
             else:
                 break
-            time.sleep(1)
 
         office_container = chrome_driver.find_element(
             By.XPATH, ("//div[@class='scorecard-list-nav legislator-list-nav']")
@@ -1,11 +1,10 @@
 import os
 import argparse
 from pathlib import Path
-from datetime import datetime
 
-import pandas
 from dotenv import load_dotenv
 from national._125.extract import main as extract
+from common.records import FORMATS, load_records, save_records
 
 
 def transform(*foo):
@@ -21,27 +20,6 @@ def match(*foo):
 FILENAME = f"_NA_USCPR_"
 
 
-def save_records(
-    records: dict[int, dict[str, str]],
-    filename: str,
-    filepath: Path,
-    *additional_info,
-):
-
-    filepath.mkdir(exist_ok=True)
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    df = pandas.DataFrame.from_dict(records, orient="index")
-    df.to_csv(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.csv"
-        ),
-        index=False,
-    )
-
-
 def main():
 
     parser = argparse.ArgumentParser()
@@ -96,6 +74,14 @@ def main():
         help="to match only",
     )
 
+    parser.add_argument(
+        "-o",
+        "--output_format",
+        choices=FORMATS,
+        default="csv",
+        help="format of the saved files, parquet keeps column types between stages",
+    )
+
     args = parser.parse_args()
 
     load_dotenv()
@@ -117,9 +103,12 @@ def main():
             records_extracted,
             FILENAME + "Ratings-Extract",
             args.export_path / "EXTRACT_FILES",
+            format=args.output_format,
         )
 
-        # records_transformed = transform(records_extracted)
+        # records_transformed = transform(
+        #     load_records(extracted_file).to_dict(orient="index")
+        # )
         # save_records(
         #     records_transformed,
         #     FILENAME + "Ratings-Transformed",
@@ -151,6 +140,7 @@ def main():
             records_extracted,
             FILENAME + "Ratings-Extract",
             args.export_path / "EXTRACT_FILES",
+            format=args.output_format,
         )
 
     elif args.transform and not (any((args.extract, args.match))):
@@ -158,7 +148,7 @@ def main():
             parser.print_help()
             parser.error("Please specify the filepath of the spreadsheet.")
 
-        df_extracted = pandas.read_csv(args.file)
+        df_extracted = load_records(args.file)
         records_extracted = df_extracted.to_dict(orient="index")
 
         records_transformed = transform(records_extracted)
@@ -166,6 +156,7 @@ def main():
             records_transformed,
             FILENAME + "Ratings-Transformed",
             args.export_path / "TRANSFORMED_FILES",
+            format=args.output_format,
         )
 
     elif args.match and not any((args.extract, args.transform)):
@@ -173,7 +164,7 @@ def main():
             parser.print_help()
             parser.error("Please specify the filepath of the spreadsheet.")
 
-        df_transformed = pandas.read_csv(
+        df_transformed = load_records(
             args.file, na_values="nan", keep_default_na=False
         )
         records_transformed = df_transformed.to_dict(orient="index")
@@ -186,12 +177,14 @@ def main():
             records_matched,
             FILENAME + "Ratings-Matched",
             args.export_path / "MATCHED_FILES",
+            format=args.output_format,
         )
 
         save_records(
             records_election_candidates,
             FILENAME + "VSDB-Candidates",
             args.export_path / "QUERY_FILES",
+            format=args.output_format,
         )
 
 
@@ -1,10 +1,5 @@
-from datetime import datetime
 from pathlib import Path
 
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
@@ -14,14 +9,17 @@ from selenium.common.exceptions import NoSuchElementException
 from unidecode import unidecode
 
 from tqdm import tqdm
+from common import batch, driver_pool, parser, ratings
+from common.archive import save_html
 
 
 URL = "https://www.uscpraction.org/scorecard"
+VOTES = ratings.register("125", {"bg-green": "+", "bg-light-red": "-", "bg-": "*"})
 
 
 def extract(page_source, **additional_info):
 
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
 
     info_elements = soup.select("div.w-\\[66\\.66\\%\\] > div")
 
@@ -40,26 +38,22 @@ def extract(page_source, **additional_info):
 
     def calculate_record(el):
 
-        good_votes = el.select("span.bg-green")
-        bad_votes = el.select("span.bg-light-red")
-        neutral_vote = el.select("span.bg-")
-
         good_count = 0
         bad_count = 0
 
         text_of = lambda e: unidecode(e.get_text(strip=True)).lower()
         # As of making this script, their methodology only counts votes as good and bad score, sponsor
         # bills do not count.
-        for g in good_votes:
-            if "yea" in text_of(g) or "nay" in text_of(g):
-                good_count += 1
+        spans = el.find_all("span")
 
-        for b in bad_votes:
-            if "yea" in text_of(b) or "nay" in text_of(b):
-                bad_count += 1
+        for span, vote in zip(spans, VOTES.decode_row(spans)):
+            text = text_of(span) if vote else ""
 
-        for n in neutral_vote:
-            if "present" in text_of(n) or "not voting" in text_of(n):
+            if vote == "+" and ("yea" in text or "nay" in text):
+                good_count += 1
+            elif vote == "-" and ("yea" in text or "nay" in text):
+                bad_count += 1
+            elif vote == "*" and ("present" in text or "not voting" in text):
                 good_count += 0.5
 
         if good_count + bad_count == 0:
@@ -79,41 +73,10 @@ def extract(page_source, **additional_info):
 
 def extract_files(files: list[Path]):
 
-    extracted = []
-
-    for file in files:
-
-        with open(file, "r") as f:
-            extracted += extract(f.read())
-
-    records_extracted = dict(enumerate(extracted))
-
-    return records_extracted
-
-
-def save_html(
-    page_source,
-    filepath: Path,
-    filename: str,
-    *additional_info,
-):
-
-    filepath.mkdir(exist_ok=True)
-
-    soup = BeautifulSoup(page_source, "html.parser")
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    with open(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.html"
-        ),
-        "w",
-    ) as f:
-        f.write(str(soup))
+    return batch.iter_records(extract, files)
 
 
+@driver_pool.scoped
 def main(filename: str, export_path: Path, html_path: Path = None):
 
     # if html_path:
@@ -126,11 +89,7 @@ def main(filename: str, export_path: Path, html_path: Path = None):
     #     )
     #     return records_extracted
 
-    chrome_service = Service()
-    chrome_options = Options()
-    chrome_options.add_argument("incognito")
-    chrome_options.add_argument("headless")
-    chrome_driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
+    chrome_driver = driver_pool.checkout()
 
     chrome_driver.get(URL)
 
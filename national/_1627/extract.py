@@ -1,20 +1,17 @@
 # This is the webscraping script for The John Birch Society (JBS), sig_id=1627
 
-from datetime import datetime
 from pathlib import Path
 from urllib.parse import urlparse
 
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.action_chains import ActionChains
 
-from bs4 import BeautifulSoup
 from tqdm import tqdm
+from common import archive, driver_pool, parser
+from common.archive import save_html
 
 
 URL = "https://thenewamerican.com/freedom-index/legislator/"
@@ -22,7 +19,7 @@ URL = "https://thenewamerican.com/freedom-index/legislator/"
 
 def extract_cards(page_source):
 
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
     cards = soup.find_all("div", {"class": "legislator-card"})
 
     for card in cards:
@@ -46,7 +43,7 @@ def extract_cards(page_source):
 
 def extract(page_source):
 
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
 
     keyphrase = soup.find(string="Constitutional Votes")
 
@@ -65,41 +62,17 @@ def extract_files(files: list):
 
     first_file = files[-1]
 
-    with open(first_file, "r") as f:
-        cards = list(extract_cards(f.read()))
+    cards = list(extract_cards(archive.read_html(first_file)))
     print(cards)
     extracted = []
 
     for c, file in zip(cards, files[:-1]):
-        with open(file, "r") as f:
-            extracted.append(c | extract(f.read()))
+        extracted.append(c | extract(archive.read_html(file)))
 
     return extracted
 
 
-def save_html(
-    page_source,
-    filepath: Path,
-    filename: str,
-    *additional_info,
-):
-
-    filepath.mkdir(exist_ok=True)
-
-    soup = BeautifulSoup(page_source, "html.parser")
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    with open(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.html"
-        ),
-        "w",
-    ) as f:
-        f.write(str(soup))
-
-
+@driver_pool.scoped
 def main(filename: str, export_path: Path, html_path: Path = None):
 
     # if html_path:
@@ -112,11 +85,7 @@ def main(filename: str, export_path: Path, html_path: Path = None):
     #     )
     #     return records_extracted
 
-    chrome_service = Service()
-    chrome_options = Options()
-    chrome_options.add_argument("incognito")
-    chrome_options.add_argument("headless")
-    chrome_driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
+    chrome_driver = driver_pool.checkout()
 
     chrome_driver.get(URL)
 
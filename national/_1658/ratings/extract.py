@@ -1,13 +1,10 @@
-from datetime import datetime
 from pathlib import Path
 
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.action_chains import ActionChains
 
 from bs4 import BeautifulSoup
+from common import archive, batch, driver_pool, parser
 
 
 URLS = [
@@ -18,7 +15,7 @@ URLS = [
 
 def extract(page_source):
 
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
 
     table = soup.find("table", {"class": "vote-table"})
     articles = table.find_all("article", {"class": "legislator-score-card"})
@@ -45,14 +42,7 @@ def extract(page_source):
 
 def extract_files(files: list):
 
-    extracted = []
-
-    for file in files:
-
-        with open(file, "r") as f:
-            extracted += extract(f.read())
-
-    return extracted
+    return batch.extract_records(extract, files)
 
 
 def save_html(
@@ -62,38 +52,18 @@ def save_html(
     *additional_info,
 ):
 
-    soup = BeautifulSoup(page_source, "html.parser")
-
-    filepath = filepath / "HTML_FILES"
-    filepath.mkdir(exist_ok=True)
-
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    with open(
-        filepath / f"{filename}_{'-'.join(map(str, additional_info))}"
-        f"{'-' if additional_info else ''}{timestamp}.html",
-        "w",
-    ) as f:
-        f.write(str(soup))
+    archive.save_html(page_source, filepath / "HTML_FILES", filename, *additional_info)
 
 
+@driver_pool.scoped
 def main(filename: str, export_path: Path, html_path: Path = None):
 
     if html_path:
-        html_files = filter(
-            lambda f: f.name.endswith(".html"),
-            (export_path / html_path).iterdir(),
-        )
-        records_extracted = extract_files(
-            sorted(html_files, key=lambda x: x.stat().st_ctime)
-        )
+        html_files = archive.html_files(export_path / html_path)
+        records_extracted = extract_files(html_files)
         return records_extracted
 
-    chrome_service = Service()
-    chrome_options = Options()
-    chrome_options.add_argument("incognito")
-    chrome_options.add_argument("headless")
-    chrome_driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
+    chrome_driver = driver_pool.checkout()
 
     extracted = []
 
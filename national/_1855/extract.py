@@ -1,84 +1,33 @@
 import re
-from datetime import datetime
 from pathlib import Path
 
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait, Select
 from selenium.common.exceptions import NoSuchElementException
+from common import batch, driver_pool, tables
+from common.archive import save_html
 
 
 URL = "https://paaia.org/advocate/scorecard"
 
 
-def extract(page_source, **additional_info):
-
-    soup = BeautifulSoup(page_source, "html.parser")
-    tables = soup.select("table.tablepress")
-
-    def extract_table(table):
-
-        headers = [th.get_text(strip=True) for th in table.thead.find_all("th")]
-        rows = [tr.find_all("td") for tr in table.tbody.find_all("tr")]
-
-        def get_text(x):
-            return x.get_text(strip=True)
+TABLE = tables.Table("table.tablepress", every_table=True)
 
-        return [
-            dict(zip(headers, map(get_text, row))) | additional_info for row in rows
-        ]
 
-    extracted = []
-
-    for table in tables:
-        extracted += extract_table(table)
+def extract(page_source, **additional_info):
 
-    return extracted
+    return TABLE(page_source, **additional_info)
 
 
 def extract_files(files: list[Path]):
 
-    extracted = []
-
-    for file in files:
-
-        with open(file, "r") as f:
-            extracted += extract(f.read())
-
-    records_extracted = dict(enumerate(extracted))
-
-    return records_extracted
-
-
-def save_html(
-    page_source,
-    filepath: Path,
-    filename: str,
-    *additional_info,
-):
-
-    filepath.mkdir(exist_ok=True)
-
-    soup = BeautifulSoup(page_source, "html.parser")
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    with open(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.html"
-        ),
-        "w",
-    ) as f:
-        f.write(str(soup))
+    return batch.iter_records(extract, files)
 
 
+@driver_pool.scoped
 def main(filename: str, export_path: Path, html_path: Path = None):
 
     # if html_path:
@@ -91,11 +40,7 @@ def main(filename: str, export_path: Path, html_path: Path = None):
     #     )
     #     return records_extracted
 
-    chrome_service = Service()
-    chrome_options = Options()
-    chrome_options.add_argument("incognito")
-    chrome_options.add_argument("headless")
-    chrome_driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
+    chrome_driver = driver_pool.checkout()
 
     chrome_driver.get(URL)
 
@@ -1,18 +1,16 @@
 # This is the webscraping script for Susan B. Anthony List, sig_id = 1946
 import re
 from pathlib import Path
-from datetime import datetime
 from collections import defaultdict
 
 from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import Select
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.action_chains import ActionChains
 from tqdm import tqdm
+from common import batch, driver_pool, parser
+from common.archive import save_html
 
 
 URL = "https://sbaprolife.org/scorecard"
@@ -24,7 +22,7 @@ RATINGS_METHODOLOGY = {
 
 
 def extract(page_source):
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
     name = soup.select_one(".sc_name_large h1")
     info = soup.select_one(".sc_name_large p")
     grade_rating = soup.select_one(".sc_rating h2")
@@ -65,16 +63,7 @@ def extract(page_source):
 
 def extract_files(files: list[Path]):
 
-    extracted = []
-
-    for file in files:
-
-        with open(file, "r") as f:
-            extracted.append(extract(f.read()))
-
-    records_extracted = dict(enumerate(extracted))
-
-    return records_extracted
+    return batch.iter_records(extract, files)
 
 
 def get_candidate_urls(page_source):
@@ -87,36 +76,10 @@ def get_candidate_urls(page_source):
         yield a["href"]
 
 
-def save_html(
-    page_source,
-    filepath: Path,
-    filename: str,
-    *additional_info,
-):
-
-    filepath.mkdir(exist_ok=True)
-
-    soup = BeautifulSoup(page_source, "html.parser")
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    with open(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.html"
-        ),
-        "w",
-    ) as f:
-        f.write(str(soup))
-
-
+@driver_pool.scoped
 def main(filename: str, export_path: Path, html_path: Path = None):
 
-    chrome_service = Service()
-    chrome_options = Options()
-    chrome_options.add_argument("incognito")
-    chrome_options.add_argument("headless")
-    chrome_driver = webdriver.Chrome(options=chrome_options, service=chrome_service)
+    chrome_driver = driver_pool.checkout()
     chrome_driver.get(URL)
 
     # close overlay
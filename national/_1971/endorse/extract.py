@@ -1,26 +1,26 @@
-from datetime import datetime
 from pathlib import Path
-import time
 from urllib.parse import urlparse, parse_qs, urljoin
 
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.common.exceptions import NoSuchElementException
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from common import archive, batch, driver_pool, parser, wait
+from common.archive import save_html
 
 
 URL = "https://victoryfund.org/our-candidates/"
+CANDIDATES = (By.CSS_SELECTOR, "li.candidate")
+
+# Seconds to wait for a scroll to load more candidates
+SCROLL_TIMEOUT = 2
 
 
 def extract(page_source, **additional_info):
 
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
 
     extracted = []
 
@@ -44,58 +44,18 @@ def extract(page_source, **additional_info):
 
 def extract_files(files: list[Path]):
 
-    extracted = []
-
-    for file in files:
-
-        with open(file, "r") as f:
-            extracted += extract(f.read())
-
-    records_extracted = dict(enumerate(extracted))
-
-    return records_extracted
-
-
-def save_html(
-    page_source,
-    filepath: Path,
-    filename: str,
-    *additional_info,
-):
-
-    filepath.mkdir(exist_ok=True)
-
-    soup = BeautifulSoup(page_source, "html.parser")
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    with open(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.html"
-        ),
-        "w",
-    ) as f:
-        f.write(str(soup))
+    return batch.iter_records(extract, files)
 
 
+@driver_pool.scoped
 def main(filename: str, export_path: Path, html_path: Path = None):
 
     if html_path:
-        html_files = filter(
-            lambda f: f.name.endswith(".html"),
-            (export_path / html_path).iterdir(),
-        )
-        records_extracted = extract_files(
-            sorted(html_files, key=lambda x: x.stat().st_ctime)
-        )
+        html_files = archive.html_files(export_path / html_path)
+        records_extracted = extract_files(html_files)
         return records_extracted
 
-    chrome_service = Service()
-    chrome_options = Options()
-    chrome_options.add_argument("incognito")
-    chrome_options.add_argument("headless")
-    chrome_driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
+    chrome_driver = driver_pool.checkout()
 
     chrome_driver.get(URL)
 
@@ -119,25 +79,23 @@ def main(filename: str, export_path: Path, html_path: Path = None):
 
     chrome_driver.get(URL_w_params)
 
-    time.sleep(3)
+    wait.until(chrome_driver, EC.presence_of_element_located(CANDIDATES))
 
     while True:
 
-        current_height = chrome_driver.execute_script(
-            "return document.body.scrollHeight"
-        )
+        loaded = len(chrome_driver.find_elements(*CANDIDATES))
 
         chrome_driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
 
-        time.sleep(2)
-
-        loaded_height = chrome_driver.execute_script(
-            "return document.body.scrollHeight"
-        )
-
-        if loaded_height > current_height:
-            continue
-        else:
+        # Scrolling to the end stops loading more, so the last scroll is only
+        # given SCROLL_TIMEOUT
+        try:
+            wait.until(
+                chrome_driver,
+                wait.element_count_changed(CANDIDATES, loaded),
+                SCROLL_TIMEOUT,
+            )
+        except TimeoutException:
             break
 
     save_html(
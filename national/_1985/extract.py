@@ -1,14 +1,12 @@
 import re
-from datetime import datetime
 from pathlib import Path
 from urllib.parse import urlparse, urljoin
 
 from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from tqdm import tqdm
+from common import archive, driver_pool, parser
+from common.archive import save_html
 
 
 URL = "https://grades.numbersusa.com/"
@@ -19,7 +17,7 @@ CANDIDATE_URL_PATTERN = (
 
 def extract(page_source, **additional_info):
 
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
 
     info_container = soup.find("div", {"class": "rep-info-container"})
     info_text = info_container.get_text(strip=True, separator=";")
@@ -55,11 +53,10 @@ def extract_files(files: list):
     extracted = []
 
     for file in tqdm(files):
-        with open(file, "r") as f:
-            page_source = f.read()
-            extracted.append(
-                extract(page_source, sig_candidate_id=get_sig_candidate_id(page_source))
-            )
+        page_source = archive.read_html(file)
+        extracted.append(
+            extract(page_source, sig_candidate_id=get_sig_candidate_id(page_source))
+        )
 
     records_extracted = dict(enumerate(extracted))
 
@@ -76,46 +73,15 @@ def get_cpage_urls(page_source):
     return [urlparse(urljoin(URL, clean(row["onclick"]))) for row in rows]
 
 
-def save_html(
-    page_source,
-    filepath: Path,
-    filename: str,
-    *additional_info,
-):
-
-    filepath.mkdir(exist_ok=True)
-
-    soup = BeautifulSoup(page_source, "html.parser")
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    with open(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.html"
-        ),
-        "w",
-    ) as f:
-        f.write(str(soup))
-
-
+@driver_pool.scoped
 def main(filename, export_path: Path, html_path: Path = None):
 
     if html_path:
-        html_files = filter(
-            lambda f: f.name.endswith(".html"),
-            (export_path / html_path).iterdir(),
-        )
-        records_extracted = extract_files(
-            sorted(html_files, key=lambda x: x.stat().st_ctime)
-        )
+        html_files = archive.html_files(export_path / html_path)
+        records_extracted = extract_files(html_files)
         return records_extracted
 
-    chrome_service = Service()
-    chrome_options = Options()
-    chrome_options.add_argument("incognito")
-    chrome_options.add_argument("headless")
-    chrome_driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
+    chrome_driver = driver_pool.checkout()
 
     chrome_driver.get(URL)
 
@@ -1,12 +1,9 @@
 from pathlib import Path
-from datetime import datetime
 from urllib.parse import urlparse, urljoin
 
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from bs4 import BeautifulSoup
 from tqdm import tqdm
+from common import archive, driver_pool, parser
+from common.archive import save_html
 
 
 URL = "https://heritageaction.com/scorecard/members"
@@ -14,7 +11,7 @@ URL = "https://heritageaction.com/scorecard/members"
 
 def extract_scores(page_source):
 
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
 
     scores = soup.find_all("div", {"class": "member-stats__item"})
     scores_text = {
@@ -27,7 +24,7 @@ def extract_scores(page_source):
 
 def extract_info(page_source):
 
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
     table = soup.find("table")
 
     headers = (
@@ -58,62 +55,30 @@ def extract_files(files: list[Path]):
 
     extracted = []
 
-    with open(files[0], "r") as f:
-        candidate_info = extract_info(f.read())
+    candidate_info = extract_info(archive.read_html(files[0]))
 
     info_ref = {info["sig_candidate_id"]: info for info in candidate_info}
 
     for file in tqdm(files[1:]):
-        with open(file, "r") as f:
-            page_source = f.read()
-            sig_candidate_id = file.name.split("_")[-1].split("-")[0]
-            extracted.append(info_ref[sig_candidate_id] | extract_scores(page_source))
+        page_source = archive.read_html(file)
+        recorded = archive.page_info(file).get("sig_candidate_id")
+        sig_candidate_id = recorded or file.name.split("_")[-1].split("-")[0]
+        extracted.append(info_ref[sig_candidate_id] | extract_scores(page_source))
 
     records_extracted = dict(enumerate(extracted))
 
     return records_extracted
 
 
-def save_html(
-    page_source,
-    filepath: Path,
-    filename: str,
-    *additional_info,
-):
-
-    filepath.mkdir(exist_ok=True)
-
-    soup = BeautifulSoup(page_source, "html.parser")
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    with open(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.html"
-        ),
-        "w",
-    ) as f:
-        f.write(str(soup))
-
-
+@driver_pool.scoped
 def main(filename: str, export_path: Path, html_path: Path = None):
 
     if html_path:
-        html_files = filter(
-            lambda f: f.name.endswith(".html"),
-            (export_path / html_path).iterdir(),
-        )
-        records_extracted = extract_files(
-            sorted(html_files, key=lambda x: x.stat().st_ctime)
-        )
+        html_files = archive.html_files(export_path / html_path)
+        records_extracted = extract_files(html_files)
         return records_extracted
 
-    chrome_service = Service()
-    chrome_options = Options()
-    chrome_options.add_argument("incognito")
-    chrome_options.add_argument("headless")
-    chrome_driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
+    chrome_driver = driver_pool.checkout()
 
     chrome_driver.get(URL)
 
@@ -134,6 +99,8 @@ def main(filename: str, export_path: Path, html_path: Path = None):
             export_path / "HTML_FILES",
             filename,
             info["sig_candidate_id"],
+            sig_candidate_id=info["sig_candidate_id"],
+            url=info["candidate_url"],
         )
 
     records_extracted = dict(enumerate(extracted))
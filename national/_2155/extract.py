@@ -1,31 +1,38 @@
-from datetime import datetime
+import re
 from pathlib import Path
-import time
 from collections import defaultdict
 
-from bs4 import BeautifulSoup
+import pandas
 from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.common.exceptions import (
+    TimeoutException,
     NoSuchElementException,
     StaleElementReferenceException,
     ElementNotInteractableException,
 )
 from tqdm import tqdm
+from common import batch, checkpoint, driver_pool, parser, wait
+from common.archive import save_html
 
 
 URL = "https://www.termlimits.com/legislators/"
 
+# Columns of the zip code input that name the district(s) a zip code is in
+DISTRICT_COLUMNS = ("district", "districts", "cd")
+
+# Seconds to wait for a zip code search to navigate. Searches that don't
+# navigate are common, so this isn't left to the site's adaptive timeout.
+SUBMIT_TIMEOUT = 1
+
 
 def extract(page_source, **additional_info):
 
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
     cards = soup.select("div.federal > div.row")
 
     extracted = []
@@ -47,39 +54,17 @@ def extract(page_source, **additional_info):
 
 def extract_files(files: list[Path]):
 
-    extracted = []
-
-    for file in files:
-
-        with open(file, "r") as f:
-            extracted += extract(f.read())
-
-    records_extracted = dict(enumerate(extracted))
-
-    return records_extracted
-
-
-def save_html(
-    page_source,
-    filepath: Path,
-    filename: str,
-    *additional_info,
-):
+    return batch.iter_records(extract, files)
 
-    filepath.mkdir(exist_ok=True)
 
-    soup = BeautifulSoup(page_source, "html.parser")
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
+def submitted(driver: webdriver.Chrome, address_input):
 
-    with open(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.html"
-        ),
-        "w",
-    ) as f:
-        f.write(str(soup))
+    # Showing the legislators navigates away, which detaches the input
+    try:
+        wait.until(driver, wait.staleness(address_input), SUBMIT_TIMEOUT)
+        return True
+    except TimeoutException:
+        return False
 
 
 def show_legislators(driver: webdriver.Chrome, zip_code):
@@ -90,12 +75,7 @@ def show_legislators(driver: webdriver.Chrome, zip_code):
         address_input.clear()
         address_input.send_keys(zip_code)
         address_input.send_keys(Keys.ENTER)
-        time.sleep(1)
-        try:
-            _ = address_input.tag_name
-            return False
-        except StaleElementReferenceException:
-            return True
+        return submitted(driver, address_input)
 
     except ElementNotInteractableException:
         driver.back()
@@ -103,22 +83,93 @@ def show_legislators(driver: webdriver.Chrome, zip_code):
         address_input.clear()
         address_input.send_keys(zip_code)
         address_input.send_keys(Keys.ENTER)
-        time.sleep(1)
-        try:
-            _ = address_input.tag_name
-            return False
-        except StaleElementReferenceException:
-            return True
+        return submitted(driver, address_input)
 
     except StaleElementReferenceException:
-        time.sleep(5)
+        try:
+            wait.until(driver, wait.dom_stable())
+        except TimeoutException:
+            pass
+
+
+def district_of(record: dict) -> str:
+    """The first of DISTRICT_COLUMNS the zip code record has a value in"""
+
+    for column in DISTRICT_COLUMNS:
+        value = record.get(column)
+
+        # Empty cells read with dtype=str come in as NaN, not as a district
+        if value is None or pandas.isna(value):
+            continue
+
+        if value := str(value).strip():
+            return value
+
+    return ""
+
+
+def coverage_index(zipcode_records: list[dict]):
+    """Maps each state's zip codes to the districts they reach, along with the
+    number of legislators to find in the state"""
+
+    coverage = defaultdict(dict)
+    repsens_by_state = {}
+
+    for record in zipcode_records:
+        state_id = record.get("state_id")
+        repsens = int(record.get("reps")) + int(record.get("sens"))
+
+        if repsens <= 0:
+            continue
+
+        repsens_by_state.setdefault(state_id, repsens)
 
+        districts = set(re.split(r"[,;\s]+", district_of(record))) - {""}
 
+        coverage[state_id].setdefault(record["zip"], set()).update(districts)
+
+    return coverage, repsens_by_state
+
+
+def spread(zip_codes: list[str], parts: int) -> list[str]:
+    """Orders the zip codes by taking turns across `parts` even slices, so
+    consecutive lookups land far apart in the state"""
+
+    size = round(len(zip_codes) / parts) + 1
+    slices = [zip_codes[i : i + size] for i in range(0, len(zip_codes), size)]
+
+    return [sliced[-1 - i] for i in range(size) for sliced in slices if i < len(sliced)]
+
+
+def plan_lookups(zip_districts: dict[str, set], repsens: int) -> list[str]:
+    """The fewest zip codes that reach every district (greedy set cover),
+    followed by the rest in case districts are missing from the input"""
+
+    uncovered = set().union(*zip_districts.values())
+    remaining = dict(sorted(zip_districts.items()))
+    plan = []
+
+    while uncovered:
+        best = max(remaining, key=lambda z: len(remaining[z] & uncovered))
+        gained = remaining[best] & uncovered
+
+        if not gained:
+            break
+
+        del remaining[best]
+        plan.append(best)
+        uncovered -= gained
+
+    return plan + spread(list(remaining), repsens)
+
+
+@driver_pool.scoped
 def main(
     filename: str,
     export_path: Path,
     zipcode_records: list[dict],
     html_path: Path = None,
+    resume: bool = False,
 ):
 
     # if html_path:
@@ -131,24 +182,11 @@ def main(
     #     )
     #     return records_extracted
 
-    chrome_service = Service()
-    chrome_options = Options()
-    chrome_options.add_argument("incognito")
-    chrome_options.add_argument("headless")
-    chrome_driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
-
-    unique_states = defaultdict(set)
-    repsens_by_state = {}
-
-    for record in zipcode_records:
-        state_id = record.pop("state_id")
-        repsens = int(record.get("reps")) + int(record.get("sens"))
+    journal = checkpoint.Journal(export_path, filename, resume)
 
-        if repsens > 0:
-            unique_states[state_id].add(record["zip"])
+    chrome_driver = driver_pool.checkout()
 
-        if state_id not in repsens_by_state and repsens > 0:
-            repsens_by_state[state_id] = repsens
+    coverage, repsens_by_state = coverage_index(zipcode_records)
 
     # close overlay
     ActionChains(chrome_driver).send_keys(Keys.ESCAPE).perform()
@@ -157,78 +195,64 @@ def main(
 
     chrome_driver.get(URL)
 
-    p_bar = tqdm(total=len(unique_states), desc="Extracting states...")
+    p_bar = tqdm(total=len(coverage), desc="Extracting states...")
 
-    for state_id in unique_states:
+    for state_id, zip_districts in coverage.items():
+
+        if state_id in journal:
+            extracted[state_id] = journal[state_id]
+            p_bar.update(1)
+            continue
 
         repsens = repsens_by_state.get(state_id)
-        zip_codes = sorted(unique_states.get(state_id))
+        zip_codes = plan_lookups(zip_districts, repsens)
 
         i = round(len(zip_codes) / repsens) + 1
 
-        start = 0
-        end = i
-
-        sliced_zips = []
-
-        while start < len(zip_codes) - 1:
-            sliced_zips.append(zip_codes[start:end])
-
-            start = end
-            end += i
-
         state_p_bar = tqdm(total=len(zip_codes), desc=f"Extracting {state_id} ({i})...")
 
         # Stop when it has too many iterations.
         exhaust_counter = 0
 
-        while True:
-
-            if len(extracted[state_id]) >= repsens:
-                break
+        for current_zip in zip_codes:
 
-            for sliced_zip in sliced_zips:
+            state_p_bar.update(1)
+            p_bar.refresh()
 
-                if len(sliced_zip) > 0:
-                    current_zip = sliced_zip.pop()
-                    state_p_bar.update(1)
-                    p_bar.refresh()
+            obtained = show_legislators(chrome_driver, current_zip)
 
-                    obtained = show_legislators(chrome_driver, current_zip)
-                    time.sleep(1)
+            if obtained is True:
+                try:
+                    wait.until(chrome_driver, wait.dom_stable("div.federal"))
+                except TimeoutException:
+                    pass
 
-                    if obtained is True:
-                        found_counter = 0
+                found_counter = 0
 
-                        for e in extract(chrome_driver.page_source, state_id=state_id):
-                            if e not in extracted[state_id]:
-                                found_counter += 1
-                                extracted[state_id].append(e)
+                for e in extract(chrome_driver.page_source, state_id=state_id):
+                    if e not in extracted[state_id]:
+                        found_counter += 1
+                        extracted[state_id].append(e)
 
-                        if found_counter == 0:
-                            exhaust_counter += 1
-                        else:
-                            save_html(
-                                chrome_driver.page_source,
-                                export_path / "HTML_FILES",
-                                filename,
-                                state_id,
-                                current_zip,
-                            )
-                            exhaust_counter = 0
-
-                    if exhaust_counter > i:
-                        break
-
-                    if len(extracted[state_id]) >= repsens:
-                        break
+                if found_counter == 0:
+                    exhaust_counter += 1
+                else:
+                    save_html(
+                        chrome_driver.page_source,
+                        export_path / "HTML_FILES",
+                        filename,
+                        state_id,
+                        current_zip,
+                    )
+                    exhaust_counter = 0
 
             if exhaust_counter > i:
                 break
 
-            if not any(sliced_zips):
+            if len(extracted[state_id]) >= repsens:
                 break
 
+        journal.record(state_id, extracted[state_id])
         p_bar.update(1)
 
     _extracted = []
@@ -1,12 +1,6 @@
-from datetime import datetime
 from pathlib import Path
-import time
 from urllib.parse import urljoin
 
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
@@ -15,6 +9,8 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.common.exceptions import NoSuchElementException
 
 from tqdm import tqdm
+from common import archive, batch, driver_pool, parser
+from common.archive import save_html
 
 URL = "https://web.archive.org/web/20241008134526/https://jstreetpac.org/candidates/"
 WEBARCHIVE = "https://web.archive.org/"
@@ -22,7 +18,7 @@ WEBARCHIVE = "https://web.archive.org/"
 
 def extract_cards(page_source, **additional_info) -> list[dict[str, str]]:
 
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
     extracted = []
 
     cards = soup.select("div.candidate-filter__grid > div.fancy-profile")
@@ -50,7 +46,7 @@ def extract_cards(page_source, **additional_info) -> list[dict[str, str]]:
 
 def extract_candidate(page_source, **additional_info):
 
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
     infos = soup.select("ul.candidate-hero__icon-list > li")
 
     return {
@@ -60,39 +56,7 @@ def extract_candidate(page_source, **additional_info):
 
 def extract_files(files: list[Path]):
 
-    extracted = []
-
-    for file in files:
-
-        with open(file, "r") as f:
-            extracted += extract_cards(f.read())
-
-    records_extracted = dict(enumerate(extracted))
-
-    return records_extracted
-
-
-def save_html(
-    page_source,
-    filepath: Path,
-    filename: str,
-    *additional_info,
-):
-
-    filepath.mkdir(exist_ok=True)
-
-    soup = BeautifulSoup(page_source, "html.parser")
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    with open(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.html"
-        ),
-        "w",
-    ) as f:
-        f.write(str(soup))
+    return batch.iter_records(extract_cards, files)
 
 
 def remove_signin(driver):
@@ -110,23 +74,15 @@ def remove_signin(driver):
         )
 
 
+@driver_pool.scoped
 def main(filename: str, export_path: Path, html_path: Path = None):
 
     if html_path:
-        html_files = filter(
-            lambda f: f.name.endswith(".html"),
-            (export_path / html_path).iterdir(),
-        )
-        records_extracted = extract_files(
-            sorted(html_files, key=lambda x: x.stat().st_ctime)
-        )
+        html_files = archive.html_files(export_path / html_path)
+        records_extracted = extract_files(html_files)
         return records_extracted
 
-    chrome_service = Service()
-    chrome_options = Options()
-    chrome_options.add_argument("incognito")
-    chrome_options.add_argument("headless")
-    chrome_driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
+    chrome_driver = driver_pool.checkout()
 
     chrome_driver.get(URL)
 
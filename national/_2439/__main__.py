@@ -3,9 +3,9 @@ import argparse
 from pathlib import Path
 from datetime import datetime
 
-import pandas
 from dotenv import load_dotenv
 from national._2439.extract import main as extract
+from common.records import FORMATS, save_records
 
 
 def transform():
@@ -26,27 +26,6 @@ CONG_SESSIONS = [str(i) for i in range(113, 113 + len(SPANS))]
 SESSIONS = dict(zip(SPANS, CONG_SESSIONS))
 
 
-def save_records(
-    records: dict[int, dict[str, str]],
-    filename: str,
-    filepath: Path,
-    *additional_info,
-):
-
-    filepath.mkdir(exist_ok=True)
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    df = pandas.DataFrame.from_dict(records, orient="index")
-    df.to_csv(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.csv"
-        ),
-        index=False,
-    )
-
-
 def main():
 
     parser = argparse.ArgumentParser()
@@ -88,6 +67,13 @@ def main():
         help="filepath to candidates HTML directory",
     )
 
+    parser.add_argument(
+        "-r",
+        "--resume",
+        action="store_true",
+        help="skip the work a previous run already extracted",
+    )
+
     parser.add_argument(
         "-e",
         "--extract",
@@ -109,6 +95,14 @@ def main():
         help="to match only",
     )
 
+    parser.add_argument(
+        "-o",
+        "--output_format",
+        choices=FORMATS,
+        default="csv",
+        help="format of the saved files, parquet keeps column types between stages",
+    )
+
     args = parser.parse_args()
 
     load_dotenv()
@@ -136,13 +130,19 @@ def main():
     if not any((args.extract, args.transform, args.match)):
 
         records_extracted = extract(
-            FILENAME + "Ratings", args.export_path, selected_sessions, args.html_path, args.candidates_html_path
+            FILENAME + "Ratings",
+            args.export_path,
+            selected_sessions,
+            args.html_path,
+            args.candidates_html_path,
+            resume=args.resume,
         )
 
         save_records(
             records_extracted,
             FILENAME + "Ratings-Extract",
             args.export_path / "EXTRACT_FILES",
+            format=args.output_format,
         )
 
         # records_transformed = transform(records_extracted)
@@ -175,6 +175,7 @@ def main():
             records_extracted,
             FILENAME + "Ratings-Extract",
             args.export_path / "EXTRACT_FILES",
+            format=args.output_format,
         )
 
     # elif args.transform and not (any((args.extract, args.match))):
@@ -1,12 +1,6 @@
-import time
-from datetime import datetime
 from pathlib import Path
 from urllib.parse import urljoin
 
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
@@ -15,13 +9,15 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.common.exceptions import NoSuchElementException, TimeoutException
 
 from tqdm import tqdm
+from common import archive, batch, checkpoint, driver_pool, parser, wait
+from common.archive import save_html
 
 URL = "https://ipaagrassroots.org/voting-records"
 
 
 def extract(page_source, **additional_info) -> list[dict]:
 
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
     table = soup.find("table")
 
     headers = [th.get_text(strip=True) for th in table.thead.find_all("th")]
@@ -49,7 +45,7 @@ def extract(page_source, **additional_info) -> list[dict]:
 
 
 def extract_candidate(page_source, **additional_info) -> dict:
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
     office = soup.select_one(".candidate-office")
     lifetime_score = soup.select_one(".candidate-score .score")
 
@@ -59,57 +55,42 @@ def extract_candidate(page_source, **additional_info) -> dict:
     } | additional_info
 
 
-def extract_files(files: list[Path], candidate_files: list[Path]):
+def session_of(file: Path):
+    return {"session": "-".join(file.name.split("_")[-1].split("-")[:-6])}
 
-    extracted = []
 
-    for file in tqdm(files, desc="Extracting files..."):
-        with open(file, "r") as f:
-            session = "-".join(file.name.split("_")[-1].split("-")[:-6])
-            extracted += extract(f.read(), session=session)
+def sig_candidate_id_of(c_file: Path):
+    # Pages saved before the manifest kept it only have it in their name
+    recorded = archive.page_info(c_file).get("sig_candidate_id")
+    return {
+        "sig_candidate_id": recorded
+        or "".join(c_file.name.split("_")[-1].split("-")[:-5])
+    }
 
-    candidate_extracted = {}
 
-    for c_file in tqdm(candidate_files, desc="Extracting candidate files..."):
-        with open(c_file, "r") as f:
-            sig_candidate_id = "".join(c_file.name.split("_")[-1].split("-")[:-5])
-            candidate_extracted[sig_candidate_id] = extract_candidate(
-                f.read(), sig_candidate_id=sig_candidate_id
-            )
+def extract_files(files: list[Path], candidate_files: list[Path]):
+    """Yields the records as the session files are read, so a large archive is
+    never held in memory at once"""
+
+    candidate_extracted = {
+        c["sig_candidate_id"]: c
+        for c in batch.map_files(
+            extract_candidate,
+            candidate_files,
+            sig_candidate_id_of,
+            desc="Extracting candidate files...",
+        )
+        if c is not None
+    }
 
-    for e in tqdm(extracted, desc="Combining files..."):
+    for e in batch.iter_records(extract, files, session_of, desc="Extracting files..."):
         sig_candidate_id = e.pop("candidate_url").rpartition("/")[-1]
         if sig_candidate_id in candidate_extracted:
             e.update(candidate_extracted.get(sig_candidate_id))
         else:
             e.update({"sig_candidate_id": sig_candidate_id})
 
-    records_extracted = dict(enumerate(extracted))
-
-    return records_extracted
-
-
-def save_html(
-    page_source,
-    filepath: Path,
-    filename: str,
-    *additional_info,
-):
-
-    filepath.mkdir(exist_ok=True)
-
-    soup = BeautifulSoup(page_source, "html.parser")
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    with open(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.html"
-        ),
-        "w",
-    ) as f:
-        f.write(str(soup))
+        yield e
 
 
 def js_click(chrome_driver, element):
@@ -122,38 +103,37 @@ def js_click(chrome_driver, element):
     )
 
 
+@driver_pool.scoped
 def main(
     filename: str,
     export_path: Path,
     sessions: list | set,
     html_path: Path = None,
     candidates_html_path: Path = None,
+    resume: bool = False,
 ):
 
     if html_path and candidates_html_path:
-        html_files = filter(
-            lambda f: f.name.endswith(".html"),
-            (export_path / html_path).iterdir(),
-        )
-        candidate_html_files = filter(
-            lambda f: f.name.endswith(".html"),
-            (export_path / candidates_html_path).iterdir(),
-        )
+        html_files = archive.html_files(export_path / html_path)
+        candidate_html_files = archive.html_files(export_path / candidates_html_path)
         records_extracted = extract_files(
-            sorted(html_files, key=lambda x: x.stat().st_ctime),
-            sorted(candidate_html_files, key=lambda x: x.stat().st_ctime),
+            html_files,
+            candidate_html_files,
         )
 
         return records_extracted
 
-    chrome_service = Service()
-    chrome_options = Options()
-    chrome_options.add_argument("incognito")
-    chrome_options.add_argument("headless")
-    chrome_driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
+    journal = checkpoint.Journal(export_path, filename, resume)
+
+    chrome_driver = driver_pool.checkout()
 
     chrome_driver.get(URL)
-    time.sleep(10)
+    wait.until(
+        chrome_driver,
+        EC.presence_of_element_located(
+            (By.CSS_SELECTOR, "select[name='congress']>option")
+        ),
+    )
 
     # close overlay
     ActionChains(chrome_driver).send_keys(Keys.ESCAPE).perform()
@@ -174,6 +154,14 @@ def main(
     extracted = []
 
     for o in tqdm(selected_options):
+        session_unit = f"session:{o.text}"
+
+        if session_unit in journal:
+            extracted += journal[session_unit]
+            continue
+
+        session_extracted = []
+
         o.click()
 
         WebDriverWait(chrome_driver, 10).until(
@@ -206,16 +194,24 @@ def main(
                 selected_page.text,
             )
 
-            extracted += extract(chrome_driver.page_source, session=o.text)
+            session_extracted += extract(chrome_driver.page_source, session=o.text)
 
             if next_button is not None:
                 next_button.click()
             else:
                 break
 
+        journal.record(session_unit, session_extracted)
+        extracted += session_extracted
+
     for e in tqdm(extracted, desc="Extracting Candidates..."):
 
         candidate_url = e.pop("candidate_url")
+
+        if candidate_url in journal:
+            e |= journal[candidate_url]
+            continue
+
         chrome_driver.get(candidate_url)
         candidate_id = candidate_url.rpartition("/")[-1]
 
@@ -233,9 +229,16 @@ def main(
             export_path / "HTML_FILES_CANDIDATE",
             filename,
             candidate_id,
+            sig_candidate_id=candidate_id,
+            url=candidate_url,
+        )
+
+        candidate_extracted = extract_candidate(
+            chrome_driver.page_source, candidate_id=candidate_id
         )
+        journal.record(candidate_url, candidate_extracted)
 
-        e |= extract_candidate(chrome_driver.page_source, candidate_id=candidate_id)
+        e |= candidate_extracted
 
     records_extracted = dict(enumerate(extracted))
 
@@ -1,11 +1,6 @@
-import time
-from datetime import datetime
 from pathlib import Path
 
 from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
@@ -14,68 +9,30 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.common.exceptions import NoSuchElementException
 
 from tqdm import tqdm
+from common import batch, driver_pool, tables, wait
+from common.archive import save_html
 
 
 URL = "https://climatehawksvote.com/scorecard/alabama"
 
 
-def extract(page_source, **additional_info):
-
-    soup = BeautifulSoup(page_source, "html.parser")
+TABLE = tables.Table(
+    "div#sheets-viewport table", headers="tbody tr td", row_slice=slice(1, None)
+)
 
-    sheet_container = soup.find("div", {"id": "sheets-viewport"})
-    table = sheet_container.find("table")
 
-    def extract_table(table):
-
-        headers = [td.get_text(strip=True) for td in table.tbody.tr.find_all("td")]
-        rows = [tr.find_all("td") for tr in table.tbody.find_all("tr")[1:]]
+def extract(page_source, **additional_info):
 
-        def get_text(x):
-            return x.get_text(strip=True)
+    return TABLE(page_source, **additional_info)
 
-        return [
-            dict(zip(headers, map(get_text, row))) | additional_info for row in rows
-        ]
 
-    return extract_table(table)
+def state_name_of(file: Path):
+    return {"state_name": file.name.split("_")[-1].split("-")[0]}
 
 
 def extract_files(files: list[Path]):
 
-    extracted = []
-
-    for file in files:
-        with open(file, "r") as f:
-            state_name = file.name.split("_")[-1].split("-")[0]
-            extracted += extract(f.read(), state_name=state_name)
-
-    records_extracted = dict(enumerate(extracted))
-
-    return records_extracted
-
-
-def save_html(
-    page_source,
-    filepath: Path,
-    filename: str,
-    *additional_info,
-):
-
-    filepath.mkdir(exist_ok=True)
-
-    soup = BeautifulSoup(page_source, "html.parser")
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    with open(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.html"
-        ),
-        "w",
-    ) as f:
-        f.write(str(soup))
+    return batch.iter_records(extract, files, state_name_of)
 
 
 def get_states(page_source):
@@ -84,6 +41,7 @@ def get_states(page_source):
     return [o.get("value") for o in select.find_all("option") if o.get("value")]
 
 
+@driver_pool.scoped
 def main(filename: str, export_path: Path, html_path: Path = None):
 
     # if html_path:
@@ -96,11 +54,7 @@ def main(filename: str, export_path: Path, html_path: Path = None):
     #     )
     #     return records_extracted
 
-    chrome_service = Service()
-    chrome_options = Options()
-    chrome_options.add_argument("incognito")
-    chrome_options.add_argument("headless")
-    chrome_driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
+    chrome_driver = driver_pool.checkout()
 
     chrome_driver.get(URL)
 
@@ -132,7 +86,8 @@ def main(filename: str, export_path: Path, html_path: Path = None):
 
             sheets_select[i].click()
 
-            time.sleep(2)
+            # The tab loads its sheet into the #pageswitcher-content frame
+            wait.until(chrome_driver, wait.network_idle())
 
             iframe_2 = chrome_driver.execute_script(
             """
@@ -140,6 +95,10 @@ def main(filename: str, export_path: Path, html_path: Path = None):
             """
             )
             chrome_driver.switch_to.frame(iframe_2)
+            wait.until(
+                chrome_driver,
+                EC.presence_of_element_located((By.CSS_SELECTOR, TABLE.root)),
+            )
 
 
             extracted += extract(chrome_driver.page_source, state_name=state_name)
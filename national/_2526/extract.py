@@ -1,88 +1,44 @@
 # This is the webscraping script for American Energy Alliance (AEA), sig_id=2526
 
-import time
-from datetime import datetime
 from pathlib import Path
 
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait, Select
+from common import archive, batch, driver_pool, fetch, tables, wait
+from common.archive import save_html
 
 
 URL = "https://www.americanenergyalliance.org/american-energy-scorecard/?spage=overall"
+ROOT = "table#overall-members-table"
+TABLE = tables.Table(ROOT)
 
 
 def extract(page_source, **additional_info):
 
-    soup = BeautifulSoup(page_source, "html.parser")
-    table = soup.find("table", {"id": "overall-members-table"})
-
-    headers = [th.get_text(strip=True) for th in table.thead.find_all("th")]
-    rows = [tr.find_all("td") for tr in table.tbody.find_all("tr")]
-
-    def get_text(x):
-        return x.get_text(strip=True)
-
-    return [dict(zip(headers, map(get_text, row))) | additional_info for row in rows]
+    return TABLE(page_source, **additional_info)
 
 
 def extract_files(files: list):
 
-    extracted = []
-
-    for file in files:
-
-        with open(file, "r") as f:
-            extracted += extract(f.read())
-
-    records_extracted = dict(enumerate(extracted))
-
-    return records_extracted
-
-
-def save_html(
-    page_source,
-    filepath: Path,
-    filename: str,
-    *additional_info,
-):
-
-    filepath.mkdir(exist_ok=True)
-
-    soup = BeautifulSoup(page_source, "html.parser")
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    with open(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.html"
-        ),
-        "w",
-    ) as f:
-        f.write(str(soup))
+    return batch.iter_records(extract, files)
 
 
+@driver_pool.scoped
 def main(filename: str, export_path: Path, html_path: Path = None):
 
     if html_path:
-        html_files = filter(
-            lambda f: f.name.endswith(".html"),
-            (export_path / html_path).iterdir(),
-        )
-        records_extracted = extract_files(
-            sorted(html_files, key=lambda x: x.stat().st_ctime)
-        )
+        html_files = archive.html_files(export_path / html_path)
+        records_extracted = extract_files(html_files)
         return records_extracted
 
-    chrome_service = Service()
-    chrome_options = Options()
-    chrome_options.add_argument("incognito")
-    chrome_options.add_argument("headless")
-    chrome_driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
+    # The whole table is served with the page, DataTables only paginates it
+    page_source = fetch.try_fetch(URL, f"{ROOT} tbody tr")
+
+    if page_source is not None:
+        save_html(page_source, export_path / "HTML_FILES", filename)
+        return dict(enumerate(extract(page_source)))
+
+    chrome_driver = driver_pool.checkout()
 
     chrome_driver.get(URL)
 
@@ -90,13 +46,12 @@ def main(filename: str, export_path: Path, html_path: Path = None):
         By.CSS_SELECTOR, "select[name='overall-members-table_length']"
     ))
     select_rows.select_by_value('100')
-    
-    time.sleep(3)
+
+    wait.until(chrome_driver, wait.dom_stable("#overall-members-table"))
 
     extracted = []
 
     while True:
-        time.sleep(2)
         next_button, current_page = chrome_driver.execute_script(
             """
             paginator = document.querySelector('#overall-members-table_paginate');
@@ -120,7 +75,12 @@ def main(filename: str, export_path: Path, html_path: Path = None):
         )
 
         if next_button:
+            # Paging detaches the current rows, so the first one goes stale
+            first_row = chrome_driver.find_element(
+                By.CSS_SELECTOR, "#overall-members-table tbody tr"
+            )
             next_button.click()
+            wait.until(chrome_driver, wait.staleness(first_row))
         else:
             break
 
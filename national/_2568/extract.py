@@ -1,9 +1,5 @@
-from datetime import datetime
 from pathlib import Path
 
-import time
-
-from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
@@ -12,15 +8,23 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
+from common import archive, batch, parser, wait
+from common.archive import save_html
 
 
 
 URL = "https://endcitizensunited.org/scorecard/"
 
+CARDS_LENGTH = """
+    const root = document.querySelector('#scorecardContainer').shadowRoot;
+    const cards = root && root.getElementById('cards');
+    return cards ? cards.innerHTML.length : -1;
+"""
+
 
 def extract(page_source, **additional_info):
 
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
 
     card_container = soup.select_one("div div:nth-child(2)")
     cards = card_container.find_all("div", recursive=False)
@@ -40,51 +44,14 @@ def extract(page_source, **additional_info):
 
 def extract_files(files: list[Path]):
 
-    extracted = []
-
-    for file in files:
-
-        with open(file, "r") as f:
-            extracted += extract(f.read())
-
-    records_extracted = dict(enumerate(extracted))
-
-    return records_extracted
-
-
-def save_html(
-    page_source,
-    filepath: Path,
-    filename: str,
-    *additional_info,
-):
-
-    filepath.mkdir(exist_ok=True)
-
-    soup = BeautifulSoup(page_source, "html.parser")
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    with open(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.html"
-        ),
-        "w",
-    ) as f:
-        f.write(str(soup))
+    return batch.iter_records(extract, files)
 
 
 def main(filename: str, export_path: Path, html_path: Path = None):
 
     if html_path:
-        html_files = filter(
-            lambda f: f.name.endswith(".html"),
-            (export_path / html_path).iterdir(),
-        )
-        records_extracted = extract_files(
-            sorted(html_files, key=lambda x: x.stat().st_ctime)
-        )
+        html_files = archive.html_files(export_path / html_path)
+        records_extracted = extract_files(html_files)
         return records_extracted
 
     chrome_service = Service()
@@ -131,15 +98,16 @@ def main(filename: str, export_path: Path, html_path: Path = None):
     for i in range(0, len(inputs)):
         chrome_driver.execute_script("arguments[0].click()", inputs[i])
 
-        time.sleep(2)
+        # The chamber's cards are fetched and rendered into the shadow root
+        wait.until(chrome_driver, wait.network_idle())
+        wait.until(chrome_driver, wait.stable(CARDS_LENGTH))
 
         shadowRoot = chrome_driver.execute_script(
             """
         return document.querySelector('#scorecardContainer').shadowRoot
         """
         )
-        time.sleep(5)
-        
+
         page_source = shadowRoot.find_element(By.ID, "cards").get_attribute("innerHTML")
 
         extracted += extract(page_source)
@@ -150,7 +118,5 @@ def main(filename: str, export_path: Path, html_path: Path = None):
             filename,
         )
 
-        time.sleep(2)
-
     records_extracted = dict(enumerate(extracted))
     return records_extracted
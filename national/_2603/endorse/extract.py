@@ -1,17 +1,13 @@
-from datetime import datetime
 from pathlib import Path
-import time
 
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.common.exceptions import NoSuchElementException
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from common import archive, batch, driver_pool, parser, wait
+from common.archive import save_html
 
 
 URLS = (
@@ -20,10 +16,12 @@ URLS = (
     "https://314action.org/endorsed-candidates/us-senate-august-210810/",
 )
 
+MINIEXT_CARDS = (By.CSS_SELECTOR, "li[data-testid='selected-linked-record']")
+
 
 def extract(page_source, **additional_info):
 
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
     extracted = []
 
     cards = soup.select("a[id*=panel_]")
@@ -39,10 +37,10 @@ def extract(page_source, **additional_info):
 
 
 def extract_miniext(page_source, **additional_info):
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
     extracted = []
 
-    cards = soup.select("li[data-testid='selected-linked-record']")
+    cards = soup.select(MINIEXT_CARDS[1])
 
     for card in cards:
         name = card.select_one("p.text-base")
@@ -66,65 +64,26 @@ def extract_miniext(page_source, **additional_info):
 
 def extract_files(files: list[Path]):
 
-    extracted = []
-
-    for file in files:
-
-        with open(file, "r") as f:
-            extracted += extract(f.read())
-
-    records_extracted = dict(enumerate(extracted))
-
-    return records_extracted
-
-
-def save_html(
-    page_source,
-    filepath: Path,
-    filename: str,
-    *additional_info,
-):
-
-    filepath.mkdir(exist_ok=True)
-
-    soup = BeautifulSoup(page_source, "html.parser")
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    with open(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.html"
-        ),
-        "w",
-    ) as f:
-        f.write(str(soup))
+    return batch.iter_records(extract, files)
 
 
+@driver_pool.scoped
 def main(filename: str, export_path: Path, html_path: Path = None):
 
     if html_path:
-        html_files = filter(
-            lambda f: f.name.endswith(".html"),
-            (export_path / html_path).iterdir(),
-        )
-        records_extracted = extract_files(
-            sorted(html_files, key=lambda x: x.stat().st_ctime)
-        )
+        html_files = archive.html_files(export_path / html_path)
+        records_extracted = extract_files(html_files)
         return records_extracted
 
-    chrome_service = Service()
-    chrome_options = Options()
-    chrome_options.add_argument("incognito")
-    chrome_options.add_argument("headless")
-    chrome_driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
+    chrome_driver = driver_pool.checkout()
 
     extracted = []
 
     for url in URLS:
         chrome_driver.get(url)
 
-        time.sleep(2)
+        # The page shows either the cards or a miniExt frame, loaded by scripts
+        wait.until(chrome_driver, wait.network_idle())
 
         # close overlay
         ActionChains(chrome_driver).send_keys(Keys.ESCAPE).perform()
@@ -149,10 +108,13 @@ def main(filename: str, export_path: Path, html_path: Path = None):
                     load_more = chrome_driver.find_element(
                         By.XPATH, "//button[text()='Load more']"
                     )
+                    loaded = len(chrome_driver.find_elements(*MINIEXT_CARDS))
                     load_more.click()
-                    time.sleep(2)
+                    wait.until(
+                        chrome_driver, wait.element_count_changed(MINIEXT_CARDS, loaded)
+                    )
 
-                except NoSuchElementException:
+                except (NoSuchElementException, TimeoutException):
                     load_more = None
 
                 if load_more is None:
@@ -3,9 +3,9 @@ import argparse
 from pathlib import Path
 from datetime import datetime
 
-import pandas
 from dotenv import load_dotenv
 from national._2866.extract import main as extract
+from common.records import FORMATS, save_records
 
 
 def transform():
@@ -26,27 +26,6 @@ CONG_SESSIONS = [
 YEAR_TO_SESSION = dict(zip(YEARS, CONG_SESSIONS))
 
 
-def save_records(
-    records: dict[int, dict[str, str]],
-    filename: str,
-    filepath: Path,
-    *additional_info,
-):
-
-    filepath.mkdir(exist_ok=True)
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    df = pandas.DataFrame.from_dict(records, orient="index")
-    df.to_csv(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.csv"
-        ),
-        index=False,
-    )
-
-
 def main():
 
     parser = argparse.ArgumentParser()
@@ -102,6 +81,14 @@ def main():
         help="to match only",
     )
 
+    parser.add_argument(
+        "-o",
+        "--output_format",
+        choices=FORMATS,
+        default="csv",
+        help="format of the saved files, parquet keeps column types between stages",
+    )
+
     args = parser.parse_args()
 
     load_dotenv()
@@ -141,6 +128,7 @@ def main():
                 FILENAME + "Ratings-Extract",
                 args.export_path / "EXTRACT_FILES",
                 congress_session,
+                format=args.output_format,
             )
 
         # records_transformed = transform(records_extracted)
@@ -182,6 +170,7 @@ def main():
                 FILENAME + "Ratings-Extract",
                 args.export_path / "EXTRACT_FILES",
                 congress_session,
+                format=args.output_format,
             )
 
     # elif args.transform and not (any((args.extract, args.match))):
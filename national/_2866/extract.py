@@ -1,26 +1,24 @@
 # This is the webscraping script for Freedom First Society (FFS), sig_id=2866
-import time
-from datetime import datetime
 from pathlib import Path
 from collections import defaultdict
 
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import Select
 from selenium.webdriver.support.ui import WebDriverWait
-from bs4 import BeautifulSoup
+from common import archive, batch, driver_pool, parser, ratings, wait
+from common.archive import save_html
 
 
 URL = "https://www.freedomfirstsociety.org/scorecard/"
+ROOT = "div#scorecard-wrapper"
 RATINGS_METHODOLOGY = {"fa-check": "+", "fa-times": "-", "fa-question": "*"}
+RATINGS = ratings.register("2866", RATINGS_METHODOLOGY, default="?")
 
 
 def extract(page_source, **additional_info):
 
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source, ROOT)
 
     table = soup.find("div", {"id": "scorecard-wrapper"}).table
     bill_names = [p.text.strip() for p in table.find_all("th")[-1].find_all("p")]
@@ -33,15 +31,8 @@ def extract(page_source, **additional_info):
         columns = row.find_all("td")
 
         state_id_name = [td.text.strip() for td in columns[:2]]
-        scores = [i["class"][-1] for i in columns[2:][-1].find_all("i")]
-
         translated_scores = [
-            (
-                RATINGS_METHODOLOGY.get(score)
-                if score in RATINGS_METHODOLOGY.keys()
-                else "?"
-            )
-            for score in scores
+            RATINGS.get(i["class"][-1]) for i in columns[2:][-1].find_all("i")
         ]
 
         extracted.append(
@@ -55,38 +46,14 @@ def extract_files(files: list[Path]):
 
     extracted_by_session = defaultdict(list)
 
-    for file in files:
+    for file, records in zip(files, batch.map_files(extract, files)):
         cong_session = "-".join(file.name.split("_")[-1].split("-")[:2])
-
-        with open(file, "r") as f:
-            extracted_by_session[cong_session] += extract(f.read())
+        extracted_by_session[cong_session] += records or []
 
     return extracted_by_session
 
 
-def save_html(
-    page_source,
-    filepath: Path,
-    filename: str,
-    *additional_info,
-):
-
-    filepath.mkdir(exist_ok=True)
-
-    soup = BeautifulSoup(page_source, "html.parser")
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    with open(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.html"
-        ),
-        "w",
-    ) as f:
-        f.write(str(soup))
-
-
+@driver_pool.scoped
 def main(
     filename: str,
     export_path: Path,
@@ -95,20 +62,11 @@ def main(
 ):
 
     if html_path is not None:
-        html_files = filter(
-            lambda f: f.name.endswith(".html"),
-            (export_path / html_path).iterdir(),
-        )
-        extracted_by_session = extract_files(
-            sorted(html_files, key=lambda x: x.stat().st_ctime)
-        )
+        html_files = archive.html_files(export_path / html_path)
+        extracted_by_session = extract_files(html_files)
         return extracted_by_session
 
-    chrome_service = Service()
-    chrome_options = Options()
-    chrome_options.add_argument("incognito")
-    chrome_options.add_argument("headless")
-    chrome_driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
+    chrome_driver = driver_pool.checkout()
 
     chrome_driver.get(URL)
 
@@ -118,7 +76,13 @@ def main(
         )
     )
     # Backend framework doesn't load items even after the element is loaded
-    time.sleep(3)
+    wait.until(chrome_driver, wait.network_idle())
+    wait.until(
+        chrome_driver,
+        EC.presence_of_element_located(
+            (By.CSS_SELECTOR, "select[ng-model='scorecard.selected_congress'] option")
+        ),
+    )
 
     select_congress = Select(
         scorecard_form.find_element(
@@ -1,12 +1,6 @@
-import time
-from datetime import datetime
 from pathlib import Path
 from urllib.parse import urljoin, urlencode
 
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
@@ -15,6 +9,8 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.common.exceptions import NoSuchElementException, TimeoutException
 
 from tqdm import tqdm
+from common import archive, batch, driver_pool, parser, wait
+from common.archive import save_html
 
 URL = "https://www.newpolitics.org/our-candidates"
 PARAMS = {
@@ -22,10 +18,12 @@ PARAMS = {
     "level-of-government": "Federal,State",
 }
 
+CARD_COUNT = "return document.querySelectorAll('div.candidates_list_item').length"
+
 
 def extract_cards(page_source, **additional_info):
 
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
     extracted = []
 
     cards = soup.select("div.candidates_list_item")
@@ -56,7 +54,7 @@ def extract_cards(page_source, **additional_info):
 
 
 def extract_candidate(page_source, card_info: dict):
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
 
     position = soup.select_one("div.candidate_item_role")
 
@@ -65,58 +63,18 @@ def extract_candidate(page_source, card_info: dict):
 
 def extract_files(files: list[Path]):
 
-    extracted = []
-
-    for file in files:
-
-        with open(file, "r") as f:
-            extracted += extract_cards(f.read())
-
-    records_extracted = dict(enumerate(extracted))
-
-    return records_extracted
-
-
-def save_html(
-    page_source,
-    filepath: Path,
-    filename: str,
-    *additional_info,
-):
-
-    filepath.mkdir(exist_ok=True)
-
-    soup = BeautifulSoup(page_source, "html.parser")
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    with open(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.html"
-        ),
-        "w",
-    ) as f:
-        f.write(str(soup))
+    return batch.iter_records(extract_cards, files)
 
 
+@driver_pool.scoped
 def main(filename: str, export_path: Path, html_path: Path = None, year: str = None):
 
     if html_path:
-        html_files = filter(
-            lambda f: f.name.endswith(".html"),
-            (export_path / html_path).iterdir(),
-        )
-        records_extracted = extract_files(
-            sorted(html_files, key=lambda x: x.stat().st_ctime)
-        )
+        html_files = archive.html_files(export_path / html_path)
+        records_extracted = extract_files(html_files)
         return records_extracted
 
-    chrome_service = Service()
-    chrome_options = Options()
-    chrome_options.add_argument("incognito")
-    # chrome_options.add_argument("headless")
-    chrome_driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
+    chrome_driver = driver_pool.checkout(("incognito",))
 
     if year is not None:
         PARAMS["year"] = year
@@ -125,7 +83,8 @@ def main(filename: str, export_path: Path, html_path: Path = None, year: str = N
 
     chrome_driver.get(urljoin(URL, query_string))
 
-    time.sleep(5)
+    # The cards are filtered by the query string once the page's scripts run
+    wait.until(chrome_driver, wait.network_idle())
 
     # close overlay
     ActionChains(chrome_driver).send_keys(Keys.ESCAPE).perform()
@@ -146,7 +105,7 @@ def main(filename: str, export_path: Path, html_path: Path = None, year: str = N
         else:
             chrome_driver.execute_script("arguments[0].click()", view_more)
 
-    time.sleep(3)
+    wait.until(chrome_driver, wait.stable(CARD_COUNT))
 
     save_html(
         chrome_driver.page_source,
@@ -1,11 +1,10 @@
 import os
 import argparse
 from pathlib import Path
-from datetime import datetime
 
-import pandas
 from dotenv import load_dotenv
 from national._3308.extract import main as extract
+from common.records import FORMATS, save_records
 
 
 def transform():
@@ -21,27 +20,6 @@ def match():
 FILENAME = f"_NA_ClimateCabinet_"
 
 
-def save_records(
-    records: dict[int, dict[str, str]],
-    filename: str,
-    filepath: Path,
-    *additional_info,
-):
-
-    filepath.mkdir(exist_ok=True)
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    df = pandas.DataFrame.from_dict(records, orient="index")
-    df.to_csv(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.csv"
-        ),
-        index=False,
-    )
-
-
 def main():
 
     parser = argparse.ArgumentParser()
@@ -68,6 +46,13 @@ def main():
         help="filepath to HTML directory",
     )
 
+    parser.add_argument(
+        "-n",
+        "--network",
+        action="store_true",
+        help="read the scorecard data from network responses",
+    )
+
     parser.add_argument(
         "-e",
         "--extract",
@@ -89,6 +74,14 @@ def main():
         help="to match only",
     )
 
+    parser.add_argument(
+        "-o",
+        "--output_format",
+        choices=FORMATS,
+        default="csv",
+        help="format of the saved files, parquet keeps column types between stages",
+    )
+
     args = parser.parse_args()
 
     load_dotenv()
@@ -104,12 +97,13 @@ def main():
     if not any((args.extract, args.transform, args.match)):
 
         records_extracted = extract(
-            FILENAME + "Ratings", args.export_path, args.html_path
+            FILENAME + "Ratings", args.export_path, args.html_path, args.network
         )
         save_records(
             records_extracted,
             FILENAME + "Ratings-Extract",
             args.export_path / "EXTRACT_FILES",
+            format=args.output_format,
         )
 
         # records_transformed = transform(records_extracted)
@@ -137,11 +131,14 @@ def main():
 
     elif args.extract and not (any((args.transform, args.match))):
 
-        records_extracted = extract(FILENAME + "Ratings", args.export_path)
+        records_extracted = extract(
+            FILENAME + "Ratings", args.export_path, capture_network=args.network
+        )
         save_records(
             records_extracted,
             FILENAME + "Ratings-Extract",
             args.export_path / "EXTRACT_FILES",
+            format=args.output_format,
         )
 
     # elif args.transform and not (any((args.extract, args.match))):
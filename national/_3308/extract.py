@@ -1,28 +1,36 @@
 import re
-import time
-from datetime import datetime
-from collections import defaultdict
 from pathlib import Path
 
-from bs4 import BeautifulSoup
 from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from selenium.common.exceptions import (
+    NoSuchElementException,
+    StaleElementReferenceException,
+    TimeoutException,
+)
 
 from tqdm import tqdm
+from common import archive, batch, capture, driver_pool, parser, wait
+from common.archive import save_html
 
 URL = "https://climatecabinet.org/climate-scores"
+RETOOL_API = r"climatecabinet\.retool\.com/api"
+
+# Columns of the scores query, which the candidate card is bound to. Other
+# Retool payloads (app config, user, query metadata) don't have them.
+SCORE_COLUMNS = ("Chamber_dist", "Party_long")
+
+# Seconds to wait for the next candidate to be selected after moving down
+ROW_TIMEOUT = 1
 
 
 def extract_card(page_source, **additional_info):
 
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
     card = soup.select_one("div[data-testid=spotlight--0]")
 
     office = card.find("div", {"class": "_retool-container-spotlight_office"})
@@ -37,19 +45,14 @@ def extract_card(page_source, **additional_info):
 
 def extract_table(page_source, **additional_info):
 
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
 
     header_containers = [div for div in soup.select("div[role=columnheader]")]
 
     headers = []
 
     for header in header_containers:
-        col = header.find(
-            lambda tag: tag.name == "span"
-            and tag.has_attr("data-testid")
-            and "HeaderCellContents" in tag.get("data-testid")
-        )
-
+        col = header.select_one("span[data-testid*=HeaderCellContents]")
         headers.append(col.get_text(strip=True))
 
     row_container = soup.select_one("div[role=rowgroup]")
@@ -65,32 +68,41 @@ def extract_table(page_source, **additional_info):
     return extracted
 
 
-def extract_files(files: list[Path]):
+def extract_file(page_source):
+    """Reads an archived page from one tree: the state and row it was saved
+    on, the rows rendered at the time and the selected candidate's card"""
+
+    soup = parser.parse(page_source)
 
-    extracted = defaultdict(dict)
+    selected_state = soup.select_one("input[id*=state_select]")
+    selected_row = soup.select_one("div[role=row][aria-selected=true]")
 
-    for file in tqdm(files, "Extracting files..."):
+    return (
+        selected_state.get("value"),
+        str(selected_row.get("data-item-index")),
+        extract_table(soup),
+        extract_card(soup),
+    )
 
-        with open(file, "r") as f:
-            html = f.read()
-            soup = BeautifulSoup(html, "html.parser")
 
-            selected_state = soup.select_one("input[id*=state_select]")
-            selected_row = soup.select_one("div[role=row][aria-selected=true]")
+def extract_files(files: list[Path]):
 
-            row_index = str(selected_row.get("data-item-index"))
-            state_text = selected_state.get("value")
+    # Rows by state, then by their index in the state's table
+    extracted = {}
 
-            # added = []
+    for result in batch.iter_results(extract_file, files, desc="Extracting files..."):
+        if result is None:
+            continue
 
-            for i, _e in extract_table(html).items():
-                if i not in extracted[state_text]:
-                    # added.append(_e)
-                    extracted[state_text].update({i: _e})
+        state_text, row_index, rows, card = result
+        state_rows = extracted.setdefault(state_text, {})
 
-            # card_extraction = extract_card(html)
+        # The table is virtualized, so each page only holds the rows around the
+        # selected one. The first page a row appears on is kept.
+        for i, row in rows.items():
+            state_rows.setdefault(i, row)
 
-            extracted[state_text][row_index].update(extract_card(html))
+        state_rows.setdefault(row_index, {}).update(card)
 
     rearranged_e = []
 
@@ -104,29 +116,6 @@ def extract_files(files: list[Path]):
     return records_extracted
 
 
-def save_html(
-    page_source,
-    filepath: Path,
-    filename: str,
-    *additional_info,
-):
-
-    filepath.mkdir(exist_ok=True)
-
-    soup = BeautifulSoup(page_source, "html.parser")
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    with open(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.html"
-        ),
-        "w",
-    ) as f:
-        f.write(str(soup))
-
-
 def js_click(chrome_driver, element):
     chrome_driver.execute_script(
         """
@@ -151,13 +140,18 @@ def scroll_states(driver, func=None):
 
     progress_bar = tqdm(total=1, desc="Commencing...")
     selected_states = []
-    state_button = driver.execute_script(state_button_script)
+    state_button = wait.until(
+        driver, lambda driver: driver.execute_script(state_button_script)
+    )
 
     extracted = []
 
     while True:
         js_click(driver, state_button)
-        time.sleep(1)
+        wait.until(
+            driver,
+            lambda driver: driver.execute_script(state_container_script),
+        )
 
         state_container = driver.execute_script(state_container_script)
         states = driver.execute_script(states_script, state_container)
@@ -172,7 +166,7 @@ def scroll_states(driver, func=None):
             s_text = state.text
             if not s_text in selected_states:
                 js_click(driver, state)
-                time.sleep(2)
+                wait.until(driver, wait.network_idle())
 
                 selected_states.append(s_text)
                 progress_bar.set_description(f"Extracing {s_text}...")
@@ -212,8 +206,15 @@ def scroll_candidates(driver: webdriver.Chrome, state, save_html=None):
         arguments[0].dispatchEvent(event)                    
         """
 
+    def selected_row():
+        try:
+            return table.find_element(
+                By.CSS_SELECTOR, "div[role=row][aria-selected=true]"
+            ).get_attribute("data-item-index")
+        except (NoSuchElementException, StaleElementReferenceException):
+            return None
+
     while True:
-        time.sleep(1)
 
         try:
             WebDriverWait(driver, 10).until(
@@ -226,25 +227,30 @@ def scroll_candidates(driver: webdriver.Chrome, state, save_html=None):
         except TimeoutException:
             print("Loading card take too long...")
 
-        currently_selected = table.find_element(
-            By.CSS_SELECTOR, "div[role=row][aria-selected=true]"
-        )
-        row_num = currently_selected.get_attribute("data-item-index")
+        row_num = selected_row()
 
         if row_num in selected_rows:
             break
 
+        page_source = driver.page_source
+
         if save_html:
-            save_html(driver, state)
+            save_html(page_source, state)
 
         extracted.update(extract_table(table.get_attribute("outerHTML"), state=state))
-        extracted_cards.update({row_num: extract_card(driver.page_source)})
+        extracted_cards.update({row_num: extract_card(page_source)})
         selected_rows.append(row_num)
 
         progress_bar_candidates.update(1)
 
         driver.execute_script(table_scroll_script, table)
 
+        # The last row stays selected, which ends the loop above
+        try:
+            wait.until(driver, lambda _: selected_row() != row_num, ROW_TIMEOUT)
+        except TimeoutException:
+            pass
+
     for i, card_record in extracted_cards.items():
         if i in extracted:
             extracted[i].update(card_record)
@@ -252,21 +258,50 @@ def scroll_candidates(driver: webdriver.Chrome, state, save_html=None):
     return list(extracted.values())
 
 
-def main(filename: str, export_path: Path, html_path: Path = None):
+def capture_states(driver, filename: str, export_path: Path):
+
+    # Records by their contents, in the order they were first captured
+    extracted = {}
+
+    def capture_state(driver, state):
+
+        for _, payload in capture.wait_for_json(driver, RETOOL_API):
+            capture.save_json(payload, export_path / "JSON_FILES", filename, state)
+
+            for record in capture.to_records(payload, SCORE_COLUMNS):
+                key = repr(sorted(record.items()))
+
+                # Rows of the first load are labeled once their state is
+                # selected
+                if not extracted.get(key, {}).get("state"):
+                    extracted[key] = record | {"state": state}
+
+        return []
+
+    # The first load already carries the default state's data, which may not
+    # be requested again when that state is selected
+    capture_state(driver, "")
+    scroll_states(driver, capture_state)
+
+    return list(extracted.values())
+
+
+@driver_pool.scoped
+def main(
+    filename: str,
+    export_path: Path,
+    html_path: Path = None,
+    capture_network: bool = False,
+):
 
     if html_path:
-        html_files = filter(
-            lambda f: f.name.endswith(".html"),
-            (export_path / html_path).iterdir(),
-        )
-        records_extracted = extract_files(sorted(html_files))
+        html_files = archive.html_files(export_path / html_path)
+        records_extracted = extract_files(html_files)
         return records_extracted
 
-    chrome_service = Service()
-    chrome_options = Options()
-    chrome_options.add_argument("incognito")
-    chrome_options.add_argument("headless")
-    chrome_driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
+    chrome_driver = (
+        capture.checkout() if capture_network else driver_pool.checkout()
+    )
 
     chrome_driver.get(URL)
 
@@ -279,9 +314,15 @@ def main(filename: str, export_path: Path, html_path: Path = None):
 
     # iframe = wait_for_js_script(chrome_driver, iframe_script, elname='iframe')
 
-    time.sleep(5)
+    iframe = wait.until(
+        chrome_driver, lambda driver: driver.execute_script(iframe_script)
+    )
+
+    if capture_network:
+        # Loads the Retool app on its own so its requests belong to the page
+        chrome_driver.get(iframe.get_attribute("src"))
+        return dict(enumerate(capture_states(chrome_driver, filename, export_path)))
 
-    iframe = chrome_driver.execute_script(iframe_script)
     chrome_driver.switch_to.frame(iframe)
 
     extracted = scroll_states(
@@ -289,8 +330,8 @@ def main(filename: str, export_path: Path, html_path: Path = None):
         lambda driver, state: scroll_candidates(
             driver,
             state,
-            lambda driver, state: save_html(
-                driver.page_source, export_path / "HTML_FILES", filename, state
+            lambda page_source, state: save_html(
+                page_source, export_path / "HTML_FILES", filename, state
             ),
         ),
     )
@@ -1,15 +1,13 @@
-from datetime import datetime
 from pathlib import Path
 from itertools import chain
 from urllib.parse import urljoin
 
 from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.action_chains import ActionChains
 from tqdm import tqdm
+from common import archive, batch, driver_pool, parser
+from common.archive import save_html
 
 
 URL = "https://vote.norml.org/"
@@ -17,7 +15,7 @@ URL = "https://vote.norml.org/"
 
 def extract(page_source, **additional_info) -> list:
 
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
     race_containers = soup.find_all(class_="race-container")
     state = soup.find(class_="big-title").get_text(strip=True)
     state_text = state.replace(" Guide", "")
@@ -46,12 +44,7 @@ def extract(page_source, **additional_info) -> list:
 
 def extract_files(files: list):
 
-    extracted = []
-
-    for file in files:
-
-        with open(file, "r") as f:
-            extracted += extract(f.read())
+    extracted = batch.extract_records(extract, files)
 
     return {
         "candidates": list(
@@ -71,46 +64,15 @@ def get_states(page_source):
     return {a.get_text(strip=True): urljoin(URL, a["href"]) for a in state_links}
 
 
-def save_html(
-    page_source,
-    filepath: Path,
-    filename: str,
-    *additional_info,
-):
-
-    filepath.mkdir(exist_ok=True)
-
-    soup = BeautifulSoup(page_source, "html.parser")
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    with open(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.html"
-        ),
-        "w",
-    ) as f:
-        f.write(str(soup))
-
-
+@driver_pool.scoped
 def main(filename, export_path: Path, html_path: Path = None):
 
     if html_path:
-        html_files = filter(
-            lambda f: f.name.endswith(".html"),
-            (export_path / html_path).iterdir(),
-        )
-        records_extracted = extract_files(
-            sorted(html_files, key=lambda x: x.stat().st_ctime)
-        )
+        html_files = archive.html_files(export_path / html_path)
+        records_extracted = extract_files(html_files)
         return records_extracted
 
-    chrome_service = Service()
-    chrome_options = Options()
-    chrome_options.add_argument("incognito")
-    chrome_options.add_argument("headless")
-    chrome_driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
+    chrome_driver = driver_pool.checkout()
 
     chrome_driver.get(URL)
 
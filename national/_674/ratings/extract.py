@@ -1,13 +1,12 @@
-import time
 from datetime import datetime
 from pathlib import Path
 
 import pandas
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
 from tqdm import tqdm
+from common import archive, driver_pool, parser, wait
+from common.archive import save_html
 
 
 URL = "https://hslf.org/current_scorecard"
@@ -15,7 +14,7 @@ URL = "https://hslf.org/current_scorecard"
 
 def extract_candidate(page_source):
 
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
 
     rep_container = soup.find("div", {"id": "rep"})
 
@@ -38,7 +37,7 @@ def extract_candidate(page_source):
 
 def extract(page_source, **additional_info) -> list[dict[str, str]]:
 
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
     tables = soup.find_all("table", {"class": "scorecard_table"})
 
     extracted = []
@@ -60,37 +59,19 @@ def extract(page_source, **additional_info) -> list[dict[str, str]]:
 
 def extract_files(files: list[Path]):
 
-    with open(files[0], "r") as f:
-        extracted = extract(f.read())
+    extracted = extract(archive.read_html(files[0]))
 
     extracted_d = {e["row_id"]: e for e in extracted}
 
     for file in files[1:]:
         id_selected = file.name.split("_")[-1].split("-")[0]
-        with open(file, "r") as f:
-            extracted_d[id_selected].update(extract(f.read()))
+        extracted_d[id_selected].update(extract(archive.read_html(file)))
 
     records_extracted = dict(enumerate(extracted))
 
     return records_extracted
 
 
-def save_html(page_source, filepath, filename, *additional_info):
-
-    soup = BeautifulSoup(page_source, "html.parser")
-
-    filepath.mkdir(exist_ok=True)
-
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    with open(
-        filepath / f"{filename}_{'-'.join(map(str, additional_info))}"
-        f"{'-' if additional_info else ''}{timestamp}.html",
-        "w",
-    ) as f:
-        f.write(str(soup))
-
-
 def save_records(extracted: dict[int, dict[str, str]], filepath, filename):
 
     filepath.mkdir(exist_ok=True)
@@ -104,27 +85,22 @@ def save_records(extracted: dict[int, dict[str, str]], filepath, filename):
     )
 
 
+@driver_pool.scoped
 def main(filename: str, export_path: Path, html_path: Path = None):
 
     if html_path:
-        html_files = filter(
-            lambda f: f.name.endswith(".html"),
-            (export_path / html_path).iterdir(),
-        )
-        records_extracted = extract_files(
-            sorted(html_files, key=lambda x: x.stat().st_ctime)
-        )
+        html_files = archive.html_files(export_path / html_path)
+        records_extracted = extract_files(html_files)
         return records_extracted
 
-    chrome_service = Service()
-    chrome_options = Options()
-    chrome_options.add_argument("incognito")
-    chrome_options.add_argument("headless")
-    chrome_driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
+    chrome_driver = driver_pool.checkout()
 
     chrome_driver.get(URL)
 
-    time.sleep(2)
+    wait.until(
+        chrome_driver,
+        EC.presence_of_element_located((By.CSS_SELECTOR, "table.scorecard_table")),
+    )
 
     extracted = extract(chrome_driver.page_source)
     save_html(
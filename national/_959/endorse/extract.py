@@ -1,11 +1,5 @@
-from datetime import datetime
 from pathlib import Path
-import time
 
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
@@ -14,13 +8,22 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.common.exceptions import NoSuchElementException
 
 from tqdm import tqdm
+from common import archive, batch, driver_pool, parser, wait
+from common.archive import save_html
 
 URL = "https://retiredamericans.org/2024-federal-candidate-endorsements/"
+MAP_PATHS = "div.i_world_map g > path"
+TOOLTIP_TEXT = """
+    const tooltip = document.querySelector(
+        "div.i_world_map .google-visualization-tooltip"
+    );
+    return tooltip ? tooltip.textContent : null;
+"""
 
 
 def extract(page_source, **additional_info):
 
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
     tooltips = soup.select("div.i_world_map li.google-visualization-tooltip-item")
 
     state = tooltips[0] if len(tooltips) > 0 else None
@@ -43,62 +46,29 @@ def extract(page_source, **additional_info):
 
 def extract_files(files: list[Path]):
 
-    extracted = []
-
-    for file in files:
-
-        with open(file, "r") as f:
-            extracted += extract(f.read())
-
-    records_extracted = dict(enumerate(extracted))
-
-    return records_extracted
-
-
-def save_html(
-    page_source,
-    filepath: Path,
-    filename: str,
-    *additional_info,
-):
-
-    filepath.mkdir(exist_ok=True)
-
-    soup = BeautifulSoup(page_source, "html.parser")
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    with open(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.html"
-        ),
-        "w",
-    ) as f:
-        f.write(str(soup))
+    return batch.iter_records(extract, files)
 
 
+@driver_pool.scoped
 def main(filename: str, export_path: Path, html_path: Path = None):
 
     if html_path:
-        html_files = filter(
-            lambda f: f.name.endswith(".html"),
-            (export_path / html_path).iterdir(),
-        )
-        records_extracted = extract_files(
-            sorted(html_files, key=lambda x: x.stat().st_ctime)
-        )
+        html_files = archive.html_files(export_path / html_path)
+        records_extracted = extract_files(html_files)
         return records_extracted
 
-    chrome_service = Service()
-    chrome_options = Options()
-    chrome_options.add_argument("incognito")
-    chrome_options.add_argument("headless")
-    chrome_driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
+    chrome_driver = driver_pool.checkout()
 
     chrome_driver.get(URL)
 
-    time.sleep(5)
+    # The map is drawn by the charts script, and the modal shows up with it
+    wait.until(
+        chrome_driver,
+        EC.all_of(
+            EC.presence_of_element_located((By.CSS_SELECTOR, MAP_PATHS)),
+            EC.presence_of_element_located((By.CSS_SELECTOR, "div#myModalRetired")),
+        ),
+    )
 
     # close overlay
     ActionChains(chrome_driver).send_keys(Keys.ESCAPE).perform()
@@ -117,6 +87,7 @@ def main(filename: str, export_path: Path, html_path: Path = None):
 
     for path_el in tqdm(map_paths, desc="Hovering map..."):
         ActionChains(chrome_driver).move_to_element(path_el).perform()
+        wait.until(chrome_driver, wait.stable(TOOLTIP_TEXT, 0.15))
         _e = extract(chrome_driver.page_source)
 
         not_appended = set()
@@ -133,8 +104,6 @@ def main(filename: str, export_path: Path, html_path: Path = None):
                 filename,
             )
 
-        time.sleep(0.15)
-
     records_extracted = dict(enumerate(extracted))
 
     return records_extracted
@@ -1,7 +1,6 @@
 
 import sys
 import pandas
-import time
 
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
@@ -119,9 +118,14 @@ def main():
         _extracted = extract(chrome_driver)
 
         if extracted:
-            while list(extracted.values())[-1] == _extracted:
-                time.sleep(1)
-                _extracted = extract(chrome_driver)
+            previous = list(extracted.values())[-1]
+
+            def office_changed(driver):
+                _extracted = extract(driver)
+                return _extracted if _extracted != previous else False
+
+            _extracted = WebDriverWait(chrome_driver, 60, poll_frequency=0.25).until(
+                office_changed)
 
         extracted[office_name] = _extracted
         download_page(chrome_driver, office=office_name)
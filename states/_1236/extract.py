@@ -1,12 +1,8 @@
 from datetime import datetime
 from pathlib import Path
-from urllib.parse import urljoin
-from pypdf import PdfWriter
+from urllib.parse import urljoin, urlparse
+from pypdf import PdfReader, PdfWriter
 
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
@@ -15,33 +11,39 @@ from selenium.webdriver.support.ui import WebDriverWait, Select
 from selenium.common.exceptions import NoSuchElementException
 
 from tqdm import tqdm
+from common import driver_pool, fetch
+from common.archive import save_html
 
 URL = "https://foac-pac.org/Voter-Guide"
+PDF_WORKERS = 8
 
 
-def save_html(
-    page_source,
-    filepath: Path,
-    filename: str,
-    *additional_info,
-):
+def pdf_filename(url: str, i: int) -> str:
+    # Prefixed with the guide's place in the list, which is the merge order
+    name = Path(urlparse(url).path).name or "guide"
+    return f"{i:03d}_{name if name.lower().endswith('.pdf') else name + '.pdf'}"
 
-    filepath.mkdir(exist_ok=True)
 
-    soup = BeautifulSoup(page_source, "html.parser")
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
+def merge(pdf_files, merged_filepath: Path) -> Path:
+    """Appends each PDF to the merged document as it arrives. A PDF is let go
+    once it's appended, so only the merged document's pages are held, not
+    every downloaded document."""
+
+    writer = PdfWriter()
+
+    for pdf_file in pdf_files:
+        if pdf_file is None:
+            continue
+
+        writer.append(PdfReader(pdf_file))
 
-    with open(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.html"
-        ),
-        "w",
-    ) as f:
-        f.write(str(soup))
+    with open(merged_filepath, "wb") as f:
+        writer.write(f)
 
+    return merged_filepath
 
+
+@driver_pool.scoped
 def main(filename: str, export_path: Path, html_path: Path = None):
 
     # if html_path:
@@ -54,32 +56,17 @@ def main(filename: str, export_path: Path, html_path: Path = None):
     #     )
     #     return records_extracted
 
-    download_dir = Path.home() / "Downloads" / "PDF_FILES"
-    download_dir.mkdir(exist_ok=True)
-
-    chrome_service = Service()
-    chrome_options = Options()
-    chrome_options.add_argument("incognito")
-    chrome_options.add_argument("headless")
-    chrome_options.add_argument("disable-gpu")
-    chrome_options.add_argument("no-sandbox")
-    chrome_options.add_argument("ignore-ssl-errors=yes")
-    chrome_options.add_argument("ignore-certificate-errors")
-
-    chrome_prefs = {
-        "download.default_directory": str(
-            download_dir
-        ),  # Set the download folder relative to home
-        "profile.content_settings.exceptions.automatic_downloads.*.setting": 1,  # Enable automatic downloads
-        "download.prompt_for_download": False,  # Don't prompt for download
-        "download.directory_upgrade": True,
-        "plugins.always_open_pdf_externally": True,  # Ensure PDFs are downloaded instead of viewed
-        # "profile.content_settings.exceptions.automatic_downloads.*": {"setting": 1},
-    }
-
-    chrome_options.add_experimental_option("prefs", chrome_prefs)
-
-    chrome_driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
+    # The browser only collects the guides' URLs, they're downloaded over HTTP
+    chrome_driver = driver_pool.checkout(
+        (
+            "incognito",
+            "headless",
+            "disable-gpu",
+            "no-sandbox",
+            "ignore-ssl-errors=yes",
+            "ignore-certificate-errors",
+        )
+    )
 
     chrome_driver.get(URL)
 
@@ -98,8 +85,10 @@ def main(filename: str, export_path: Path, html_path: Path = None):
 
     federal_urls = []
     state_urls = []
+    states = []
 
     for option in tqdm(select.options[1:], desc="Collecting URLs..."):
+        states.append(option.text.strip())
         option.click()
         form_holder = WebDriverWait(chrome_driver, 10).until(
             EC.visibility_of_element_located((By.CSS_SELECTOR, "#form_holder"))
@@ -117,26 +106,44 @@ def main(filename: str, export_path: Path, html_path: Path = None):
             EC.invisibility_of_element((By.CSS_SELECTOR, "#form_holder"))
         )
 
-    federal_download_dir = download_dir / "Federal"
-    states_download_dir = download_dir / "States"
-
-    federal_download_dir.mkdir(exist_ok=True)
-    states_download_dir.mkdir(exist_ok=True)
+    # The guides are downloaded with the browser's cookies and, like the
+    # browser, without checking the site's certificate
+    session = fetch.browser_session(chrome_driver, verify=False)
 
-    chrome_driver.execute_cdp_cmd(
-        "Page.setDownloadBehavior",
-        {"behavior": "allow", "downloadPath": str(federal_download_dir)},
-    )
-
-    for url in tqdm(federal_urls, desc="Downloading Federal PDFs..."):
-        chrome_driver.get(url)
-
-    chrome_driver.execute_cdp_cmd(
-        "Page.setDownloadBehavior",
-        {"behavior": "allow", "downloadPath": str(states_download_dir)},
-    )
+    pdf_path = export_path / "PDF_FILES"
+    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
+    failed = []
+
+    def track(kind: str, pdf_files):
+        for state, pdf_file in zip(states, pdf_files):
+            if pdf_file is None:
+                failed.append(f"{state} ({kind})")
+            yield pdf_file
+
+    for kind, urls in (("Federal", federal_urls), ("States", state_urls)):
+        # Files are named by their place in this run's list, so each run
+        # downloads into its own directory rather than reusing another run's
+        download_dir = pdf_path / kind / timestamp
+        download_dir.mkdir(parents=True, exist_ok=True)
+
+        downloads = [
+            (url, download_dir / pdf_filename(url, i)) for i, url in enumerate(urls)
+        ]
+
+        merge(
+            tqdm(
+                track(kind, fetch.download_all(downloads, PDF_WORKERS, session)),
+                total=len(downloads),
+                desc=f"Downloading {kind} PDFs...",
+            ),
+            pdf_path / f"{filename}_{kind}-{timestamp}.pdf",
+        )
 
-    for url in tqdm(state_urls, desc="Downloading States PDFs..."):
-        chrome_driver.get(url)
+    # The merged guides leave out the ones that failed, so the run shouldn't
+    # pass for a complete one
+    if failed:
+        raise RuntimeError(
+            f"{len(failed)} voter guides failed to download: {', '.join(failed)}"
+        )
 
     return []
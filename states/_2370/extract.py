@@ -1,11 +1,6 @@
-import time
-from datetime import datetime
 from pathlib import Path
 
 from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
@@ -13,12 +8,13 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.common.exceptions import NoSuchElementException
 
-from tqdm import tqdm
+from common import archive, batch, driver_pool, parser, wait
+from common.archive import save_html
 
 
 def extract(page_source, **additional_info):
 
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
     sheet_container = soup.find("div", {"id": "sheets-viewport"})
 
     table = sheet_container.find("table")
@@ -37,41 +33,13 @@ def extract(page_source, **additional_info):
     return extract_table(table)
 
 
-def extract_files(files: list[Path]):
-
-    extracted = []
-
-    for file in files:
-        with open(file, "r") as f:
-            state_name = file.name.split("_")[-1].split("-")[0]
-            extracted += extract(f.read(), state_name=state_name)
-
-    records_extracted = dict(enumerate(extracted))
-
-    return records_extracted
-
-
-def save_html(
-    page_source,
-    filepath: Path,
-    filename: str,
-    *additional_info,
-):
+def state_name_of(file: Path):
+    return {"state_name": file.name.split("_")[-1].split("-")[0]}
 
-    filepath.mkdir(exist_ok=True)
 
-    soup = BeautifulSoup(page_source, "html.parser")
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
+def extract_files(files: list[Path]):
 
-    with open(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.html"
-        ),
-        "w",
-    ) as f:
-        f.write(str(soup))
+    return batch.iter_records(extract, files, state_name_of)
 
 
 def get_states(page_source):
@@ -80,23 +48,15 @@ def get_states(page_source):
     return [o.get("value") for o in select.find_all("option") if o.get("value")]
 
 
+@driver_pool.scoped
 def main(filename: str, export_path: Path, url, html_path: Path = None):
 
     if html_path:
-        html_files = filter(
-            lambda f: f.name.endswith(".html"),
-            (export_path / html_path).iterdir(),
-        )
-        records_extracted = extract_files(
-            sorted(html_files, key=lambda x: x.stat().st_ctime)
-        )
+        html_files = archive.html_files(export_path / html_path)
+        records_extracted = extract_files(html_files)
         return records_extracted
 
-    chrome_service = Service()
-    chrome_options = Options()
-    chrome_options.add_argument("incognito")
-    chrome_options.add_argument("headless")
-    chrome_driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
+    chrome_driver = driver_pool.checkout()
 
     chrome_driver.get(url)
 
@@ -111,7 +71,13 @@ def main(filename: str, export_path: Path, url, html_path: Path = None):
 
     chrome_driver.switch_to.frame(iframe)
 
-    time.sleep(1)
+    # Sheets with several tabs show the selected one in another frame
+    wait.until(
+        chrome_driver,
+        EC.presence_of_element_located(
+            (By.CSS_SELECTOR, "#pageswitcher-content, #sheets-viewport table")
+        ),
+    )
 
     iframe_2 = chrome_driver.execute_script(
         """
@@ -121,7 +87,10 @@ def main(filename: str, export_path: Path, url, html_path: Path = None):
 
     if iframe_2 is not None:
         chrome_driver.switch_to.frame(iframe_2)
-        time.sleep(1)
+        wait.until(
+            chrome_driver,
+            EC.presence_of_element_located((By.CSS_SELECTOR, "#sheets-viewport table")),
+        )
 
     save_html(chrome_driver.page_source, export_path / "HTML_FILES", filename)
 
@@ -1,10 +1,7 @@
-from datetime import datetime
 from pathlib import Path
+from functools import partial
 
 from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
@@ -13,13 +10,15 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.common.exceptions import NoSuchElementException
 
 from tqdm import tqdm
+from common import archive, batch, driver_pool, parser
+from common.archive import save_html
 
 URL = "https://progressreport.betterutah.org/legislators/"
 
 
 def extract(page_source, year, **additional_info):
 
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
 
     card_body = soup.select_one(".name-score-header .card-body")
     name = card_body.select_one(".card-title")
@@ -59,16 +58,9 @@ def extract(page_source, year, **additional_info):
 
 def extract_files(files: list[Path], year):
 
-    extracted = []
-
-    for file in tqdm(files, desc="Reading files..."):
-        with open(file, "r") as f:
-            contents = f.read()
-            extracted.append(extract(contents, year))
-
-    records_extracted = dict(enumerate(extracted))
-
-    return records_extracted
+    return batch.iter_records(
+        partial(extract, year=year), files, desc="Reading files..."
+    )
 
 
 def get_candidate_urls(page_source):
@@ -77,46 +69,15 @@ def get_candidate_urls(page_source):
     return [a["href"] for a in links]
 
 
-def save_html(
-    page_source,
-    filepath: Path,
-    filename: str,
-    *additional_info,
-):
-
-    filepath.mkdir(exist_ok=True)
-
-    soup = BeautifulSoup(page_source, "html.parser")
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    with open(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.html"
-        ),
-        "w",
-    ) as f:
-        f.write(str(soup))
-
-
+@driver_pool.scoped
 def main(filename: str, export_path: Path, year: int, html_path: Path = None):
 
     if html_path:
-        html_files = filter(
-            lambda f: f.name.endswith(".html"),
-            (export_path / html_path).iterdir(),
-        )
-        records_extracted = extract_files(
-            sorted(html_files, key=lambda x: x.stat().st_ctime), year
-        )
+        html_files = archive.html_files(export_path / html_path)
+        records_extracted = extract_files(html_files, year)
         return records_extracted
 
-    chrome_service = Service()
-    chrome_options = Options()
-    chrome_options.add_argument("incognito")
-    chrome_options.add_argument("headless")
-    chrome_driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
+    chrome_driver = driver_pool.checkout()
 
     chrome_driver.get(URL)
 
@@ -1,17 +1,13 @@
-import time
-from datetime import datetime
 from pathlib import Path
 
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.common.exceptions import NoSuchElementException
+from common import archive, batch, driver_pool, parser, wait
+from common.archive import save_html
 
 
 URL = "https://www.plannedparenthoodaction.org/planned-parenthood-advocates-wisconsin/elections/endorsed-candidates"
@@ -19,7 +15,7 @@ URL = "https://www.plannedparenthoodaction.org/planned-parenthood-advocates-wisc
 
 def extract(page_source, **additional_info):
 
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
     cards = soup.select(".tiles-filtered section[data-tile='column']")
 
     extracted = []
@@ -43,58 +39,18 @@ def extract(page_source, **additional_info):
 
 def extract_files(files: list[Path]):
 
-    extracted = []
-
-    for file in files:
-
-        with open(file, "r") as f:
-            extracted += extract(f.read())
-
-    records_extracted = dict(enumerate(extracted))
-
-    return records_extracted
-
-
-def save_html(
-    page_source,
-    filepath: Path,
-    filename: str,
-    *additional_info,
-):
-
-    filepath.mkdir(exist_ok=True)
-
-    soup = BeautifulSoup(page_source, "html.parser")
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    with open(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.html"
-        ),
-        "w",
-    ) as f:
-        f.write(str(soup))
+    return batch.iter_records(extract, files)
 
 
+@driver_pool.scoped
 def main(filename: str, export_path: Path, html_path: Path = None):
 
     if html_path:
-        html_files = filter(
-            lambda f: f.name.endswith(".html"),
-            (export_path / html_path).iterdir(),
-        )
-        records_extracted = extract_files(
-            sorted(html_files, key=lambda x: x.stat().st_ctime)
-        )
+        html_files = archive.html_files(export_path / html_path)
+        records_extracted = extract_files(html_files)
         return records_extracted
 
-    chrome_service = Service()
-    chrome_options = Options()
-    chrome_options.add_argument("incognito")
-    chrome_options.add_argument("headless")
-    chrome_driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
+    chrome_driver = driver_pool.checkout()
 
     chrome_driver.get(URL)
 
@@ -108,9 +64,11 @@ def main(filename: str, export_path: Path, html_path: Path = None):
             By.CSS_SELECTOR, "#openCookieBannerSettings"
         )
         cookie_settings.click()
-        time.sleep(1)
-        reject_all = chrome_driver.find_element(
-            By.CSS_SELECTOR, "#CookieBannerSettingsRejectAll"
+        reject_all = wait.until(
+            chrome_driver,
+            EC.element_to_be_clickable(
+                (By.CSS_SELECTOR, "#CookieBannerSettingsRejectAll")
+            ),
         )
         reject_all.click()
 
@@ -144,7 +102,7 @@ def main(filename: str, export_path: Path, html_path: Path = None):
                     """,
                     i,
                 )
-                time.sleep(1)
+                wait.until(chrome_driver, wait.dom_stable(".tiles-filtered"))
             else:
                 break
     
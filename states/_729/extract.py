@@ -1,11 +1,8 @@
 import re
-from datetime import datetime
 from pathlib import Path
+from functools import partial
 
 from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
@@ -14,11 +11,13 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.common.exceptions import NoSuchElementException
 
 from tqdm import tqdm
+from common import archive, batch, driver_pool, parser
+from common.archive import save_html
 
 
 def extract(page_source, year_to_get, **additional_info):
 
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
     score_table = soup.find("table")
 
     info = soup.select_one(".romana_allPage_text h1")
@@ -77,42 +76,15 @@ def get_candidate_pages(page_source):
 
 def extract_files(files: list[Path], year):
 
-    extracted = []
-
-    for file in tqdm(files, desc="Extracting Files..."):
-
-        with open(file, "r", encoding="utf-8") as f:
-            extracted.append(extract(f.read(), year))
-
-    records_extracted = dict(enumerate(extracted))
-
-    return records_extracted
-
-
-def save_html(
-    page_source,
-    filepath: Path,
-    filename: str,
-    *additional_info,
-):
-
-    filepath.mkdir(exist_ok=True)
-
-    soup = BeautifulSoup(page_source, "html.parser")
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    with open(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.html"
-        ),
-        "w",
+    return batch.iter_records(
+        partial(extract, year_to_get=year),
+        files,
+        desc="Extracting Files...",
         encoding="utf-8",
-    ) as f:
-        f.write(str(soup))
+    )
 
 
+@driver_pool.scoped
 def main(
     filename: str,
     export_path: Path,
@@ -122,20 +94,11 @@ def main(
 ):
 
     if html_path:
-        html_files = filter(
-            lambda f: f.name.endswith(".html"),
-            (export_path / html_path).iterdir(),
-        )
-        records_extracted = extract_files(
-            sorted(html_files, key=lambda x: x.stat().st_ctime), year
-        )
+        html_files = archive.html_files(export_path / html_path)
+        records_extracted = extract_files(html_files, year)
         return records_extracted
 
-    chrome_service = Service()
-    chrome_options = Options()
-    chrome_options.add_argument("incognito")
-    chrome_options.add_argument("headless")
-    chrome_driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
+    chrome_driver = driver_pool.checkout()
 
     chrome_driver.get(url)
 
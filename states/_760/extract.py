@@ -1,18 +1,16 @@
-from datetime import datetime
 from pathlib import Path
 from urllib.parse import urljoin
 
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.common.action_chains import ActionChains
-
-from bs4 import BeautifulSoup
 from tqdm import tqdm
+from common import archive, batch, checkpoint, fetch, parser
+from common.archive import save_html
 
 
 URL = "http://gachamberscore.com/legislators/"
+
+# A candidate page is only read over HTTP when it has the votes, otherwise it's
+# rendered in the browser
+CANDIDATE_READY = "table.resultsTable.legVoteTable td.legPosCell"
 METHODOLOGY = {
     "yesPos": "+",
     "noPos": "-",
@@ -24,7 +22,7 @@ METHODOLOGY = {
 
 def extract(page_source, **additional_info) -> list[dict[str, str]]:
 
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
     tables = soup.find_all("table", {"class": "resultsTable legListTable"})
 
     get_text = lambda x: x.get_text(strip=True)
@@ -55,7 +53,7 @@ def extract(page_source, **additional_info) -> list[dict[str, str]]:
 
 def extract_candidate(page_source, **additional_info):
 
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parser.parse(page_source)
 
     table = soup.find("table", {"class": "resultsTable legVoteTable"})
     page_link = soup.find("link", {"rel": "canonical"})["href"]
@@ -77,105 +75,77 @@ def extract_candidate(page_source, **additional_info):
 
 def extract_files(files: list[Path], candidate_files: list[Path]):
 
-    extracted_table = {}
-
-    for file in tqdm(files, desc="Extracting files..."):
-        with open(file, "r") as f:
-            _extracted = extract(f.read())
-            for r in _extracted:
-                extracted_table[r.get("sig_candidate_id")] = r
+    extracted_table = {
+        r.get("sig_candidate_id"): r
+        for r in batch.extract_records(extract, files, desc="Extracting files...")
+    }
 
     extracted = []
 
-    for c_file in tqdm(candidate_files, desc="Extracting candidate files..."):
-        with open(c_file, "r") as f:
-            candidate_extracted = extract_candidate(f.read())
-            e = extracted_table.get(candidate_extracted.get("sig_candidate_id"))
-            extracted.append(e | candidate_extracted)
+    for candidate_extracted in batch.map_files(
+        extract_candidate, candidate_files, desc="Extracting candidate files..."
+    ):
+        if candidate_extracted is None:
+            continue
+
+        e = extracted_table.get(candidate_extracted.get("sig_candidate_id"))
+        extracted.append(e | candidate_extracted)
 
     records_extracted = dict(enumerate(extracted))
     return records_extracted
 
 
-def save_html(
-    page_source,
-    filepath: Path,
-    filename: str,
-    *additional_info,
-):
-
-    filepath.mkdir(exist_ok=True)
-
-    soup = BeautifulSoup(page_source, "html.parser")
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    with open(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.html"
-        ),
-        "w",
-    ) as f:
-        f.write(str(soup))
-
-
 def main(
     filename: str,
     export_path: Path,
     html_path: Path = None,
     candidates_html_path: Path = None,
+    resume: bool = False,
 ):
 
     if html_path and candidates_html_path:
-        html_files = filter(
-            lambda f: f.name.endswith(".html"),
-            (export_path / html_path).iterdir(),
-        )
-        candidate_html_files = filter(
-            lambda f: f.name.endswith(".html"),
-            (export_path / candidates_html_path).iterdir(),
-        )
+        html_files = archive.html_files(export_path / html_path)
+        candidate_html_files = archive.html_files(export_path / candidates_html_path)
 
         records_extracted = extract_files(
-            sorted(html_files, key=lambda x: x.stat().st_ctime),
-            sorted(candidate_html_files, key=lambda x: x.stat().st_ctime),
+            html_files,
+            candidate_html_files,
         )
 
         return records_extracted
 
-    chrome_service = Service()
-    chrome_options = Options()
-    chrome_options.add_argument("incognito")
-    chrome_options.add_argument("headless")
-    chrome_driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
-
-    chrome_driver.get(URL)
-
-    # close overlay
-    ActionChains(chrome_driver).send_keys(Keys.ESCAPE).perform()
-
-    extracted_table = extract(chrome_driver.page_source)
+    page_source = fetch.page_source(URL, "table.legListTable")
+    extracted_table = extract(page_source)
 
     save_html(
-        chrome_driver.page_source,
+        page_source,
         export_path / "HTML_FILES",
         filename,
     )
 
+    journal = checkpoint.Journal(export_path, filename, resume)
     extracted = []
 
     for e in tqdm(extracted_table):
 
-        chrome_driver.get(urljoin(URL, e.get("sig_candidate_id")))
-        extracted.append(e | extract_candidate(chrome_driver.page_source))
+        candidate_url = urljoin(URL, e.get("sig_candidate_id"))
+
+        if candidate_url in journal:
+            extracted.append(e | journal[candidate_url])
+            continue
+
+        candidate_page_source = fetch.page_source(candidate_url, CANDIDATE_READY)
+        candidate_extracted = extract_candidate(candidate_page_source)
 
         save_html(
-            chrome_driver.page_source,
+            candidate_page_source,
             export_path / "HTML_CANDIDATE_FILES",
             filename,
             e.get("sig_candidate_id"),
         )
 
+        journal.record(candidate_url, candidate_extracted)
+        extracted.append(e | candidate_extracted)
+
     records_extracted = dict(enumerate(extracted))
     return records_extracted
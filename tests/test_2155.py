@@ -0,0 +1,40 @@
+import math
+
+from national._2155.extract import coverage_index, plan_lookups
+
+
+def zip_record(zip_code, district, **columns):
+    return {
+        "state_id": "WI",
+        "zip": zip_code,
+        "reps": "1",
+        "sens": "1",
+        "district": district,
+        **columns,
+    }
+
+
+def test_empty_district_cells_are_not_districts():
+    records = [
+        zip_record("53001", math.nan),
+        zip_record("53002", "1"),
+        zip_record("53003", " "),
+        zip_record("53004", math.nan, cd="2"),
+    ]
+
+    coverage, _ = coverage_index(records)
+
+    assert coverage["WI"] == {
+        "53001": set(),
+        "53002": {"1"},
+        "53003": set(),
+        "53004": {"2"},
+    }
+
+
+def test_zip_codes_without_districts_are_planned_last():
+    coverage, repsens = coverage_index(
+        [zip_record("53001", math.nan), zip_record("53002", "1")]
+    )
+
+    assert plan_lookups(coverage["WI"], repsens["WI"])[0] == "53002"
@@ -1,33 +1,11 @@
 import argparse
 from pathlib import Path
-from datetime import datetime
 
 from votervoice.extract import main as extract
 from votervoice.transform import main as transform
 from votervoice.match import main as match
 
-import pandas
-
-
-def save_records(
-    records: dict[int, dict[str, str]],
-    filename: str,
-    filepath: Path,
-    *additional_info,
-):
-
-    filepath.mkdir(exist_ok=True)
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    df = pandas.DataFrame.from_dict(records, orient="index")
-    df.to_csv(
-        filepath
-        / (
-            f"{filename}_{'-'.join(map(str, additional_info))}"
-            f"{'-' if additional_info else ''}{timestamp}.csv"
-        ),
-        index=False,
-    )
+from common.records import FORMATS, load_records, save_records
 
 
 def main():
@@ -63,6 +41,14 @@ def main():
         type=Path,
     )
 
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=1,
+        help="number of browsers the office tabs are opened in",
+    )
+
     parser.add_argument(
         "-e",
         "--extract",
@@ -81,6 +67,14 @@ def main():
         action="store_true",
     )
 
+    parser.add_argument(
+        "-o",
+        "--output_format",
+        choices=FORMATS,
+        default="csv",
+        help="format of the saved files, parquet keeps column types between stages",
+    )
+
     args = parser.parse_args()
 
     if not any((args.extract, args.transform, args.match)):
@@ -89,7 +83,7 @@ def main():
             parser.print_help()
             parser.error("Please specify the years")
 
-        extracted_by_session = extract(args.url, args.export_path)
+        extracted_by_session = extract(args.url, args.export_path, args.workers)
         sessions = list(extracted_by_session)
         print(sessions)
         
@@ -105,6 +99,7 @@ def main():
                         "Ratings-Extract",
                         args.export_path / "EXTRACT_FILES",
                         session,
+                        format=args.output_format,
                     )
 
                     records_transformed = transform(records_extracted)
@@ -114,6 +109,7 @@ def main():
                         "Ratings-Transformed",
                         args.export_path / "TRANSFORMED_FILES",
                         session,
+                        format=args.output_format,
                     )
 
                     records_matched, records_query = match(
@@ -125,17 +121,19 @@ def main():
                         "Ratings-Matched",
                         args.export_path / "MATCHED_FILES",
                         session,
+                        format=args.output_format,
                     )
                     save_records(
                         records_query,
                         "VSDB-Candidates",
                         args.export_path / "QUERY_FILES",
                         session,
+                        format=args.output_format,
                     )
 
     elif args.extract and not (any((args.transform, args.match))):
 
-        extracted_by_session = extract(args.url, args.export_path)
+        extracted_by_session = extract(args.url, args.export_path, args.workers)
         sessions = list(extracted_by_session)
         records_to_extract = {}
 
@@ -164,6 +162,7 @@ def main():
                 "Ratings-Extract",
                 args.export_path / "EXTRACT_FILES",
                 session,
+                format=args.output_format,
             )
 
     elif args.transform and not (any((args.extract, args.match))):
@@ -172,7 +171,7 @@ def main():
             parser.print_help()
             parser.error("Please specify the filepath of the spreadsheet.")
 
-        df_extracted = pandas.read_csv(args.file)
+        df_extracted = load_records(args.file)
         records_extracted = df_extracted.to_dict(orient="index")
 
         records_transformed = transform(records_extracted)
@@ -182,6 +181,7 @@ def main():
             "Ratings-Transformed",
             args.export_path / "TRANSFORMED_FILES",
             " ".join(args.file.name.split("_")[-1].split("-")[:-5]),
+            format=args.output_format,
         )
 
     elif args.match and not any((args.extract, args.transform)):
@@ -194,7 +194,7 @@ def main():
             parser.print_help()
             parser.error("Please specify the years")
 
-        df_transformed = pandas.read_csv(
+        df_transformed = load_records(
             args.file, na_values="nan", keep_default_na=False
         )
         records_transformed = df_transformed.to_dict(orient="index")
@@ -205,12 +205,14 @@ def main():
             "Ratings-Matched",
             args.export_path / "MATCHED_FILES",
             " ".join(args.file.name.split("_")[-1].split("-")[:-5]),
+            format=args.output_format,
         )
         save_records(
             records_query,
             "VSDB-Candidates",
             args.export_path / "QUERY_FILES",
             " ".join(args.file.name.split("_")[-1].split("-")[:-5]),
+            format=args.output_format,
         )
 
 
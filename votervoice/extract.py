@@ -3,19 +3,19 @@
 from pathlib import Path
 from datetime import datetime
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
 
 import pandas
 from bs4 import BeautifulSoup
-from selenium import webdriver
 from selenium.webdriver.remote.webdriver import WebDriver as RemoteWebDriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 from tqdm import tqdm
+from common import archive, driver_pool, ratings, wait
+from common.parser import parse
 
 
 RATINGS_METHODOLOGY = {
@@ -26,36 +26,28 @@ RATINGS_METHODOLOGY = {
     "vvOpposeContainer": "-",
     "vvNeutralContainer": "*",
 }
+RATINGS = ratings.register("votervoice", RATINGS_METHODOLOGY)
+
+OFFICE_TABS = "section#vvConsolidatedScorecardResults div.vv-tab-menu-item-container"
+ACTIVE_OFFICE_TAB = "div.vv-tab-menu-item-active"
+SCORECARD_ROWS = "table.vvScorecardAggregate tbody tr"
 
 
 def extract(page_source):
-    soup = BeautifulSoup(page_source, "html.parser")
+    soup = parse(page_source)
 
     office = soup.find("div", {"class": "vv-tab-menu-item-active"}).get_text(strip=True)
     sessions = soup.find_all("section", {"class": "vv-scorecard-section"})
 
-    def translate_ratings(rating_columns):
-        rating_string = ""
-        for td in rating_columns:
-            title = td.span.get("title") if td.span else None
-            class_ = td.span.get("class") if td.span else None
-
-            if title is None or title not in RATINGS_METHODOLOGY:
-                for m in RATINGS_METHODOLOGY:
-                    if class_ and m in class_:
-                        rating_string += RATINGS_METHODOLOGY.get(m)
-                        break
-            elif title in RATINGS_METHODOLOGY:
-                rating_string += RATINGS_METHODOLOGY.get(title)
-        return rating_string
-
     def _extract_row(row):
         columns = row.find_all("td")
         # rating_string = [td.span["title"] if td.span else None for td in columns[2:]]
         # translated_rating_string = "".join(
         #     [RATINGS_METHODOLOGY.get(c) for c in rating_string if RATINGS_METHODOLOGY.get(c)]
         # )
-        translated_rating_string = translate_ratings(columns[2:])
+        translated_rating_string = RATINGS.rating_string(
+            (td.span for td in columns[2:]), ("title", "class")
+        )
         return {
             "info": columns[0]["title"],
             "sig_rating": columns[1].get_text(strip=True),
@@ -73,28 +65,17 @@ def extract_files(files: list):
     extract_by_session = defaultdict(list)
 
     for file in files:
-        with open(file, "r") as f:
-            page_source = f.read()
-            for session, records in extract(page_source):
-                extract_by_session[session] += records
+        page_source = archive.read_html(file)
+        for session, records in extract(page_source):
+            extract_by_session[session] += records
 
     return extract_by_session
 
 
 def save_html(page_source, filepath, *additional_info):
-    soup = BeautifulSoup(page_source, "html.parser")
-
-    filepath = Path(filepath) / "HTML_FILES"
-    filepath.mkdir(exist_ok=True)
-
-    timestamp = datetime.strftime(datetime.now(), "%Y-%m-%d-%H%M%S-%f")
-
-    with open(
-        filepath / f"Ratings_{'-'.join(map(str, additional_info))}"
-        f"{'-' if additional_info else ''}{timestamp}.html",
-        "w",
-    ) as f:
-        f.write(str(soup))
+    archive.save_html(
+        page_source, Path(filepath) / "HTML_FILES", "Ratings", *additional_info
+    )
 
 
 def save_extract(extracted: list[dict], filepath, *additional_info):
@@ -111,41 +92,84 @@ def save_extract(extracted: list[dict], filepath, *additional_info):
     )
 
 
-def main(url, export_path: Path):
-    chrome_service = Service()
-    chrome_options = Options()
-    chrome_options.add_argument("incognito")
-    # chrome_options.add_argument("headless")
-    chrome_driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
-
+def load_scorecard(chrome_driver: RemoteWebDriver, url):
     chrome_driver.get(url)
 
+    WebDriverWait(chrome_driver, 30).until(
+        EC.visibility_of_all_elements_located((By.CSS_SELECTOR, SCORECARD_ROWS))
+    )
+
+
+def capture_office(chrome_driver: RemoteWebDriver, office) -> BeautifulSoup:
+    """Opens the office tab and parses its scorecard once it has settled"""
+
+    office_text = office.text
+    office.click()
+
+    wait.until(
+        chrome_driver,
+        EC.text_to_be_present_in_element(
+            (By.CSS_SELECTOR, ACTIVE_OFFICE_TAB), office_text
+        ),
+    )
+    wait.until(chrome_driver, wait.dom_stable("section#vvConsolidatedScorecardResults"))
+
+    return parse(chrome_driver.page_source)
+
+
+def capture_offices(url, office_count: int, workers: int, p_bar=None):
+    """Captures every office tab, each in its own pooled browser"""
+
+    driver_pool.get_pool(("incognito",), size=workers + 1)
+
+    def _capture(i):
+        with driver_pool.lease(("incognito",)) as chrome_driver:
+            load_scorecard(chrome_driver, url)
+            office = chrome_driver.find_elements(By.CSS_SELECTOR, OFFICE_TABS)[i]
+            soup = capture_office(chrome_driver, office)
+
+        if p_bar is not None:
+            p_bar.update(1)
+
+        return soup
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_capture, range(office_count)))
+
+
+@driver_pool.scoped
+def main(url, export_path: Path, workers: int = 1):
+    chrome_driver = driver_pool.checkout(("incognito",))
+
     try:
-        WebDriverWait(chrome_driver, 30).until(
-            EC.visibility_of_all_elements_located(
-                (By.CSS_SELECTOR, "table.vvScorecardAggregate tbody tr")
-            )
-        )
+        load_scorecard(chrome_driver, url)
     except TimeoutException:
         chrome_driver.quit()
         print("Taking too long to load...")
         return []
 
-    offices = chrome_driver.find_elements(
-        By.XPATH,
-        "section#vvConsolidatedScorecardResults div.vv-tab-menu-item-container]",
-    )
+    offices = chrome_driver.find_elements(By.CSS_SELECTOR, OFFICE_TABS)
+    office_texts = [office.text for office in offices]
 
-    extract_by_session = defaultdict(list)
     p_bar = tqdm(total=len(offices))
 
-    for office in offices:
-        p_bar.desc = f"Extracting {office.text}"
-        office.click()
-        for session, records in extract(chrome_driver.page_source):
+    if workers > 1:
+        p_bar.desc = "Extracting offices"
+        soups = capture_offices(url, len(offices), workers, p_bar)
+    else:
+        soups = []
+        for office, office_text in zip(offices, office_texts):
+            p_bar.desc = f"Extracting {office_text}"
+            soups.append(capture_office(chrome_driver, office))
+            p_bar.update(1)
+
+    extract_by_session = defaultdict(list)
+
+    # The same parsed scorecard is both extracted and archived
+    for office_text, soup in zip(office_texts, soups):
+        for session, records in extract(soup):
             extract_by_session[session] += records
 
-        save_html(chrome_driver.page_source, export_path, office.text)
-        p_bar.update(1)
+        save_html(soup, export_path, office_text)
 
     return extract_by_session